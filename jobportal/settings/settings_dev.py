@@ -11,10 +11,13 @@ DEBUG = True
 # Local caching (in-memory for dev)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'users.middleware.InstrumentedLocMemCache',
     }
 }
 
+# Off unless asked for; INSTRUMENTATION_SAMPLE_RATE=1 instruments every request
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', '0'))
+
 # Celery tasks run immediately in dev
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
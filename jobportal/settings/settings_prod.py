@@ -3,6 +3,7 @@ from pathlib import Path
 import dj_database_url
 from dotenv import load_dotenv
 from celery import Celery
+from celery.schedules import crontab
 
 # ===============================
 # Base Directory
@@ -65,6 +66,9 @@ INSTALLED_APPS = [
 ]
 
 AUTHENTICATION_BACKENDS = (
+    'users.backends.ProfileModelBackend',
+    # Sessions created before ProfileModelBackend store this path; keep it
+    # listed so they stay valid
     'django.contrib.auth.backends.ModelBackend',
     'guardian.backends.ObjectPermissionBackend',
 )
@@ -75,7 +79,8 @@ ANONYMOUS_USER_NAME = 'anonymous'
 # ===============================
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'users.middleware.InstrumentationMiddleware',
+    'users.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,7 +93,8 @@ ROOT_URLCONF = 'jobportal.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing renders for the instrumentation (users/middleware.py)
+        'BACKEND': 'users.middleware.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -172,23 +178,50 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOG_DIR = BASE_DIR / 'logs'
 LOG_DIR.mkdir(exist_ok=True)
 
+# Request threads only queue records; a listener thread per process writes
+# them (users/log_handlers.py). Records are dropped and counted when the
+# queue is full rather than blocking requests.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
         'verbose': {'format': '[{levelname}] {asctime} {name} {module} {message}', 'style': '{'},
         'simple': {'format': '[{levelname}] {message}', 'style': '{'},
+        'json': {'()': 'users.log_handlers.JsonFormatter'},
     },
     'handlers': {
         'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
-        'file': {'class': 'logging.FileHandler', 'filename': LOG_DIR / 'jobportal.log', 'formatter': 'verbose', 'level': 'INFO'},
+        'file': {
+            'class': 'users.log_handlers.SizeAndTimeRotatingFileHandler',
+            'filename': LOG_DIR / 'jobportal.log',
+            'formatter': 'json',
+            'level': 'INFO',
+            'maxBytes': int(os.getenv('LOG_MAX_BYTES', 50 * 1024 * 1024)),
+            'backupCount': int(os.getenv('LOG_BACKUP_COUNT', 10)),
+            'interval': 60 * 60 * 24,
+            'delay': True,
+        },
+        # Named so it sorts after its targets; dictConfig builds handlers in name order
+        'queue': {
+            '()': 'users.log_handlers.QueuedHandler',
+            'targets': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'queue_size': int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+        },
     },
     'loggers': {
-        'django': {'handlers': ['console', 'file'], 'level': 'INFO', 'propagate': True},
-        'users': {'handlers': ['console', 'file'], 'level': 'INFO', 'propagate': False},
+        'django': {'handlers': ['queue'], 'level': 'INFO', 'propagate': True},
+        'users': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
     },
 }
 
+# Route home/jobs/job details to the async views (users/async_views.py).
+# Turn on when serving with uvicorn; under WSGI the sync views are faster.
+ASYNC_JOB_VIEWS = os.getenv('ASYNC_JOB_VIEWS', 'False').lower() in ['true', '1', 'yes']
+
+# Per-request SQL/cache/template timings (users/middleware.py)
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', '0.01'))
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 5
+
 # ===============================
 # REST Framework
 # ===============================
@@ -204,6 +237,7 @@ REST_FRAMEWORK = {
         'anon': '10/minute',
         'user': '100/minute',
         'login': '5/minute',
+        'password_reset': '10/hour',
         'jobs_list': '50/minute',
     }
 }
@@ -223,6 +257,71 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Kolkata'
 
+# Periodic tasks, run by the `beat` process (Procfile)
+CELERY_BEAT_SCHEDULE = {
+    'archive-expired-jobs': {
+        'task': 'users.tasks.archive_expired_jobs',
+        'schedule': crontab(minute='*/15'),
+    },
+    'match-saved-searches': {
+        'task': 'users.tasks.match_saved_searches',
+        'schedule': crontab(minute='*/10'),
+    },
+    'send-job-alert-digests': {
+        'task': 'users.tasks.send_job_alert_digests',
+        'schedule': crontab(hour=7, minute=0),
+    },
+    'flush-job-views': {
+        'task': 'users.tasks.flush_job_views',
+        'schedule': crontab(),  # every minute
+    },
+}
+
+# Job postings expire this many days after posting and are then moved to
+# the archive (users/archival.py) in batches small enough to keep locks short
+JOB_POSTING_LIFETIME_DAYS = int(os.getenv('JOB_POSTING_LIFETIME_DAYS', 60))
+JOB_ARCHIVE_BATCH_SIZE = 500
+JOB_ARCHIVE_MAX_BATCHES = 20
+
+# Saved searches are matched against new jobs and mailed as one daily
+# digest per user (users/alerts.py)
+JOB_ALERT_BATCH_SIZE = 500          # new jobs matched per query
+JOB_ALERT_DIGEST_BATCH_SIZE = 200   # users per digest query
+# Job page views are buffered in Redis and flushed every minute
+# (users/job_stats.py); a session counts once per job per window
+JOB_VIEW_DEDUP_SECONDS = 60 * 30
+
+# Base of the links in emails
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000')
+
+# Job changes are queued and applied to the recommendations matrix in one
+# refresh per window (users/recommendations.py); every worker reloads the
+# matrix after a refresh, so this also bounds how often that happens
+RECOMMENDATIONS_REFRESH_WINDOW = 60  # seconds
+
+# Welcome emails are queued and sent in batches (users/emails.py)
+WELCOME_EMAIL_BATCH_WINDOW = 5      # seconds to collect sign-ups before sending
+WELCOME_EMAIL_BATCH_SIZE = 100
+WELCOME_EMAIL_RATE_LIMIT = 10       # messages per second, 0 for no limit
+WELCOME_EMAIL_MAX_ATTEMPTS = 5
+WELCOME_EMAIL_RETRY_BACKOFF = 30    # seconds before the first retry, doubled each time
+
+# ===============================
+# Cache Configuration
+# ===============================
+# Shared by all workers, so page caches, counters and locks work across processes
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            # django-redis's RedisCache, counting hits for the instrumentation
+            'BACKEND': 'users.middleware.InstrumentedRedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+
 # ===============================
 # Security Settings
 # ===============================
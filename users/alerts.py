@@ -0,0 +1,269 @@
+"""
+Saved searches and job-alert digests.
+
+A job seeker saves a query (keywords and/or a location). Its words and
+quoted phrases are turned into index terms of the ``SearchPosting``
+vocabulary (prefix queries like ``pyth*`` can't be saved) and stored as
+``SavedSearchTerm`` rows, an inverted index from a term to the searches
+that require it.
+
+``match_new_jobs`` (the ``match_saved_searches`` beat task) takes the jobs
+posted since its last run and joins the two indexes: the new jobs' postings
+for terms some saved search uses, then the searches using those terms. A
+job matches a search when it has all ``term_count`` of its terms and, if the
+search names a location, the same ``location_key``. The work grows with the
+new jobs and the searches they hit, never with jobs x searches. Each match
+is a ``JobAlert`` row; the unique (search, job) constraint makes re-running
+a batch harmless.
+
+``send_digests`` (the ``send_job_alert_digests`` beat task) sends every user
+with pending alerts one email listing all of them. Users are handled in
+batches of ``JOB_ALERT_DIGEST_BATCH_SIZE``, and each batch's digests go out
+over one SMTP connection of its own (``emails.send_each``).
+
+Archived jobs never match (only live postings are scanned), and their
+pending alerts are deleted with them.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from . import emails, search
+from .locations import normalize_location
+from .models import JobAlert, JobListing, SavedSearch, SavedSearchTerm, SearchPosting
+
+CURSOR_KEY = 'alerts:last_job_id'
+MATCH_LOCK_KEY = 'alerts:match:lock'
+DIGEST_LOCK_KEY = 'alerts:digest:lock'
+LOCK_TIMEOUT = 60 * 30
+MAX_SAVED_SEARCHES = 20
+MAX_DIGEST_JOBS = 50
+# Without a cursor (first run, or the cache was cleared) look back this far
+DEFAULT_LOOKBACK = timedelta(days=1)
+# Jobs from transactions still committing can get lower ids than jobs
+# already visible; leave the most recent ones for the next run
+SETTLE_TIME = timedelta(minutes=1)
+
+
+class SavedSearchError(Exception):
+    pass
+
+
+def batch_size():
+    return getattr(settings, 'JOB_ALERT_BATCH_SIZE', 500)
+
+
+def digest_batch_size():
+    return getattr(settings, 'JOB_ALERT_DIGEST_BATCH_SIZE', 200)
+
+
+# -----------------------------
+# Saving searches
+# -----------------------------
+def search_terms(query):
+    """The distinct index terms a job must contain to match ``query``."""
+    terms = set()
+    for phrase, word in search.QUERY_RE.findall(query or ''):
+        tokens = search.tokenize(phrase or word)
+        terms.update(search.bigrams(tokens) if phrase and len(tokens) > 1 else tokens)
+    return sorted(terms)
+
+
+def save_search(user, query, location=''):
+    """
+    Save a search for ``user``. Raises SavedSearchError if it is empty, has
+    a wildcard, is a duplicate or is one too many.
+    """
+    query, location = (query or '').strip(), (location or '').strip()
+    if '*' in query:
+        raise SavedSearchError("Searches with a wildcard (*) can't be saved. Use whole words instead.")
+    terms = search_terms(query)
+    location_key = normalize_location(location)
+    if not terms and not location_key:
+        raise SavedSearchError("Enter keywords or a location to save a search.")
+
+    saved = user.saved_searches.all()
+    if saved.filter(query__iexact=query, location_key=location_key).exists():
+        raise SavedSearchError("You have already saved this search.")
+    if saved.count() >= MAX_SAVED_SEARCHES:
+        raise SavedSearchError(f"You can save up to {MAX_SAVED_SEARCHES} searches.")
+
+    with transaction.atomic():
+        saved_search = SavedSearch.objects.create(
+            user=user, query=query[:200], location=location[:100],
+            location_key=location_key, term_count=len(terms),
+        )
+        SavedSearchTerm.objects.bulk_create([SavedSearchTerm(search=saved_search, term=term) for term in terms])
+    return saved_search
+
+
+# -----------------------------
+# Matching
+# -----------------------------
+def match_jobs(jobs):
+    """Record a JobAlert for every saved search one of ``jobs`` matches. Returns the alerts created."""
+    jobs_by_id = {job.pk: job for job in jobs}
+    matches = set()
+
+    # The new jobs' postings, restricted to terms some saved search uses
+    jobs_by_term = defaultdict(set)
+    postings = (
+        SearchPosting.objects
+        .filter(job_id__in=list(jobs_by_id), term__in=SavedSearchTerm.objects.values('term'))
+        .values_list('term', 'job_id')
+    )
+    for term, job_id in postings.iterator():
+        jobs_by_term[term].add(job_id)
+
+    if jobs_by_term:
+        # The searches using those terms; count how many of each search's terms every job has
+        found = Counter()
+        required = {}
+        rows = (
+            SavedSearchTerm.objects.filter(term__in=list(jobs_by_term))
+            .values_list('term', 'search_id', 'search__term_count', 'search__location_key')
+        )
+        for term, search_id, term_count, location_key in rows.iterator():
+            required[search_id] = term_count
+            for job_id in jobs_by_term[term]:
+                if not location_key or jobs_by_id[job_id].location_key == location_key:
+                    found[search_id, job_id] += 1
+        matches.update(pair for pair, count in found.items() if count == required[pair[0]])
+
+    # Location-only searches
+    jobs_by_location = defaultdict(list)
+    for job in jobs:
+        if job.location_key:
+            jobs_by_location[job.location_key].append(job.pk)
+    if jobs_by_location:
+        location_searches = (
+            SavedSearch.objects.filter(term_count=0, location_key__in=list(jobs_by_location))
+            .values_list('id', 'location_key')
+        )
+        for search_id, location_key in location_searches.iterator():
+            matches.update((search_id, job_id) for job_id in jobs_by_location[location_key])
+
+    created = JobAlert.objects.bulk_create(
+        [JobAlert(search_id=search_id, job_id=job_id) for search_id, job_id in matches],
+        batch_size=1000, ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def _start_cursor(now):
+    return (
+        JobListing.objects.filter(created_at__lt=now - DEFAULT_LOOKBACK)
+        .order_by('-created_at', '-id').values_list('id', flat=True).first()
+    ) or 0
+
+
+def match_new_jobs(size=None, now=None):
+    """
+    Match the jobs posted since the last run against every saved search,
+    ``size`` jobs at a time. Returns ``(jobs scanned, alerts created)``.
+    """
+    size = size or batch_size()
+    now = now or timezone.now()
+    cursor = cache.get(CURSOR_KEY)
+    if cursor is None:
+        cursor = _start_cursor(now)
+
+    scanned = created = 0
+    while True:
+        jobs = list(
+            JobListing.objects.filter(id__gt=cursor, created_at__lte=now - SETTLE_TIME)
+            .order_by('id').only('id', 'location_key')[:size]
+        )
+        if not jobs:
+            break
+        created += match_jobs(jobs)
+        scanned += len(jobs)
+        cursor = jobs[-1].pk
+        cache.set(CURSOR_KEY, cursor, timeout=None)
+        if len(jobs) < size:
+            break
+    return scanned, created
+
+
+# -----------------------------
+# Digests
+# -----------------------------
+def build_digests(user_ids):
+    """One digest per user: ``{'user', 'jobs': [(job, saved search)], 'alert_ids'}``."""
+    alerts = (
+        JobAlert.objects.filter(sent_at__isnull=True, search__user_id__in=user_ids)
+        .select_related('job', 'search__user')
+        .defer('job__description')
+        .order_by('search__user_id', '-job__created_at', 'id')
+    )
+    digests = {}
+    for alert in alerts:
+        user = alert.search.user
+        digest = digests.setdefault(user.pk, {'user': user, 'jobs': [], 'job_ids': set(), 'alert_ids': []})
+        digest['alert_ids'].append(alert.pk)
+        # A job matching several searches is listed once
+        if alert.job_id not in digest['job_ids']:
+            digest['job_ids'].add(alert.job_id)
+            digest['jobs'].append((alert.job, alert.search))
+    return list(digests.values())
+
+
+def digest_message(digest, connection):
+    user, jobs = digest['user'], digest['jobs']
+    site_url = getattr(settings, 'SITE_URL', '').rstrip('/')
+    lines = [
+        f"Hi {user.username},",
+        "",
+        f"{len(jobs)} new job{'s' if len(jobs) != 1 else ''} matched your saved searches on Job Portal:",
+        "",
+    ]
+    for job, saved_search in jobs[:MAX_DIGEST_JOBS]:
+        lines.append(f"- {job.title} at {job.company}, {job.location} (matches \"{saved_search}\")")
+        lines.append(f"  {site_url}{reverse('job-details', args=[job.pk])}")
+    if len(jobs) > MAX_DIGEST_JOBS:
+        lines.append(f"... and {len(jobs) - MAX_DIGEST_JOBS} more on {site_url}{reverse('jobs')}")
+    lines += ["", f"Manage your saved searches on your profile: {site_url}{reverse('profile')}"]
+    return EmailMessage(
+        subject=f"{len(jobs)} new job{'s' if len(jobs) != 1 else ''} for your saved searches",
+        body='\n'.join(lines),
+        from_email=emails.FROM_EMAIL,
+        to=[user.email],
+        connection=connection,
+    )
+
+
+def send_digests(size=None):
+    """
+    Send every user with pending alerts their digest, ``size`` users per
+    query. Returns ``(sent, failed)``; failed digests stay pending for the
+    next run.
+    """
+    size = size or digest_batch_size()
+    # Same SMTP account as the welcome emails
+    rate_limit = getattr(settings, 'WELCOME_EMAIL_RATE_LIMIT', 10)
+    sent = failed = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            JobAlert.objects.filter(sent_at__isnull=True, search__user_id__gt=last_user_id)
+            .order_by('search__user_id').values_list('search__user_id', flat=True).distinct()[:size]
+        )
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        digests = build_digests(user_ids)
+        failures = emails.send_each([digest for digest in digests if digest['user'].email], digest_message, rate_limit)
+        failed_users = {digest['user'].pk for digest in failures}
+        # Users without an email address have nowhere to get them; drop theirs too
+        done = [alert_id for digest in digests if digest['user'].pk not in failed_users for alert_id in digest['alert_ids']]
+        JobAlert.objects.filter(id__in=done).update(sent_at=timezone.now())
+        sent += sum(1 for digest in digests if digest['user'].email) - len(failures)
+        failed += len(failures)
+    return sent, failed
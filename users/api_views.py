@@ -0,0 +1,112 @@
+"""
+Read-only JSON API for job listings, used by the mobile client.
+
+    GET /api/jobs/                  cursor-paginated list (no description by default)
+    GET /api/jobs/?fields=id,title  only the listed fields
+    GET /api/jobs/?omit=company     everything but the listed fields
+    GET /api/jobs/<id>/             a single job
+
+Responses carry an ``ETag`` and a request with a matching ``If-None-Match``
+gets a 304 without the page being serialized. The ETag covers the ids and
+``updated_at`` of the rows on the page, so it also changes when a job is
+deleted or archived off the page. Single jobs also carry ``Last-Modified``
+for ``If-Modified-Since``; lists don't, because the newest ``updated_at``
+on a page stays the same when a row leaves it.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import generics
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import JobListing
+from .serializers import JobListingSerializer
+
+
+class JobCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class ConditionalJobAPIMixin:
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'jobs_list'
+    serializer_class = JobListingSerializer
+    default_omit = ()
+
+    def selected_fields(self):
+        """``(fields, omit)`` from the ``?fields=`` / ``?omit=`` query parameters."""
+        params = self.request.query_params
+        fields = [name for name in params.get('fields', '').split(',') if name] or None
+        omit = [name for name in params.get('omit', '').split(',') if name]
+        if fields is None:
+            omit += [name for name in self.default_omit if name not in omit]
+        return fields, omit
+
+    def get_queryset(self):
+        queryset = JobListing.objects.all()
+        fields, omit = self.selected_fields()
+        if 'description' in omit or (fields is not None and 'description' not in fields):
+            queryset = queryset.defer('description')
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'], kwargs['omit'] = self.selected_fields()
+        return super().get_serializer(*args, **kwargs)
+
+    def conditional_response(self, jobs, use_last_modified=True):
+        """
+        Return a 304 response if the client's copy of ``jobs`` is current,
+        otherwise ``(etag, last_modified)`` to put on the full response.
+        """
+        fields, omit = self.selected_fields()
+        digest = hashlib.sha1(f"{fields}|{sorted(omit)}".encode())
+        for job in jobs:
+            digest.update(f"|{job.pk}:{job.updated_at.timestamp()}".encode())
+        etag = quote_etag(digest.hexdigest())
+        last_modified = None
+        if use_last_modified:
+            last_modified = max((job.updated_at for job in jobs), default=None)
+            last_modified = last_modified and int(last_modified.timestamp())
+
+        not_modified = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        return not_modified, (etag, last_modified)
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class JobListAPIView(ConditionalJobAPIMixin, generics.ListAPIView):
+    pagination_class = JobCursorPagination
+    default_omit = ('description',)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        # ETag only: it changes when the page's membership does, Last-Modified doesn't
+        not_modified, validators = self.conditional_response(page, use_last_modified=False)
+        if not_modified is not None:
+            return not_modified
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return self.set_validators(response, *validators)
+
+
+class JobDetailAPIView(ConditionalJobAPIMixin, generics.RetrieveAPIView):
+    lookup_url_kwarg = 'job_id'
+
+    def retrieve(self, request, *args, **kwargs):
+        job = self.get_object()
+        not_modified, validators = self.conditional_response([job])
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(Response(self.get_serializer(job).data), *validators)
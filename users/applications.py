@@ -0,0 +1,38 @@
+"""
+Job applications.
+
+Applying is one INSERT into ``JobApplication`` and an ``F()`` increment of
+``JobListing.applicant_count`` in one short transaction, with nothing read
+first: the unique (job, seeker) constraint rejects a second application,
+and an increment that matches no row means the job has expired or been
+deleted, which rolls the insert back. The increment comes last, so the row
+lock that applicants to a popular job queue on is only held until commit.
+
+Recruiters' job lists show the counter column, read for the jobs on the
+page being shown (``job_stats.with_live_counts``), so no list ever runs a
+``COUNT(*)`` per job.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import JobApplication, JobListing
+
+
+class ApplicationClosed(Exception):
+    """The job has expired or was deleted."""
+
+
+def apply(job_id, seeker):
+    """
+    Record ``seeker``'s application to ``job_id``. Returns False if they had
+    already applied; raises ApplicationClosed if the job is no longer live.
+    """
+    try:
+        with transaction.atomic():
+            JobApplication.objects.create(job_id=job_id, seeker=seeker)
+            if not JobListing.objects.filter(id=job_id).update(applicant_count=F('applicant_count') + 1):
+                raise ApplicationClosed(job_id)
+    except IntegrityError:
+        return False
+    return True
+
@@ -0,0 +1,112 @@
+"""
+Retiring expired job postings.
+
+Every JobListing gets an ``expires_at`` when it is created
+(``JOB_POSTING_LIFETIME_DAYS`` after posting). The ``archive_expired_jobs``
+task, scheduled by Celery beat, moves expired rows to ``ArchivedJobListing``
+so the live table, and every list page, index and cache built from it,
+only covers current postings.
+
+Rows move in batches of ``JOB_ARCHIVE_BATCH_SIZE``, one short transaction
+each, so no batch holds its row locks for long. The per-job signals are
+muted while a batch is deleted; the search index, facets, caches and the
+recommendations matrix are updated once per batch instead.
+
+Archived postings stay reachable at their old ``job-details`` URL.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from . import facets, featured, job_cache, search
+from .models import ArchivedJobListing, JobListing
+from .signals import job_signals_muted
+from .utils.tasks import refresh_job_matrix_dev
+
+LOCK_KEY = 'archival:lock'
+LOCK_TIMEOUT = 60 * 30
+
+
+def batch_size():
+    return getattr(settings, 'JOB_ARCHIVE_BATCH_SIZE', 500)
+
+
+def max_batches():
+    return getattr(settings, 'JOB_ARCHIVE_MAX_BATCHES', 20)
+
+
+def archive_batch(now, size):
+    """Move up to ``size`` jobs that expired before ``now``; returns the jobs moved."""
+    with transaction.atomic():
+        # Rows being edited right now are left for the next batch
+        jobs = list(
+            JobListing.objects.select_for_update(skip_locked=True)
+            .filter(expires_at__lte=now)
+            .order_by('expires_at', 'id')[:size]
+        )
+        if not jobs:
+            return []
+
+        ArchivedJobListing.objects.bulk_create([ArchivedJobListing.from_job(job) for job in jobs], ignore_conflicts=True)
+        with job_signals_muted():
+            # Also deletes the jobs' search postings
+            JobListing.objects.filter(id__in=[job.pk for job in jobs]).delete()
+        facets.remove_jobs(jobs)
+        transaction.on_commit(lambda: jobs_archived(jobs))
+    return jobs
+
+
+def jobs_archived(jobs):
+    """Invalidate everything derived from the job table, once per batch."""
+    # The featured pool only loses these ids; rebuilding it would reread every id
+    job_cache.jobs_changed_in_bulk({job.created_by_id for job in jobs}, featured=False)
+    featured.remove_from_pool(*(job.pk for job in jobs))
+    job_cache.bump(*(f'job:{job.pk}' for job in jobs))
+    cache.delete(search.DOC_COUNT_KEY)
+    refresh_job_matrix_dev([job.pk for job in jobs])
+
+
+def archive_expired(size=None, limit=None, pause=0.05):
+    """
+    Archive expired jobs, at most ``limit`` batches of ``size``. Returns
+    ``(archived, more)``; ``more`` is True when the batch limit was reached
+    with expired jobs possibly left over.
+    """
+    size = size or batch_size()
+    limit = limit or max_batches()
+    now = timezone.now()
+    archived = 0
+    for _ in range(limit):
+        moved = len(archive_batch(now, size))
+        archived += moved
+        if moved < size:
+            return archived, False
+        # Let queued writers in between batches
+        time.sleep(pause)
+    return archived, True
+
+
+# -----------------------------
+# Lookups
+# -----------------------------
+def get_job_or_archived(job_id):
+    """The live job, else the archived one; raises Http404 if neither exists."""
+    job = JobListing.objects.filter(id=job_id).first()
+    if job is None:
+        job = ArchivedJobListing.objects.filter(id=job_id).first()
+    if job is None:
+        raise Http404("No job matches the given query.")
+    return job
+
+
+async def aget_job_or_archived(job_id):
+    job = await JobListing.objects.filter(id=job_id).afirst()
+    if job is None:
+        job = await ArchivedJobListing.objects.filter(id=job_id).afirst()
+    if job is None:
+        raise Http404("No job matches the given query.")
+    return job
@@ -0,0 +1,103 @@
+"""
+Native async versions of the read-heavy job pages, for ASGI deployments.
+
+They behave exactly like ``home``, ``jobs_view`` and ``job_details_view`` in
+``users/views.py`` but use the async ORM and cache APIs, so a worker under
+uvicorn keeps serving other requests while one waits on the database or the
+cache. ``users/urls.py`` routes to them when ``ASYNC_JOB_VIEWS`` is on.
+
+Templates must not touch the database from here (Django raises
+SynchronousOnlyOperation), so every view resolves ``request.user`` up front;
+the profile comes with it (see ``users/backends.py``).
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.shortcuts import render
+
+from . import job_cache
+from .archival import aget_job_or_archived
+from .backends import aget_user_role
+from .facets import alocation_facets
+from .featured import aget_featured_jobs
+from .job_stats import count_job_views, most_viewed, with_live_counts
+from .locations import normalize_location
+from .models import JobListing
+from .page_cache import anonymous_page_cache
+from .pagination import KeysetPaginator
+from .permissions import annotate_jobs
+
+
+async def resolve_user(request):
+    """Load the user asynchronously and put it where templates look for it."""
+    request.user = await request.auser()
+    return request.user
+
+
+def _legacy_page(queryset, page_number):
+    page_obj = Paginator(queryset, 10).get_page(page_number)
+    page_obj.object_list = list(page_obj.object_list)
+    return page_obj
+
+
+@anonymous_page_cache('jobs:list', timeout=60)
+async def home(request):
+    await resolve_user(request)
+    random_jobs = await aget_featured_jobs(3)
+    return render(request, 'index.html', {'jobs': random_jobs})
+
+
+@login_required
+async def jobs_view(request):
+    user = await resolve_user(request)
+    location = normalize_location(request.GET.get('location'))
+    location_filters = None
+    if await aget_user_role(user) == 'RECRUITER':
+        jobs = JobListing.objects.for_list().filter(created_by=user)
+        recruiter_id = user.id
+    else:
+        jobs = JobListing.objects.for_list()
+        recruiter_id = None
+        location_filters = await alocation_facets()
+    if location:
+        jobs = jobs.filter(location_key=location)
+
+    # Old ?page=N links keep working; everything else uses keyset pagination
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        page_obj = await sync_to_async(_legacy_page)(jobs.order_by('-created_at', '-id'), page_number)
+    else:
+        cursor = request.GET.get('cursor', '')
+        page_key = await job_cache.alist_key(
+            recruiter_id, 'page', location, KeysetPaginator.cursor_key(cursor)
+        )
+        page_obj = await cache.aget(page_key)
+        if page_obj is None:
+            count_key = await job_cache.alist_key(recruiter_id, 'count', location)
+            page_obj = await KeysetPaginator(jobs, 10, count_cache_key=count_key).aget_page(cursor)
+            await cache.aset(page_key, page_obj, timeout=job_cache.LIST_TIMEOUT)
+
+    most_viewed_jobs = None
+    if recruiter_id is not None:
+        page_obj = await sync_to_async(with_live_counts)(page_obj)
+        most_viewed_jobs = await sync_to_async(most_viewed)(recruiter_id)
+    page_obj.object_list = await sync_to_async(annotate_jobs)(request, page_obj.object_list)
+
+    return render(request, 'jobs.html', {
+        'page_obj': page_obj, 'location_facets': location_filters, 'location': location,
+        'show_stats': recruiter_id is not None, 'most_viewed': most_viewed_jobs,
+    })
+
+
+@count_job_views
+@anonymous_page_cache('job:{job_id}', timeout=job_cache.DETAIL_TIMEOUT)
+async def job_details_view(request, job_id):
+    await resolve_user(request)
+    cache_key = await job_cache.adetail_key(job_id)
+    job = await cache.aget(cache_key)
+    if job is None:
+        job = await aget_job_or_archived(job_id)
+        await cache.aset(cache_key, job, timeout=job_cache.DETAIL_TIMEOUT)
+    await sync_to_async(annotate_jobs)(request, [job])
+    return render(request, 'job_details.html', {'job': job})
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import UserProfile
+
+UserModel = get_user_model()
+
+ROLE_CACHE_KEY = 'user_role:{}'
+ROLE_CACHE_TIMEOUT = 60 * 60
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the user's UserProfile in the same query, so
+    ``request.user.userprofile`` (views, ``role_required``, templates) costs
+    nothing extra on authenticated requests.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('userprofile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+# -----------------------------
+# Role cache
+# -----------------------------
+def get_user_role(user):
+    """
+    The user's UserProfile role, or None. Uses the profile when it is already
+    loaded on the instance, then the cache, and only then the database.
+    Cached roles are dropped by the UserProfile signals.
+    """
+    if not user.is_authenticated:
+        return None
+    if UserModel.userprofile.related.is_cached(user):
+        profile = user.userprofile if hasattr(user, 'userprofile') else None
+        return profile.role if profile else None
+
+    key = ROLE_CACHE_KEY.format(user.pk)
+    role = cache.get(key)
+    if role is None:
+        role = UserProfile.objects.filter(user_id=user.pk).values_list('role', flat=True).first()
+        if role is not None:
+            cache.set(key, role, timeout=ROLE_CACHE_TIMEOUT)
+    return role
+
+
+async def aget_user_role(user):
+    if not user.is_authenticated:
+        return None
+    if UserModel.userprofile.related.is_cached(user):
+        profile = user.userprofile if hasattr(user, 'userprofile') else None
+        return profile.role if profile else None
+
+    key = ROLE_CACHE_KEY.format(user.pk)
+    role = await cache.aget(key)
+    if role is None:
+        role = await UserProfile.objects.filter(user_id=user.pk).values_list('role', flat=True).afirst()
+        if role is not None:
+            await cache.aset(key, role, timeout=ROLE_CACHE_TIMEOUT)
+    return role
+
+
+def forget_user_role(user_id):
+    cache.delete(ROLE_CACHE_KEY.format(user_id))
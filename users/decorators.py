@@ -1,6 +1,8 @@
 from django.core.exceptions import PermissionDenied
 from functools import wraps
 
+from .backends import get_user_role
+
 
 def role_required(allowed_roles):
     """
@@ -18,9 +20,10 @@ def role_required(allowed_roles):
         def _wrapped_view(request, *args, **kwargs):
             if not request.user.is_authenticated:
                 raise PermissionDenied("User must be logged in")
-            if not hasattr(request.user, 'userprofile'):
+            role = get_user_role(request.user)
+            if role is None:
                 raise PermissionDenied("User profile not found")
-            if request.user.userprofile.role not in allowed_roles:
+            if role not in allowed_roles:
                 raise PermissionDenied(f"Access denied: {', '.join(allowed_roles)} role required")
             return view_func(request, *args, **kwargs)
 
@@ -0,0 +1,156 @@
+"""
+Batched delivery of welcome emails.
+
+Sign-ups only queue their welcome email. The ``flush_welcome_emails`` task
+runs a short window later, takes up to ``WELCOME_EMAIL_BATCH_SIZE`` queued
+emails and sends them over one connection from ``get_connection()``, at no
+more than ``WELCOME_EMAIL_RATE_LIMIT`` messages per second. Recipients that
+fail are retried on their own with exponential backoff; the rest of the
+batch is unaffected.
+
+The queue is a Redis list when the default cache is django-redis, and a list
+in the cache otherwise (enough for a single dev process or the tests).
+"""
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+
+from .utils.cache import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = 'emails:welcome:queue'
+SCHEDULED_KEY = 'emails:welcome:scheduled'
+FLUSH_LOCK_KEY = 'emails:welcome:lock'
+FLUSH_LOCK_TIMEOUT = 60 * 5
+FROM_EMAIL = "noreply@jobportal.com"
+
+# The LocMem queue is read-modify-write; LocMem is per process, so a thread lock is enough
+_local_queue_lock = threading.Lock()
+
+
+def batch_window():
+    return getattr(settings, 'WELCOME_EMAIL_BATCH_WINDOW', 5)
+
+
+def batch_size():
+    return getattr(settings, 'WELCOME_EMAIL_BATCH_SIZE', 100)
+
+
+def retry_countdown(attempts):
+    return getattr(settings, 'WELCOME_EMAIL_RETRY_BACKOFF', 30) * 2 ** (attempts - 1)
+
+
+def max_attempts():
+    return getattr(settings, 'WELCOME_EMAIL_MAX_ATTEMPTS', 5)
+
+
+# -----------------------------
+# Queue
+# -----------------------------
+def enqueue(username, email):
+    """Queue a welcome email. Returns True if a flush should be scheduled."""
+    entry = {'username': username, 'email': email, 'attempts': 0}
+    client = get_redis_connection()
+    if client is not None:
+        client.rpush(cache.make_key(QUEUE_KEY), json.dumps(entry))
+    else:
+        with _local_queue_lock:
+            queue = cache.get(QUEUE_KEY) or []
+            queue.append(entry)
+            cache.set(QUEUE_KEY, queue, timeout=None)
+    # Only the first email of a window schedules the flush
+    return cache.add(SCHEDULED_KEY, True, timeout=batch_window())
+
+
+def pop_batch(size):
+    client = get_redis_connection()
+    if client is not None:
+        key = cache.make_key(QUEUE_KEY)
+        with client.pipeline() as pipe:
+            pipe.lrange(key, 0, size - 1)
+            pipe.ltrim(key, size, -1)
+            raw, _ = pipe.execute()
+        return [json.loads(item) for item in raw]
+
+    with _local_queue_lock:
+        queue = cache.get(QUEUE_KEY) or []
+        cache.set(QUEUE_KEY, queue[size:], timeout=None)
+    return queue[:size]
+
+
+def queue_length():
+    client = get_redis_connection()
+    if client is not None:
+        return client.llen(cache.make_key(QUEUE_KEY))
+    return len(cache.get(QUEUE_KEY) or [])
+
+
+# -----------------------------
+# Sending
+# -----------------------------
+def welcome_message(entry, connection):
+    username = entry['username']
+    return EmailMessage(
+        subject=f"Welcome to Job Portal, {username} 🎉",
+        body=f"Hi {username},\n\nThank you for registering on Job Portal. Explore jobs and apply today!",
+        from_email=FROM_EMAIL,
+        to=[entry['email']],
+        connection=connection,
+    )
+
+
+def send_each(items, build_message, rate_limit=0):
+    """
+    Send ``build_message(item, connection)`` for every item over a single
+    connection, at most ``rate_limit`` messages per second (0 for no limit).
+    Returns the items whose message failed, which is all of them when the
+    connection can't be opened.
+    """
+    interval = 1.0 / rate_limit if rate_limit else 0.0
+
+    failed = []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception:
+        logger.exception("Could not open the email connection; %s emails not sent", len(items))
+        return list(items)
+    try:
+        next_send = time.monotonic()
+        for item in items:
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_send = time.monotonic() + interval
+            message = build_message(item, connection)
+            try:
+                message.send()
+            except Exception as e:
+                logger.warning("Email to %s failed: %s", ', '.join(message.to), e)
+                failed.append(item)
+                # The connection may be broken; start a fresh one for the rest
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    logger.exception("Could not reopen the email connection")
+    finally:
+        connection.close()
+    return failed
+
+
+def send_batch(entries, rate_limit=None):
+    """
+    Send ``entries`` over a single connection. Returns the entries that failed,
+    with their ``attempts`` incremented.
+    """
+    if rate_limit is None:
+        rate_limit = getattr(settings, 'WELCOME_EMAIL_RATE_LIMIT', 10)
+    failed = send_each(entries, welcome_message, rate_limit)
+    return [{**entry, 'attempts': entry['attempts'] + 1} for entry in failed]
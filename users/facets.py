@@ -0,0 +1,121 @@
+"""
+Location facets for the jobs page: "Bangalore (1,204)".
+
+Every job stores ``location_key``, its normalized location, so spellings
+like "Bengaluru", "bangalore " and "Bangalore, Karnataka" collapse into one
+facet. ``LocationFacet`` holds one row per key with its job count. The
+JobListing signals adjust the counts with ``F()`` updates in the same
+transaction as the job write, bulk writers call ``add_jobs()``, and the
+``rebuild_location_facets`` command recomputes the table from scratch.
+Page views never run a ``GROUP BY``.
+"""
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import job_cache
+from .locations import location_label, normalize_location
+from .models import JobListing, LocationFacet
+
+MAX_FACETS = 15
+
+
+# -----------------------------
+# Incremental updates
+# -----------------------------
+def _adjust(key, delta):
+    if not key:
+        return
+    if delta > 0:
+        LocationFacet.objects.get_or_create(key=key, defaults={'label': location_label(key)})
+    LocationFacet.objects.filter(key=key).update(job_count=F('job_count') + delta)
+
+
+def job_moved(old_key, new_key):
+    """A job was created (``old_key=None``), deleted (``new_key=None``) or moved."""
+    if old_key == new_key:
+        return
+    with transaction.atomic():
+        _adjust(old_key, -1)
+        _adjust(new_key, 1)
+
+
+def add_jobs(jobs, sign=1):
+    """Count jobs written with ``bulk_create``, which skips the signals."""
+    with transaction.atomic():
+        for key, count in Counter(job.location_key for job in jobs).items():
+            _adjust(key, sign * count)
+
+
+def remove_jobs(jobs):
+    """Uncount jobs deleted without the signals (archival)."""
+    add_jobs(jobs, sign=-1)
+
+
+def renormalize(batch_size=2000):
+    """Recompute ``location_key`` for every job, e.g. after ALIASES changed. Returns the jobs changed."""
+    changed, batch = 0, []
+    jobs = JobListing.objects.only('id', 'location', 'location_key').order_by('id')
+    for job in jobs.iterator(chunk_size=batch_size):
+        key = normalize_location(job.location)
+        if key != job.location_key:
+            job.location_key = key
+            batch.append(job)
+        if len(batch) >= batch_size:
+            JobListing.objects.bulk_update(batch, ['location_key'])
+            changed += len(batch)
+            batch = []
+    if batch:
+        JobListing.objects.bulk_update(batch, ['location_key'])
+        changed += len(batch)
+    return changed
+
+
+def rebuild():
+    """Recompute every count from the job table. Returns the number of facets."""
+    counts = (
+        JobListing.objects.exclude(location_key='').order_by()
+        .values('location_key').annotate(n=Count('id'))
+    )
+    facets = [
+        LocationFacet(key=row['location_key'], label=location_label(row['location_key']), job_count=row['n'])
+        for row in counts.iterator()
+    ]
+    with transaction.atomic():
+        LocationFacet.objects.all().delete()
+        LocationFacet.objects.bulk_create(facets, batch_size=1000)
+    transaction.on_commit(lambda: job_cache.bump('all'))
+    return len(facets)
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def _top_facets(limit):
+    return list(
+        LocationFacet.objects.filter(job_count__gt=0)
+        .order_by('-job_count', 'key')
+        .values('key', 'label', 'job_count')[:limit]
+    )
+
+
+def location_facets(limit=MAX_FACETS):
+    """The ``limit`` biggest locations as ``[{'key', 'label', 'job_count'}, ...]``."""
+    key = job_cache.versioned_key('facets:locations', ['all'], limit)
+    facets = cache.get(key)
+    if facets is None:
+        facets = _top_facets(limit)
+        cache.set(key, facets, timeout=job_cache.LIST_TIMEOUT)
+    return facets
+
+
+async def alocation_facets(limit=MAX_FACETS):
+    key = await job_cache.aversioned_key('facets:locations', ['all'], limit)
+    facets = await cache.aget(key)
+    if facets is None:
+        facets = await sync_to_async(_top_facets)(limit)
+        await cache.aset(key, facets, timeout=job_cache.LIST_TIMEOUT)
+    return facets
@@ -0,0 +1,220 @@
+"""
+Featured jobs for the home page.
+
+Instead of caching every JobListing row, only a compact pool of job ids is
+kept: a Redis set when the default cache is django-redis, or an in-process
+``MemoryPool`` otherwise. Picking k featured jobs is O(k) and only those k
+rows are fetched from the database. The pool is kept up to date
+incrementally from the JobListing signals (see ``users/signals.py``), by
+imports and by archival. Seeding retires it by bumping its generation (see
+``users/job_cache.py``).
+
+In Redis the pool is built by one worker (a ``cache.add`` lock) into a
+separate ``:building`` set that is renamed into place when it is complete.
+``add_to_pool`` adds to both sets, if they exist, in one script, so a job
+created while the ids are being read is not lost. Both sets hold a
+``SENTINEL`` id, so an empty pool still exists and a building set is never
+empty. ``LIVE_POOL_KEY`` names the last complete pool: while a new one is
+being built, other workers keep sampling that one instead of showing no
+featured jobs. A replaced pool expires shortly after.
+
+The in-process pool is per process and best-effort, like LocMemCache
+itself; it is enough for a single dev process or the tests.
+"""
+import random
+import threading
+import time
+from array import array
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from . import job_cache
+from .models import JobListing
+from .utils.cache import get_redis_connection
+
+POOL_TIMEOUT = 60 * 60 * 24
+BUILD_LOCK_KEY = 'featured_jobs:build:{}'
+BUILD_LOCK_TIMEOUT = 60 * 5
+LIVE_POOL_KEY = 'featured_jobs:live'
+# Never a job id; keeps empty and half-built sets in existence
+SENTINEL = 0
+
+ADD_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('exists', key) == 1 then
+        redis.call('sadd', key, unpack(ARGV))
+    end
+end
+"""
+# Ids per SADD; keeps the script's unpack() within Lua's stack limit
+CHUNK_SIZE = 5000
+
+
+def _build_pool():
+    ids = JobListing.objects.order_by().values_list('id', flat=True)
+    return array('q', ids.iterator(chunk_size=5000))
+
+
+class MemoryPool:
+    """
+    In-process stand-in for the Redis set. Ids are kept in an array for O(1)
+    sampling, with their positions for O(1) membership and removal.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._expires = 0.0
+        self._ids = array('q')
+        self._positions = {}
+
+    def _current(self, key):
+        return self._key == key and self._expires > time.monotonic()
+
+    def sample(self, key, k):
+        """Up to ``k`` random ids, or None when the pool for ``key`` isn't built."""
+        with self._lock:
+            if not self._current(key):
+                return None
+            return [self._ids[i] for i in random.sample(range(len(self._ids)), min(len(self._ids), k))]
+
+    def load(self, key, ids):
+        with self._lock:
+            self._key, self._expires = key, time.monotonic() + POOL_TIMEOUT
+            self._ids = array('q', ids)
+            self._positions = {job_id: i for i, job_id in enumerate(self._ids)}
+
+    def add(self, key, job_ids):
+        with self._lock:
+            if not self._current(key):
+                return
+            for job_id in job_ids:
+                if job_id not in self._positions:
+                    self._positions[job_id] = len(self._ids)
+                    self._ids.append(job_id)
+
+    def remove(self, key, job_ids):
+        with self._lock:
+            if not self._current(key):
+                return
+            for job_id in job_ids:
+                i = self._positions.pop(job_id, None)
+                if i is None:
+                    continue
+                # Move the last id into the hole
+                last = self._ids.pop()
+                if last != job_id:
+                    self._ids[i] = last
+                    self._positions[last] = i
+
+    def clear(self):
+        with self._lock:
+            self._key = None
+            self._ids = array('q')
+            self._positions = {}
+
+
+memory_pool = MemoryPool()
+
+
+def _redis_keys():
+    pool_key = job_cache.featured_pool_key()
+    return pool_key, cache.make_key(pool_key), cache.make_key(f'{pool_key}:building')
+
+
+def _build_redis_pool(client, key, building_key):
+    with client.pipeline() as pipe:
+        pipe.delete(building_key)
+        pipe.sadd(building_key, SENTINEL)
+        pipe.expire(building_key, BUILD_LOCK_TIMEOUT)
+        pipe.execute()
+    # From here on add_to_pool also adds to the building set
+    pool = _build_pool()
+    for start in range(0, len(pool), CHUNK_SIZE):
+        client.sadd(building_key, *pool[start:start + CHUNK_SIZE])
+    live_key = cache.make_key(LIVE_POOL_KEY)
+    with client.pipeline() as pipe:
+        pipe.rename(building_key, key)
+        pipe.expire(key, POOL_TIMEOUT)
+        pipe.getset(live_key, key)
+        pipe.expire(live_key, POOL_TIMEOUT)
+        previous = pipe.execute()[2]
+    if previous is not None and previous.decode() != key:
+        # Workers that read the old name just before the swap can still sample it
+        client.expire(previous, BUILD_LOCK_TIMEOUT)
+
+
+def _sample_ids(k):
+    client = get_redis_connection()
+    if client is not None:
+        pool_key, key, building_key = _redis_keys()
+        if not client.exists(key):
+            lock_key = BUILD_LOCK_KEY.format(pool_key)
+            if not cache.add(lock_key, True, timeout=BUILD_LOCK_TIMEOUT):
+                # Another worker is building it; sample the previous pool until it is done
+                key = client.get(cache.make_key(LIVE_POOL_KEY))
+                if key is None:
+                    return []
+            else:
+                try:
+                    _build_redis_pool(client, key, building_key)
+                finally:
+                    cache.delete(lock_key)
+        sampled = (int(job_id) for job_id in client.srandmember(key, k + 1))
+        return [job_id for job_id in sampled if job_id != SENTINEL][:k]
+
+    key = job_cache.featured_pool_key()
+    ids = memory_pool.sample(key, k)
+    if ids is None:
+        memory_pool.load(key, _build_pool())
+        ids = memory_pool.sample(key, k)
+    return ids
+
+
+def get_featured_jobs(k=3):
+    """Return up to ``k`` random jobs, fetching only the sampled rows."""
+    ids = _sample_ids(k)
+    if not ids:
+        return []
+    return list(JobListing.objects.for_list().filter(id__in=ids))
+
+
+async def aget_featured_jobs(k=3):
+    ids = await sync_to_async(_sample_ids)(k)
+    if not ids:
+        return []
+    return [job async for job in JobListing.objects.for_list().filter(id__in=ids)]
+
+
+def add_to_pool(*job_ids):
+    """Add newly created jobs to the pool. A pool that isn't built yet is left alone."""
+    if not job_ids:
+        return
+    client = get_redis_connection()
+    if client is not None:
+        _, key, building_key = _redis_keys()
+        for start in range(0, len(job_ids), CHUNK_SIZE):
+            client.eval(ADD_SCRIPT, 2, key, building_key, *job_ids[start:start + CHUNK_SIZE])
+        return
+    memory_pool.add(job_cache.featured_pool_key(), job_ids)
+
+
+def remove_from_pool(*job_ids):
+    """Drop deleted (or archived) jobs from the pool."""
+    if not job_ids:
+        return
+    client = get_redis_connection()
+    if client is not None:
+        _, key, building_key = _redis_keys()
+        with client.pipeline() as pipe:
+            pipe.srem(key, *job_ids)
+            pipe.srem(building_key, *job_ids)
+            pipe.execute()
+        return
+    memory_pool.remove(job_cache.featured_pool_key(), job_ids)
+
+
+def invalidate_pool():
+    """Retire the pool; a new one is built from the ids on the next home page hit."""
+    job_cache.bump('featured')
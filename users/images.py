@@ -0,0 +1,124 @@
+"""
+Profile image pipeline.
+
+Uploads are saved as they come and then re-encoded by the
+``process_profile_image`` Celery task:
+
+* EXIF orientation is applied and all metadata (EXIF, GPS, ICC, comments)
+  is dropped;
+* JPEGs are decoded with ``Image.draft`` so a 12 MP phone photo is scaled
+  down by the decoder instead of being expanded in memory at full size, and
+  the file is read from storage in chunks by Pillow rather than loaded whole;
+* the original is replaced by a JPEG no larger than ``MAX_ORIGINAL_SIZE``;
+* square thumbnails are written at ``VARIANT_SIZES`` in JPEG and WebP.
+
+The variants are recorded on ``UserProfile.image_variants`` and served with
+``srcset`` so browsers download the smallest one that fits.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = (80, 160, 320)
+MAX_ORIGINAL_SIZE = 1024
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+}
+VARIANT_DIR = 'profile_pics/variants'
+
+
+def _encode(image, fmt):
+    pil_format, _, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _open_normalized(file):
+    """Decode ``file`` at no more than ``MAX_ORIGINAL_SIZE``, upright and without metadata."""
+    image = Image.open(file)
+    # For JPEGs, let the decoder downscale by a power of two (cheap, and
+    # the full-size bitmap never exists in memory)
+    image.draft('RGB', (MAX_ORIGINAL_SIZE, MAX_ORIGINAL_SIZE))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    image.thumbnail((MAX_ORIGINAL_SIZE, MAX_ORIGINAL_SIZE), Image.LANCZOS)
+    image.info = {}
+    return image
+
+
+def delete_variants(variants):
+    for names in (variants or {}).get('files', {}).values():
+        for name in names.values():
+            default_storage.delete(name)
+
+
+def process_profile_image(profile_id, image_name):
+    """
+    Re-encode a profile's uploaded image and write its variants. Does nothing
+    if the profile has since changed or removed its image. Returns the number
+    of bytes saved on the original, or None if nothing was done.
+    """
+    profile = UserProfile.objects.filter(id=profile_id).first()
+    if profile is None or profile.profile_image.name != image_name:
+        return None
+
+    storage = profile.profile_image.storage
+    original_bytes = storage.size(image_name)
+    try:
+        with storage.open(image_name, 'rb') as file:
+            image = _open_normalized(file)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        logger.warning("Could not process profile image %s: %s", image_name, e)
+        return None
+
+    stem = f"{profile.id}_{os.urandom(4).hex()}"
+    files = {fmt: {} for fmt in FORMATS}
+    variant_bytes = {fmt: {} for fmt in FORMATS}
+    for size in VARIANT_SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for fmt, (_, extension, _) in FORMATS.items():
+            data = _encode(thumbnail, fmt)
+            name = storage.save(f"{VARIANT_DIR}/{stem}_{size}.{extension}", ContentFile(data))
+            files[fmt][str(size)] = name
+            variant_bytes[fmt][str(size)] = len(data)
+
+    normalized = _encode(image, 'jpeg')
+    new_name = storage.save(f"profile_pics/{stem}.jpg", ContentFile(normalized))
+
+    # Swap in the new files unless the user uploaded another image meanwhile
+    updated = UserProfile.objects.filter(id=profile_id, profile_image=image_name).update(
+        profile_image=new_name,
+        image_variants={
+            'files': files,
+            'bytes': variant_bytes,
+            'original_bytes': original_bytes,
+            'processed_bytes': len(normalized),
+        },
+    )
+    if not updated:
+        delete_variants({'files': {**files, 'original': {'0': new_name}}})
+        return None
+
+    storage.delete(image_name)
+    delete_variants(profile.image_variants)
+
+    saved = original_bytes - len(normalized)
+    logger.info(
+        "Processed profile image for profile %s: %s -> %s bytes (%s saved); a %spx WebP thumbnail is %s bytes",
+        profile_id, original_bytes, len(normalized), saved, VARIANT_SIZES[1], variant_bytes['webp'][str(VARIANT_SIZES[1])],
+    )
+    return saved
@@ -0,0 +1,137 @@
+"""
+Streaming bulk import of job postings from CSV or JSON Lines.
+
+Rows are read one at a time, validated with ``JobListingForm`` exactly like a
+posting made through ``create_job``, and written with ``bulk_create`` in
+chunks, one transaction per chunk. Memory use does not depend on the size of
+the input: invalid rows are handed to an ``on_error`` callback instead of
+being collected, and caches are invalidated once at the end.
+
+CSV files need a header row with ``title,company,location,description``;
+JSONL files hold one JSON object with those keys per line.
+"""
+import csv
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import facets, featured, job_cache, search
+from .forms import JobListingForm
+from .models import JobListing
+from .utils.tasks import refresh_job_matrix_dev
+
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportResult:
+    def __init__(self, max_errors=50):
+        self.created = 0
+        self.failed = 0
+        self.errors = []  # first ``max_errors`` (line, message) pairs, for display
+        self.max_errors = max_errors
+        self.stopped = None  # why the import ended before the end of the file, if it did
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.json', '.ndjson')) else 'csv'
+
+
+def iter_rows(stream, fmt):
+    """Yield ``(line_number, row_dict_or_None, error)`` for each record of a text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, row, None
+
+
+def format_form_errors(form):
+    return '; '.join(
+        f"{field}: {' '.join(messages)}" for field, messages in form.errors.items()
+    )
+
+
+def _write_batch(batch):
+    with transaction.atomic():
+        JobListing.objects.bulk_create(batch)
+        # bulk_create skips the post_save signal, so index and count the chunk here
+        search.index_jobs(batch)
+        facets.add_jobs(batch)
+        job_ids = [job.pk for job in batch]
+        transaction.on_commit(lambda: featured.add_to_pool(*job_ids))
+
+
+def import_jobs(stream, fmt, created_by, batch_size=500, on_error=None, max_errors=50):
+    """
+    Import jobs from a text ``stream`` in ``fmt`` ('csv' or 'jsonl'), posted
+    as ``created_by``. ``on_error(line, message)`` is called for every
+    rejected row. Returns an ``ImportResult``.
+
+    A stream that fails to decode stops the import: the rows read before
+    that point are kept (earlier chunks are already committed) and
+    ``result.stopped`` says where it stopped.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    result = ImportResult(max_errors=max_errors)
+    batch = []
+    line = 0
+    try:
+        for line, row, error in iter_rows(stream, fmt):
+            if error is None:
+                form = JobListingForm(data=row)
+                if form.is_valid():
+                    job = form.save(commit=False)
+                    job.created_by = created_by
+                    job.refresh_derived_fields()
+                    batch.append(job)
+                else:
+                    error = format_form_errors(form)
+
+            if error is not None:
+                result.add_error(line, error)
+                if on_error:
+                    on_error(line, error)
+
+            if len(batch) >= batch_size:
+                _write_batch(batch)
+                result.created += len(batch)
+                batch = []
+    except UnicodeDecodeError:
+        # Raised by a decoding stream (TextIOWrapper) as it reaches the bad bytes
+        result.stopped = f"The file is not valid UTF-8 after line {line}"
+
+    if batch:
+        _write_batch(batch)
+        result.created += len(batch)
+
+    if result.created:
+        jobs_imported(created_by)
+    return result
+
+
+def jobs_imported(created_by):
+    """Invalidate everything derived from the job table, once per import."""
+    job_cache.jobs_changed_in_bulk([created_by.pk], featured=False)
+    cache.delete(search.DOC_COUNT_KEY)
+    refresh_job_matrix_dev()
@@ -0,0 +1,125 @@
+"""
+Generation-versioned cache keys for job data.
+
+Every cached piece of job data embeds one or more generation counters in its
+key. Changing a job bumps its counters (``cache.incr``), which makes all keys
+built from the old generations unreachable at once; they simply age out.
+Invalidation is therefore O(1), needs no key scanning and behaves the same on
+LocMemCache and django-redis.
+
+Generations:
+    all               any job was created, edited or deleted
+    job:<id>          that job changed
+    recruiter:<id>    one of that recruiter's jobs changed
+    featured          the home page id pool must be rebuilt
+    perms             object permissions of some group changed
+    perms:user:<id>   that user's object permissions or groups changed
+"""
+import time
+
+from django.core.cache import cache
+
+GENERATION_KEY = 'jobs:gen:{}'
+
+LIST_TIMEOUT = 60 * 5
+DETAIL_TIMEOUT = 60 * 15
+
+
+def _fresh_generation():
+    # Time based, so a generation lost to eviction never comes back with a
+    # value that older cache keys were built from
+    return int(time.time() * 1000)
+
+
+def generations(*names):
+    """Current generation of each name, creating missing ones."""
+    keys = {name: GENERATION_KEY.format(name) for name in names}
+    found = cache.get_many(keys.values())
+    result = {}
+    for name, key in keys.items():
+        if key not in found:
+            cache.add(key, _fresh_generation(), timeout=None)
+            found[key] = cache.get(key)
+        result[name] = found[key]
+    return result
+
+
+async def agenerations(*names):
+    keys = {name: GENERATION_KEY.format(name) for name in names}
+    found = await cache.aget_many(keys.values())
+    result = {}
+    for name, key in keys.items():
+        if key not in found:
+            await cache.aadd(key, _fresh_generation(), timeout=None)
+            found[key] = await cache.aget(key)
+        result[name] = found[key]
+    return result
+
+
+def bump(*names):
+    for name in names:
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _fresh_generation(), timeout=None)
+
+
+def versioned_key(prefix, names, *parts):
+    return _join(prefix, names, generations(*names), parts)
+
+
+async def aversioned_key(prefix, names, *parts):
+    return _join(prefix, names, await agenerations(*names), parts)
+
+
+def _join(prefix, names, gens, parts):
+    version = '.'.join(str(gens[name]) for name in names)
+    return ':'.join([prefix, version, *map(str, parts)])
+
+
+# -----------------------------
+# Keys used by the views
+# -----------------------------
+def list_scope(recruiter_id=None):
+    return [f'recruiter:{recruiter_id}'] if recruiter_id else ['all']
+
+
+def list_key(recruiter_id=None, *parts):
+    """Key for a jobs list page (or its total), all jobs or one recruiter's."""
+    return versioned_key('jobs:list', list_scope(recruiter_id), recruiter_id or 'all', *parts)
+
+
+async def alist_key(recruiter_id=None, *parts):
+    return await aversioned_key('jobs:list', list_scope(recruiter_id), recruiter_id or 'all', *parts)
+
+
+def detail_key(job_id):
+    return versioned_key('jobs:detail', [f'job:{job_id}'], job_id)
+
+
+async def adetail_key(job_id):
+    return await aversioned_key('jobs:detail', [f'job:{job_id}'], job_id)
+
+
+def featured_pool_key():
+    return versioned_key('featured_jobs:pool', ['featured'])
+
+
+# -----------------------------
+# Invalidation
+# -----------------------------
+def job_changed(job_id, recruiter_id):
+    bump('all', f'job:{job_id}', f'recruiter:{recruiter_id}')
+
+
+def jobs_changed_in_bulk(recruiter_ids=(), featured=True):
+    """
+    For bulk writes that bypass the model signals (imports, archival).
+    ``featured=False`` keeps the featured pool, for callers that update it
+    themselves.
+    """
+    names = ['all', *(f'recruiter:{recruiter_id}' for recruiter_id in recruiter_ids)]
+    if featured:
+        names.append('featured')
+    bump(*names)
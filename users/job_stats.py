@@ -0,0 +1,213 @@
+"""
+Per-job numbers for recruiters: applicants and views.
+
+Views are counted in the request path without touching the database.
+``count_job_views`` adds one to the job's field of a Redis hash
+(``HINCRBY``), unless the same session (or, for visitors without one, the
+same client) was already counted for that job within
+``JOB_VIEW_DEDUP_SECONDS``. It wraps the page cache, so views served from
+the cache count too. The ``flush_job_views`` beat task moves the buffered
+deltas into ``JobListing.view_count`` with one ``UPDATE ... CASE`` per
+batch of jobs in a single transaction, so a hot job gets one write per
+flush instead of one per view.
+
+Without django-redis the buffer is an in-process Counter, which is enough
+for a single dev process or the tests.
+
+``applicant_count`` is kept by ``users.applications``. List pages read both
+counters for the jobs being shown (``with_live_counts``) rather than
+caching them with the page.
+"""
+import hashlib
+import logging
+import threading
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import JobListing
+from .throttling import client_ident
+from .utils.cache import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = 'views:pending'
+FLUSHING_KEY = 'views:flushing'
+SEEN_KEY = 'views:seen:{}:{}'
+FLUSH_LOCK_KEY = 'views:flush:lock'
+FLUSH_LOCK_TIMEOUT = 60 * 5
+FLUSH_BATCH_SIZE = 500
+MOST_VIEWED = 5
+
+
+def dedup_window():
+    return getattr(settings, 'JOB_VIEW_DEDUP_SECONDS', 60 * 30)
+
+
+# -----------------------------
+# Buffer
+# -----------------------------
+class MemoryViewBuffer:
+    """In-process stand-in for the Redis hash."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+
+    def add(self, deltas):
+        with self._lock:
+            self._pending.update(deltas)
+
+    def take(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        return dict(pending)
+
+    def peek(self, job_ids):
+        with self._lock:
+            return {job_id: self._pending.get(job_id, 0) for job_id in job_ids}
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+
+memory_buffer = MemoryViewBuffer()
+
+
+def _viewer(request):
+    session = getattr(request, 'session', None)
+    viewer = (session and session.session_key) or f"{client_ident(request)}:{request.META.get('HTTP_USER_AGENT', '')}"
+    return hashlib.md5(viewer.encode()).hexdigest()
+
+
+def record_view(request, job_id):
+    """Count a view of ``job_id`` unless this viewer was counted recently. Returns True if counted."""
+    if not cache.add(SEEN_KEY.format(job_id, _viewer(request)), True, timeout=dedup_window()):
+        return False
+    client = get_redis_connection()
+    if client is None:
+        memory_buffer.add({job_id: 1})
+    else:
+        client.hincrby(cache.make_key(BUFFER_KEY), job_id, 1)
+    return True
+
+
+def pending_views(job_ids):
+    """Views of ``job_ids`` not flushed to the database yet."""
+    client = get_redis_connection()
+    if client is None:
+        return memory_buffer.peek(job_ids)
+    if not job_ids:
+        return {}
+    values = client.hmget(cache.make_key(BUFFER_KEY), job_ids)
+    return {job_id: int(value or 0) for job_id, value in zip(job_ids, values)}
+
+
+def count_job_views(view_func):
+    """Count successful GETs of a job page (``job_id`` URL kwarg). Goes outside the page cache."""
+
+    def should_count(request, response):
+        return request.method == 'GET' and response.status_code == 200
+
+    if iscoroutinefunction(view_func):
+        record = sync_to_async(record_view, thread_sensitive=False)
+
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            response = await view_func(request, *args, **kwargs)
+            if should_count(request, response):
+                try:
+                    await record(request, kwargs['job_id'])
+                except Exception:
+                    logger.warning("Could not count a view of job %s", kwargs['job_id'], exc_info=True)
+            return response
+
+        return _wrapped_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if should_count(request, response):
+            try:
+                record_view(request, kwargs['job_id'])
+            except Exception:
+                logger.warning("Could not count a view of job %s", kwargs['job_id'], exc_info=True)
+        return response
+
+    return _wrapped_view
+
+
+# -----------------------------
+# Flushing
+# -----------------------------
+def _take_pending(client):
+    if client is None:
+        return memory_buffer.take()
+    buffer_key, flushing_key = cache.make_key(BUFFER_KEY), cache.make_key(FLUSHING_KEY)
+    # A flush that failed left its deltas under FLUSHING_KEY; apply those first
+    if not client.exists(flushing_key):
+        if not client.exists(buffer_key):
+            return {}
+        # New views go to a fresh hash while this one is written out
+        client.rename(buffer_key, flushing_key)
+    return {int(job_id): int(delta) for job_id, delta in client.hgetall(flushing_key).items()}
+
+
+def flush_views(batch_size=FLUSH_BATCH_SIZE):
+    """Add the buffered views to ``JobListing.view_count``. Returns the number of views flushed."""
+    client = get_redis_connection()
+    deltas = _take_pending(client)
+    if not deltas:
+        return 0
+    # Ids in order, so concurrent writers to the same rows lock them in the same order
+    items = sorted(deltas.items())
+    try:
+        with transaction.atomic():
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                JobListing.objects.filter(id__in=[job_id for job_id, _ in batch]).update(
+                    view_count=F('view_count') + Case(
+                        *[When(id=job_id, then=Value(delta)) for job_id, delta in batch],
+                        default=Value(0), output_field=IntegerField(),
+                    )
+                )
+    except Exception:
+        if client is None:
+            memory_buffer.add(deltas)
+        raise
+    if client is not None:
+        client.delete(cache.make_key(FLUSHING_KEY))
+    return sum(deltas.values())
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def with_live_counts(page_obj):
+    """Set current ``applicant_count`` and ``view_count`` on the jobs of a (possibly cached) page."""
+    jobs = list(page_obj.object_list)
+    job_ids = [job.pk for job in jobs]
+    counts = {
+        row[0]: row[1:]
+        for row in JobListing.objects.filter(id__in=job_ids).values_list('id', 'applicant_count', 'view_count')
+    }
+    pending = pending_views(job_ids)
+    for job in jobs:
+        job.applicant_count, job.view_count = counts.get(job.pk, (0, 0))
+        job.view_count += pending.get(job.pk, 0)
+    page_obj.object_list = jobs
+    return page_obj
+
+
+def most_viewed(recruiter_id, limit=MOST_VIEWED):
+    """The recruiter's ``limit`` most viewed jobs, as of the last flush."""
+    return list(
+        JobListing.objects.filter(created_by_id=recruiter_id, view_count__gt=0)
+        .order_by('-view_count', '-id').only('id', 'title', 'view_count')[:limit]
+    )
@@ -0,0 +1,39 @@
+"""
+Normalizing free-text job locations into facet keys.
+
+Kept free of model imports: ``users.models`` and the migrations use it.
+"""
+import re
+
+# Alternative names of the same place -> canonical key
+ALIASES = {
+    'bengaluru': 'bangalore',
+    'bombay': 'mumbai',
+    'new delhi': 'delhi',
+    'delhi ncr': 'delhi',
+    'gurugram': 'gurgaon',
+    'madras': 'chennai',
+    'calcutta': 'kolkata',
+    'poona': 'pune',
+    'wfh': 'remote',
+    'work from home': 'remote',
+    'anywhere': 'remote',
+}
+NON_WORD = re.compile(r'[^\w\s]+')
+
+
+def normalize_location(value):
+    """
+    Facet key for a location: lower case, first comma-separated part only
+    (drops state and country), punctuation and extra spaces removed, and
+    known alternative names mapped to one spelling. '' when unknown.
+    """
+    value = (value or '').split(',')[0].split('(')[0]
+    key = ' '.join(NON_WORD.sub(' ', value).casefold().split())
+    if key in ('', 'n a', 'na', 'none'):
+        return ''
+    return ALIASES.get(key, key)
+
+
+def location_label(key):
+    return key.title()
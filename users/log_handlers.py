@@ -0,0 +1,197 @@
+"""
+Non-blocking logging for request threads.
+
+``QueuedHandler`` only puts records on a bounded in-memory queue; a
+``QueueListener`` thread formats them and does the actual writes to the
+console and the log file. When the queue is full (the disk has stalled for
+a while) new records are dropped and counted instead of blocking the
+request, and a warning with the number dropped is logged once the queue has
+room again.
+
+The listener thread is started lazily by the first record a process logs
+and restarted when the PID changes, so gunicorn workers forked from a
+master that already logged get their own queue and thread.
+
+Configured from ``LOGGING`` (see settings), e.g.::
+
+    'queue': {
+        '()': 'users.log_handlers.QueuedHandler',
+        'targets': ['cfg://handlers.console', 'cfg://handlers.file'],
+        'queue_size': 10000,
+    }
+
+This module is imported while logging is configured, before the app
+registry is ready, so it must not import models.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra=`` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'pid': record.process,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotates to ``file.1`` .. ``file.<backupCount>`` when the file reaches
+    ``maxBytes`` or is older than ``interval`` seconds, whichever comes first.
+
+    Several processes may share the file: rotation is done under an
+    ``flock`` on ``<file>.lock`` and skipped if another process already
+    rotated, and a process whose file was rotated away reopens it.
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, interval=60 * 60 * 24, encoding=None, delay=False):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding, delay=delay)
+        self.interval = interval
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self):
+        try:
+            started = os.stat(self.baseFilename).st_mtime
+        except FileNotFoundError:
+            started = time.time()
+        return started + self.interval
+
+    def _rotated_away(self):
+        # Another process renamed the file we are writing to
+        if self.stream is None:
+            return False
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self.stream.fileno())
+        return (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino)
+
+    def _reopen(self):
+        if self.stream:
+            self.stream.close()
+        self.stream = self._open()
+        self.rollover_at = self._next_rollover()
+
+    def shouldRollover(self, record):
+        if self._rotated_away():
+            self._reopen()
+            return False
+        if time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        if fcntl is None:
+            super().doRollover()
+            self.rollover_at = time.time() + self.interval
+            return
+
+        with open(f"{self.baseFilename}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self._rotated_away():
+                    self._reopen()
+                else:
+                    super().doRollover()
+                    self.rollover_at = time.time() + self.interval
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class QueuedHandler(QueueHandler):
+    """
+    Hands records to ``targets`` through a queue of at most ``queue_size``
+    records. Target handlers keep their own levels and formatters.
+    """
+
+    def __init__(self, targets, queue_size=10000):
+        # A ConvertingList only resolves 'cfg://' entries on indexing
+        self.targets = [targets[i] for i in range(len(targets))]
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+        super().__init__(queue.Queue(maxsize=queue_size))
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # After a fork the parent's listener thread is gone; start over
+            self.queue = queue.Queue(maxsize=self.queue_size)
+            self.dropped = 0
+            self._listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self._stop, self._listener)
+
+    @staticmethod
+    def _stop(listener):
+        if listener._thread is not None:
+            listener.stop()
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare, but keeps the traceback in exc_text for
+        # the target formatters instead of folding it into the message
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            notice = logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"Log queue was full; dropped {dropped} records", 'dropped_records': dropped,
+            })
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                self.dropped += dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
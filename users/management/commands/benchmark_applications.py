@@ -0,0 +1,113 @@
+import json
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from users.applications import apply
+from users.models import JobApplication, JobListing, UserProfile
+
+from .benchmark_routes import QueryCounter
+from .benchmark_search import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Have many synthetic job seekers apply to the same job from concurrent threads and report "
+        "applications per second, latency and queries per attempt, then check the job's applicant "
+        "count against the application rows. The users and the job are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seekers', type=int, default=500, help="Distinct applicants.")
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent appliers.")
+        parser.add_argument('--repeat', type=int, default=2,
+                            help="Attempts per seeker; the extra ones exercise the already-applied path.")
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        prefix = f"bench_apply_{int(time.time())}_"
+        try:
+            job, seekers = self.setup(prefix, options['seekers'])
+            report = self.run(job, seekers, options['threads'], options['repeat'])
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload)
+        self.stdout.write(payload)
+
+    def setup(self, prefix, count):
+        recruiter = User.objects.create_user(f"{prefix}recruiter")
+        UserProfile.objects.create(user=recruiter, role='RECRUITER')
+        job = JobListing.objects.create(
+            title="Popular Job", company="Benchmark", location="Bangalore",
+            description="A job everyone applies to.", created_by=recruiter,
+        )
+        # Unusable passwords: hashing one per user would dominate the setup
+        User.objects.bulk_create([User(username=f"{prefix}{i}", password='!') for i in range(count)])
+        seekers = list(User.objects.filter(username__startswith=prefix).exclude(id=recruiter.id))
+        UserProfile.objects.bulk_create([UserProfile(user=seeker, role='JOB_SEEKER') for seeker in seekers])
+        return job, seekers
+
+    def run(self, job, seekers, threads, repeat):
+        attempts = [seeker for seeker in seekers for _ in range(repeat)]
+        random.shuffle(attempts)
+        results = {'accepted': 0, 'duplicates': 0, 'errors': 0}
+        samples, counters, lock = [], [], threading.Lock()
+
+        def worker(chunk):
+            counter = QueryCounter()
+            local = {'accepted': 0, 'duplicates': 0, 'errors': 0}
+            timings = []
+            try:
+                with connection.execute_wrapper(counter):
+                    for seeker in chunk:
+                        begun = time.perf_counter()
+                        try:
+                            local['accepted' if apply(job.id, seeker) else 'duplicates'] += 1
+                        except Exception as e:
+                            local['errors'] += 1
+                            self.stderr.write(f"apply failed: {e}")
+                        timings.append((time.perf_counter() - begun) * 1000)
+            finally:
+                connections.close_all()
+            with lock:
+                for key, value in local.items():
+                    results[key] += value
+                samples.extend(timings)
+                counters.append(counter.count)
+
+        workers = [threading.Thread(target=worker, args=(attempts[i::threads],)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        job.refresh_from_db(fields=['applicant_count'])
+        rows = JobApplication.objects.filter(job=job).count()
+        if job.applicant_count != rows or rows != results['accepted']:
+            raise CommandError(
+                f"applicant_count {job.applicant_count}, {rows} application rows, {results['accepted']} accepted"
+            )
+
+        report = {
+            'seekers': len(seekers),
+            'threads': threads,
+            'attempts': len(attempts),
+            **results,
+            'attempts_per_second': round(len(attempts) / elapsed, 2),
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'queries_per_attempt': round(sum(counters) / len(attempts), 2),
+            'applicant_count': job.applicant_count,
+        }
+        self.stderr.write(f"{report['attempts_per_second']} attempts/s, {report['applicant_count']} applicants")
+        return report
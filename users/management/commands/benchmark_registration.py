@@ -0,0 +1,99 @@
+import json
+import time
+from contextlib import nullcontext
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from users.models import UserProfile
+from users.registration import RegistrationError, register_user
+
+from .benchmark_routes import QueryCounter
+from .benchmark_search import percentile
+
+PASSWORD = 'bench-Passw0rd!'
+PROFILE = {
+    'location': 'Bangalore', 'phone_number': '9876543210', 'skills': 'python, django',
+    'experience': 3, 'education': 'B.Tech',
+}
+
+
+def legacy_register(username, email, password):
+    """The sign-up sequence register_view used before users.registration."""
+    if User.objects.filter(username=username).exists():
+        raise RegistrationError("Username already exists")
+    if email and User.objects.filter(email=email).exists():
+        raise RegistrationError("Email already exists")
+    user = User.objects.create_user(username=username, email=email)
+    user.set_password(password)
+    user.save()
+    UserProfile.objects.create(user=user, role='JOB_SEEKER', **PROFILE)
+    return user
+
+
+def current_register(username, email, password):
+    return register_user(username, email, password, **PROFILE)
+
+
+PATHS = {'legacy': legacy_register, 'current': current_register}
+
+
+class Command(BaseCommand):
+    help = (
+        "Register synthetic users through the old and the current sign-up path and report "
+        "registrations per second, latency and queries per registration. The users are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help="Registrations per path.")
+        parser.add_argument('--paths', nargs='*', default=list(PATHS), choices=list(PATHS))
+        parser.add_argument('--fast-hasher', action='store_true',
+                            help="Hash with MD5 so the numbers show database cost rather than PBKDF2 time.")
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        prefix = f"bench_reg_{int(time.time())}_"
+        report = {'count': options['count'], 'fast_hasher': options['fast_hasher'], 'paths': {}}
+        hashers = ['django.contrib.auth.hashers.MD5PasswordHasher'] if options['fast_hasher'] else None
+        try:
+            with override_settings(PASSWORD_HASHERS=hashers) if hashers else nullcontext():
+                for name in options['paths']:
+                    report['paths'][name] = self.run_path(name, f"{prefix}{name}_", options['count'])
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload)
+        self.stdout.write(payload)
+
+    def run_path(self, name, prefix, count):
+        register = PATHS[name]
+        counter = QueryCounter()
+        samples = []
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            for i in range(count):
+                begun = time.perf_counter()
+                register(f"{prefix}{i}", f"{prefix}{i}@example.com", PASSWORD)
+                samples.append((time.perf_counter() - begun) * 1000)
+        elapsed = time.perf_counter() - started
+
+        try:
+            register(f"{prefix}0", '', PASSWORD)
+        except RegistrationError:
+            pass
+        else:
+            raise CommandError(f"{name}: a duplicate username was accepted")
+
+        result = {
+            'registrations_per_second': round(count / elapsed, 2),
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'queries_per_registration': round(counter.count / count, 2),
+        }
+        self.stderr.write(f"{name}: {result['registrations_per_second']} registrations/s")
+        return result
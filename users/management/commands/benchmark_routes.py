@@ -0,0 +1,168 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from users.backends import forget_user_role
+from users.models import JobListing, UserProfile
+from users.seeding import SEED_PASSWORD, forget_cached_data, seed
+
+from .benchmark_search import percentile
+
+ANONYMOUS = 'anonymous'
+
+# (label, url name, method, needs a job id, extra data)
+ROUTES = [
+    ('home', 'home', 'get', False, None),
+    ('terms', 'terms', 'get', False, None),
+    ('jobs', 'jobs', 'get', False, None),
+    ('job-search', 'job-search', 'get', False, {'q': 'python django'}),
+    ('job-details', 'job-details', 'get', True, None),
+    ('edit_job', 'edit_job', 'get', True, None),
+    ('delete_job', 'delete_job', 'get', True, None),
+    ('create-job', 'create-job', 'get', False, None),
+    ('import-jobs', 'import-jobs', 'get', False, None),
+    ('register', 'register', 'get', False, None),
+    ('login', 'login', 'get', False, None),
+    ('login (POST)', 'login', 'post', False, 'credentials'),
+    ('logout_confirm', 'logout_confirm', 'get', False, None),
+    ('profile', 'profile', 'get', False, None),
+    ('edit_profile', 'edit_profile', 'get', False, None),
+    ('password_reset', 'password_reset', 'get', False, None),
+    ('api-jobs', 'api-jobs', 'get', False, None),
+    ('api-job-details', 'api-job-details', 'get', True, None),
+]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset inside a rolled-back transaction and drive every named route "
+        "with the test client, anonymously and as each role. Reports latency, throughput and "
+        "query counts per route as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--jobs', type=int, default=20_000)
+        parser.add_argument('--requests', type=int, default=50, help="Measured requests per route and identity.")
+        parser.add_argument('--warmup', type=int, default=3, help="Unmeasured requests before each run.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--routes', nargs='*', help="Only run these route labels.")
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        # The login POST measures authentication, not users.throttling
+        rest_framework = dict(settings.REST_FRAMEWORK)
+        rest_framework['DEFAULT_THROTTLE_RATES'] = {**rest_framework['DEFAULT_THROTTLE_RATES'], 'login': '1000000/s'}
+
+        setup_test_environment()
+        try:
+            # Sampled instrumentation would add its own hooks and logging to the timings
+            with override_settings(REST_FRAMEWORK=rest_framework, INSTRUMENTATION_SAMPLE_RATE=0.0):
+                report = self.run(options)
+        finally:
+            teardown_test_environment()
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload)
+        self.stdout.write(payload)
+
+        failed = [
+            f"{label} ({identity})"
+            for label, results in report['routes'].items()
+            for identity, result in results.items() if result.get('failed')
+        ]
+        if failed:
+            raise CommandError(f"Server errors on: {', '.join(failed)}")
+
+    def run(self, options):
+        report = {'dataset': {'users': options['users'], 'jobs': options['jobs']}, 'routes': {}}
+        routes = [route for route in ROUTES if not options['routes'] or route[0] in options['routes']]
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            by_role = seed(options['users'], options['jobs'], prefix=f"bench_{int(time.time())}_", seed=options['seed'])
+            report['dataset']['seed_seconds'] = round(time.perf_counter() - started, 2)
+
+            identities = {ANONYMOUS: None}
+            for role, _ in UserProfile.ROLE_CHOICES:
+                identities[role] = User.objects.select_related('userprofile').get(id=by_role[role][0])
+            recruiter = identities['RECRUITER']
+            job = JobListing.objects.filter(created_by=recruiter).first() or JobListing.objects.first()
+            seeker = identities['JOB_SEEKER']
+
+            for label, name, method, needs_job, data in routes:
+                url = reverse(name, kwargs={'job_id': job.id} if needs_job else None)
+                if data == 'credentials':
+                    data = {'username': seeker.username, 'password': SEED_PASSWORD}
+                report['routes'][label] = {
+                    identity: self.measure(user, method, url, data, options)
+                    for identity, user in identities.items()
+                    # Logging in is only meaningful for anonymous visitors
+                    if not (method == 'post' and user is not None)
+                }
+
+            transaction.set_rollback(True)
+
+        forget_cached_data([recruiter.id], [job.id])
+        for user in identities.values():
+            if user is not None:
+                forget_user_role(user.id)
+        return report
+
+    def measure(self, user, method, url, data, options):
+        def client():
+            # Server errors fail the route (see below) instead of aborting the whole run
+            c = Client(raise_request_exception=False)
+            if user is not None:
+                c.force_login(user)
+            return c
+
+        # POSTs change the client's session, so each one gets a fresh client
+        fresh_client = method == 'post'
+        shared = client()
+        samples, queries, statuses = [], [], {}
+        for i in range(options['warmup'] + options['requests']):
+            c = client() if fresh_client else shared
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                response = getattr(c, method)(url, data)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 500:
+                # An error page's timings are not a sample of the route
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                return {'status': statuses, 'failed': True}
+            if i < options['warmup']:
+                continue
+            samples.append(elapsed * 1000)
+            queries.append(counter.count)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        return {
+            'status': statuses,
+            'p50_ms': round(statistics.median(samples), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'throughput_rps': round(len(samples) / (sum(samples) / 1000), 1),
+            'queries': round(statistics.mean(queries), 1),
+            'max_queries': max(queries),
+        }
@@ -0,0 +1,81 @@
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.facets import add_jobs
+from users.models import JobListing
+from users.search import DOC_COUNT_KEY, index_jobs, search_jobs
+from users.seeding import synthetic_job
+
+QUERIES = ['python', 'data engineer', '"data engineer"', 'django postgres', 'pyth*', 'senior backend',
+           '"machine learning engineer" tensorflow', 'kube*', 'razorpay', 'remote golang']
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic jobs inside a rolled-back transaction and measure search query latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20, help="Runs per query.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+        parser.add_argument('--keep', action='store_true', help="Commit the synthetic jobs instead of rolling back.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        report = {}
+
+        with transaction.atomic():
+            user = User.objects.create(username=f"bench_search_{int(time.time())}")
+
+            started = time.perf_counter()
+            remaining = options['jobs']
+            while remaining > 0:
+                batch = [synthetic_job(rng, user) for _ in range(min(remaining, 2000))]
+                JobListing.objects.bulk_create(batch)
+                index_jobs(batch)
+                add_jobs(batch)
+                remaining -= len(batch)
+            report['seed_seconds'] = round(time.perf_counter() - started, 2)
+            report['jobs'] = options['jobs']
+            cache.delete(DOC_COUNT_KEY)
+
+            report['queries'] = {}
+            for query in QUERIES:
+                samples, hits = [], 0
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    hits = len(search_jobs(query))
+                    samples.append((time.perf_counter() - started) * 1000)
+                report['queries'][query] = {
+                    'results': hits,
+                    'p50_ms': round(statistics.median(samples), 2),
+                    'p95_ms': round(percentile(samples, 95), 2),
+                    'p99_ms': round(percentile(samples, 99), 2),
+                }
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"Seeded {report['jobs']} jobs in {report['seed_seconds']}s")
+        self.stdout.write(f"{'query':45} {'results':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for query, row in report['queries'].items():
+            self.stdout.write(
+                f"{query:45} {row['results']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}"
+            )
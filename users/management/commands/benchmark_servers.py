@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from users.models import JobListing, UserProfile
+
+from .benchmark_search import percentile
+
+HOST = '127.0.0.1'
+
+# name: (command line, extra environment)
+SERVERS = {
+    'wsgi': (['-m', 'gunicorn', 'jobportal.wsgi:application', '--workers', '{workers}',
+              '--bind', f'{HOST}:{{port}}', '--log-level', 'warning'], {'ASYNC_JOB_VIEWS': 'false'}),
+    'asgi': (['-m', 'uvicorn', 'jobportal.asgi:application', '--workers', '{workers}',
+              '--host', HOST, '--port', '{port}', '--no-access-log', '--log-level', 'warning'],
+             {'ASYNC_JOB_VIEWS': 'true'}),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns ``(status, keep_alive)``."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+async def connection_loop(port, path, cookie, deadline, samples, errors):
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: localhost\r\n"
+        + (f"Cookie: {cookie}\r\n" if cookie else '')
+        + "\r\n"
+    ).encode()
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            samples.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors[status] = errors.get(status, 0) + 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors['connection'] = errors.get('connection', 0) + 1
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def drive(port, path, cookie, concurrency, duration):
+    samples, errors = [], {}
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        connection_loop(port, path, cookie, deadline, samples, errors) for _ in range(concurrency)
+    ))
+    if not samples:
+        return {'requests': 0, 'errors': errors}
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / duration, 1),
+        'p50_ms': round(percentile(samples, 50), 2),
+        'p95_ms': round(percentile(samples, 95), 2),
+        'p99_ms': round(percentile(samples, 99), 2),
+        'errors': errors,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare gunicorn (sync WSGI views) with uvicorn (async views, ASYNC_JOB_VIEWS) at the same "
+        "worker count, driving home, jobs and job details with many concurrent keep-alive connections. "
+        "Runs against the current database; seed it first (seed_portal)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=50, help="Concurrent connections per run.")
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per route and server.")
+        parser.add_argument('--servers', nargs='*', default=list(SERVERS), choices=list(SERVERS))
+        parser.add_argument('--role', default='ADMIN', choices=[role for role, _ in UserProfile.ROLE_CHOICES],
+                            help="Role of the logged-in user for the authenticated routes.")
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        profile = UserProfile.objects.filter(role=options['role']).select_related('user').first()
+        job = JobListing.objects.order_by('-id').first()
+        if profile is None or job is None:
+            raise CommandError(f"Needs a {options['role']} user and at least one job; run seed_portal first.")
+
+        session = self.login_session(profile.user)
+        cookie = f"sessionid={session.session_key}"
+        routes = {
+            'home (anonymous)': (reverse('home'), None),
+            'home': (reverse('home'), cookie),
+            'jobs': (reverse('jobs'), cookie),
+            'job-details': (reverse('job-details', kwargs={'job_id': job.id}), cookie),
+        }
+
+        report = {
+            'workers': options['workers'], 'concurrency': options['concurrency'],
+            'duration_s': options['duration'], 'servers': {},
+        }
+        try:
+            for name in options['servers']:
+                report['servers'][name] = self.run_server(name, routes, options)
+        finally:
+            session.delete()
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload)
+        self.stdout.write(payload)
+
+    @staticmethod
+    def login_session(user):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'users.backends.ProfileModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session
+
+    def run_server(self, name, routes, options):
+        args, extra_env = SERVERS[name]
+        port = free_port()
+        command = [sys.executable] + [arg.format(workers=options['workers'], port=port) for arg in args]
+        # Requests are sent with ``Host: localhost``
+        env = {**os.environ, 'ALLOWED_HOSTS': 'localhost', **extra_env}
+        self.stderr.write(f"Starting {name}: {' '.join(command[1:])}")
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_for_port(port):
+                raise CommandError(f"{name} did not start on port {port}")
+            results = {}
+            for label, (path, cookie) in routes.items():
+                # Warm up caches and connections first
+                asyncio.run(drive(port, path, cookie, options['concurrency'], 1))
+                results[label] = asyncio.run(
+                    drive(port, path, cookie, options['concurrency'], options['duration'])
+                )
+                self.stderr.write(f"  {label}: {results[label].get('throughput_rps', 0)} req/s")
+            return results
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
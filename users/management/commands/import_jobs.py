@@ -0,0 +1,53 @@
+import csv
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importers import FORMATS, detect_format, import_jobs
+
+
+class Command(BaseCommand):
+    help = "Stream job postings from a CSV or JSONL file (or '-' for stdin) into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' to read stdin.")
+        parser.add_argument('--recruiter', required=True, help="Username the jobs are posted as.")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension, CSV otherwise.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--errors', help="Write the per-row error report to this CSV file.")
+
+    def handle(self, *args, **options):
+        try:
+            recruiter = User.objects.get(username=options['recruiter'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['recruiter']}' does not exist")
+
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+
+        report = open(options['errors'], 'w', encoding='utf-8', newline='') if options['errors'] else None
+        writer = csv.writer(report) if report else None
+        if writer:
+            writer.writerow(['line', 'error'])
+
+        def on_error(line, message):
+            if writer:
+                writer.writerow([line, message])
+            else:
+                self.stderr.write(f"line {line}: {message}")
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            result = import_jobs(stream, fmt, recruiter, batch_size=options['batch_size'], on_error=on_error)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if report:
+                report.close()
+
+        if result.stopped:
+            raise CommandError(
+                f"{result.stopped}; imported {result.created} jobs and rejected {result.failed} rows before that."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Imported {result.created} jobs, rejected {result.failed} rows."))
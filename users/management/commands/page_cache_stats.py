@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+import users.views  # noqa: F401  registers the cached views
+from users.page_cache import CACHED_VIEWS, OUTCOMES, counter_name
+from users.utils.cache import read_counters, reset_counters
+
+
+class Command(BaseCommand):
+    help = "Show full-page cache hits, stale hits and misses per view."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after reporting.")
+
+    def handle(self, *args, **options):
+        names = [counter_name(view, outcome) for view in sorted(CACHED_VIEWS) for outcome in OUTCOMES]
+        counters = read_counters(names)
+
+        report = {}
+        for view in sorted(CACHED_VIEWS):
+            row = {outcome: counters[counter_name(view, outcome)] for outcome in OUTCOMES}
+            served = row['hit'] + row['stale']
+            total = served + row['miss']
+            row['hit_ratio'] = round(served / total, 3) if total else None
+            report[view] = row
+
+        if options['reset']:
+            reset_counters(names)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"{'view':25} {'hits':>8} {'stale':>8} {'misses':>8} {'hit ratio':>10}")
+        for view, row in report.items():
+            ratio = '-' if row['hit_ratio'] is None else f"{row['hit_ratio']:.1%}"
+            self.stdout.write(f"{view:25} {row['hit']:>8} {row['stale']:>8} {row['miss']:>8} {ratio:>10}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from users import facets
+
+
+class Command(BaseCommand):
+    help = "Recount the location facets from the job table (and optionally re-normalize every job's location)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renormalize', action='store_true',
+                            help="Recompute each job's location_key first, e.g. after changing the aliases.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['renormalize']:
+            changed = facets.renormalize(batch_size=options['batch_size'])
+            self.stdout.write(f"Re-normalized {changed} job locations.")
+        count = facets.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} location facets."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from users.models import JobListing, SearchPosting
+from users.search import index_jobs
+
+
+class Command(BaseCommand):
+    help = "Rebuild the job search inverted index from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        SearchPosting.objects.all().delete()
+
+        batch, indexed = [], 0
+        for job in JobListing.objects.order_by('id').iterator(chunk_size=batch_size):
+            batch.append(job)
+            if len(batch) >= batch_size:
+                index_jobs(batch)
+                indexed += len(batch)
+                batch = []
+        index_jobs(batch)
+        indexed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} jobs."))
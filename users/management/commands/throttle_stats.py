@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from users.throttling import KINDS, rejected_counts, reset_rejected_counts
+
+
+class Command(BaseCommand):
+    help = "Show login and password-reset attempts rejected by the throttle, per IP and per account."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after reporting.")
+
+    def handle(self, *args, **options):
+        report = rejected_counts()
+        if options['reset']:
+            reset_rejected_counts()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"{'scope':16} {'by ip':>8} {'by account':>11}")
+        for scope, row in report.items():
+            self.stdout.write(f"{scope:16} {row[KINDS[0]]:>8} {row[KINDS[1]]:>11}")
@@ -0,0 +1,299 @@
+"""
+Per-request instrumentation.
+
+``InstrumentationMiddleware`` samples ``INSTRUMENTATION_SAMPLE_RATE`` of the
+requests. For a sampled request it records:
+- the number and total time of SQL queries;
+- cache hits and misses;
+- template render time and view time.
+
+The numbers are added as ``Server-Timing`` headers, so they show up in the
+browser's network panel, and logged as one JSON record on the
+``users.instrumentation`` logger. A query shape (SQL with the literals and
+IN-lists collapsed) seen more than ``INSTRUMENTATION_N_PLUS_ONE_THRESHOLD``
+times in one request is reported as a likely N+1.
+
+Queries are seen through ``connection.execute_wrapper()``, entered for the
+sampled request only. Cache hits and misses come from the ``Instrumented*Cache``
+backends and template time from ``InstrumentedDjangoTemplates``, which the
+settings configure in place of the stock ones. Requests that are not sampled
+only pay for one ``random()`` call and a contextvar lookup per cache or
+template call; with a sample rate of 0 the middleware is not loaded at all.
+"""
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate, reraise
+from django_redis.cache import RedisCache
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+logger = logging.getLogger('users.instrumentation')
+
+_current = ContextVar('request_metrics', default=None)
+
+SHAPE_LITERALS_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SHAPE_IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+def sql_shape(sql):
+    """SQL with literals and IN-lists collapsed, so repeats of one query compare equal."""
+    shape = SHAPE_LITERALS_RE.sub('?', sql)
+    return SHAPE_IN_LIST_RE.sub('(...)', shape)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        self.view_time = 0.0
+        self.in_cache_call = False
+
+    def record_query(self, sql, duration):
+        self.db_time += duration
+        self.queries += 1
+        self.shapes[sql_shape(sql)] += 1
+
+    def repeated_queries(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+# -----------------------------
+# SQL, cache and template hooks
+# -----------------------------
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+def _hook_queries():
+    """Add ``_record_query`` to this thread's connections until the returned stack is closed."""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(_record_query))
+    return stack
+
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """
+    Counts hits and misses of sampled requests. Mixed into the cache
+    backends configured in ``CACHES``; extra arguments (django-redis takes
+    ``client=``) are passed through untouched.
+    """
+
+    def get(self, key, default=None, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics.in_cache_call:
+            return super().get(key, default, *args, **kwargs)
+        metrics.in_cache_call = True
+        try:
+            value = super().get(key, _MISSING, *args, **kwargs)
+        finally:
+            metrics.in_cache_call = False
+        if value is _MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+
+    def get_many(self, keys, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics.in_cache_call:
+            return super().get_many(keys, *args, **kwargs)
+        keys = list(keys)
+        # Backends such as LocMemCache implement get_many() with get()
+        metrics.in_cache_call = True
+        try:
+            found = super().get_many(keys, *args, **kwargs)
+        finally:
+            metrics.in_cache_call = False
+        metrics.cache_hits += len(found)
+        metrics.cache_misses += len(keys) - len(found)
+        return found
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    pass
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    pass
+
+
+class InstrumentedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders of sampled requests."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# -----------------------------
+# Middleware
+# -----------------------------
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.0)
+        self.threshold = getattr(settings, 'INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', 5)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        metrics, started = self.start(request)
+        token = _current.set(metrics)
+        try:
+            with _hook_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, metrics, started)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        metrics, started = self.start(request)
+        token = _current.set(metrics)
+        try:
+            # The ORM runs in sync_to_async's thread, so hook the connections there
+            hooks = await sync_to_async(_hook_queries)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(hooks.close)()
+        finally:
+            _current.reset(token)
+        self.report(request, response, metrics, started)
+        return response
+
+    @staticmethod
+    def start(request):
+        metrics = RequestMetrics()
+        request._instrumentation = metrics
+        return metrics, time.perf_counter()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_instrumentation'):
+            request._instrumentation_view_started = time.perf_counter()
+
+    def report(self, request, response, metrics, started):
+        total = time.perf_counter() - started
+        view_started = getattr(request, '_instrumentation_view_started', None)
+        if view_started is not None:
+            metrics.view_time = time.perf_counter() - view_started
+
+        repeated = metrics.repeated_queries(self.threshold)
+        timings = [
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'view;dur={metrics.view_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]
+        if repeated:
+            timings.append(f'nplus1;desc="{len(repeated)} repeated queries"')
+        response['Server-Timing'] = ', '.join(timings)
+
+        match = request.resolver_match
+        view = match.view_name if match else None
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'view_ms': round(metrics.view_time * 1000, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'queries': metrics.queries,
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+            'template_ms': round(metrics.template_time * 1000, 2),
+        }
+        logger.info("%s %s %s", request.method, request.path, response.status_code, extra={'metrics': record})
+        for shape, count in repeated:
+            logger.warning(
+                "Possible N+1 in %s: query repeated %s times: %s", view, count, shape,
+                extra={'metrics': {'view': view, 'count': count, 'sql': shape}},
+            )
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that also runs natively under ASGI. The stock one
+    is sync-only, which makes Django run every request under uvicorn through
+    a thread-sensitive sync adapter, one request at a time.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_joblisting_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='users.joblisting')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'job', 'weight'], name='users_searc_term_e0a3be_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_searchposting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joblisting',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count, F
+from django.db.models.functions import Lower
+
+
+def dedupe_emails(apps, schema_editor):
+    """
+    Leave each email (compared case-insensitively) on one account only: the
+    one that logged in last, else the oldest. The others' emails are blanked;
+    those users can set a new one on their profile.
+    """
+    User = apps.get_model('auth', 'User')
+    duplicates = (
+        User.objects.exclude(email='').annotate(email_key=Lower('email'))
+        .values('email_key').annotate(n=Count('id')).filter(n__gt=1).values_list('email_key', flat=True)
+    )
+    for email_key in list(duplicates):
+        accounts = list(
+            User.objects.annotate(email_key=Lower('email')).filter(email_key=email_key)
+            .order_by(F('last_login').desc(nulls_last=True), 'id').values_list('id', flat=True)
+        )
+        User.objects.filter(id__in=accounts[1:]).update(email='')
+        print(f"\n  Email {email_key!r} kept on user {accounts[0]}, blanked on users {accounts[1:]}")
+
+
+class Migration(migrations.Migration):
+    """
+    Registration relies on the database to reject a second account with the
+    same email. Blank emails are allowed any number of times.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0005_userprofile_image_variants'),
+    ]
+
+    operations = [
+        # The index can't be created over existing duplicates
+        migrations.RunPython(dedupe_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX users_unique_email ON auth_user (email) WHERE email <> ''",
+            reverse_sql="DROP INDEX users_unique_email",
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+EXCERPT_LENGTH = 200
+BATCH_SIZE = 2000
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    # Frozen copy of users.models.make_excerpt
+    text = ' '.join((text or '').split())
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1].rsplit(' ', 1)[0] or text[:length - 1]
+    return cut.rstrip(' ,.;:') + '…'
+
+
+def backfill_excerpts(apps, schema_editor):
+    JobListing = apps.get_model('users', 'JobListing')
+    batch = []
+    for job in JobListing.objects.only('id', 'description').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        job.description_excerpt = make_excerpt(job.description)
+        batch.append(job)
+        if len(batch) >= BATCH_SIZE:
+            JobListing.objects.bulk_update(batch, ['description_excerpt'])
+            batch = []
+    if batch:
+        JobListing.objects.bulk_update(batch, ['description_excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_unique_user_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joblisting',
+            name='description_excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
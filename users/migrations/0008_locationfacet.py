@@ -0,0 +1,60 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+from users.locations import location_label, normalize_location
+
+BATCH_SIZE = 2000
+
+
+def fill_location_facets(apps, schema_editor):
+    JobListing = apps.get_model('users', 'JobListing')
+    LocationFacet = apps.get_model('users', 'LocationFacet')
+
+    batch = []
+    for job in JobListing.objects.only('id', 'location').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        job.location_key = normalize_location(job.location)
+        batch.append(job)
+        if len(batch) >= BATCH_SIZE:
+            JobListing.objects.bulk_update(batch, ['location_key'])
+            batch = []
+    if batch:
+        JobListing.objects.bulk_update(batch, ['location_key'])
+
+    counts = JobListing.objects.exclude(location_key='').order_by().values('location_key').annotate(n=Count('id'))
+    LocationFacet.objects.bulk_create([
+        LocationFacet(key=row['location_key'], label=location_label(row['location_key']), job_count=row['n'])
+        for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_joblisting_description_excerpt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('label', models.CharField(max_length=100)),
+                ('job_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='joblisting',
+            name='location_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='joblisting',
+            index=models.Index(fields=['location_key', 'created_at', 'id'], name='users_jobli_locatio_15774c_idx'),
+        ),
+        migrations.RunPython(fill_location_facets, migrations.RunPython.noop),
+    ]
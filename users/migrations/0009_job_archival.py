@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:31
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+# The default JOB_POSTING_LIFETIME_DAYS when this migration was written; fixed
+# here so the migration gives the same result whatever the setting is now
+POSTING_LIFETIME = timedelta(days=60)
+
+
+def set_expiry(apps, schema_editor):
+    # Existing postings get the default lifetime, counted from when they were
+    # posted; those older than that are archived by the first beat run
+    JobListing = apps.get_model('users', 'JobListing')
+    JobListing.objects.filter(expires_at__isnull=True).update(expires_at=F('created_at') + POSTING_LIFETIME)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_locationfacet'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedJobListing',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=250)),
+                ('company', models.CharField(max_length=250)),
+                ('location', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='joblisting',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='joblisting',
+            index=models.Index(fields=['expires_at', 'id'], name='users_jobli_expires_3d1a28_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedjoblisting',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(set_expiry, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_saved_searches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedjoblisting',
+            name='applicant_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='joblisting',
+            name='applicant_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='JobApplication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('APPLIED', 'Applied'), ('REVIEWED', 'Reviewed'), ('REJECTED', 'Rejected'), ('HIRED', 'Hired')], default='APPLIED', max_length=20)),
+                ('applied_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='applications', to='users.joblisting')),
+                ('seeker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seeker', 'applied_at'], name='users_jobap_seeker__35a328_idx')],
+                'constraints': [models.UniqueConstraint(fields=('job', 'seeker'), name='unique_job_application')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_job_applications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedjoblisting',
+            name='view_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='joblisting',
+            name='view_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='joblisting',
+            index=models.Index(fields=['created_by', 'view_count'], name='users_jobli_created_5b3bc0_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+from django.db.models import Count, F
+from django.db.models.functions import Lower
+
+
+def dedupe_emails(apps, schema_editor):
+    """
+    Leave each email (compared case-insensitively) on one account only: the
+    one that logged in last, else the oldest. The others' emails are blanked;
+    those users can set a new one on their profile.
+    """
+    User = apps.get_model('auth', 'User')
+    duplicates = (
+        User.objects.exclude(email='').annotate(email_key=Lower('email'))
+        .values('email_key').annotate(n=Count('id')).filter(n__gt=1).values_list('email_key', flat=True)
+    )
+    for email_key in list(duplicates):
+        accounts = list(
+            User.objects.annotate(email_key=Lower('email')).filter(email_key=email_key)
+            .order_by(F('last_login').desc(nulls_last=True), 'id').values_list('id', flat=True)
+        )
+        User.objects.filter(id__in=accounts[1:]).update(email='')
+        print(f"\n  Email {email_key!r} kept on user {accounts[0]}, blanked on users {accounts[1:]}")
+
+
+class Migration(migrations.Migration):
+    """
+    Make the unique email index case-insensitive: ``Foo@x.com`` and
+    ``foo@x.com`` are the same address, and registration treats them so.
+    Accounts that only differ in case are deduplicated first.
+    """
+
+    dependencies = [
+        ('users', '0012_job_view_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            [
+                "DROP INDEX users_unique_email",
+                "CREATE UNIQUE INDEX users_unique_email ON auth_user (LOWER(email)) WHERE email <> ''",
+            ],
+            reverse_sql=[
+                "DROP INDEX users_unique_email",
+                "CREATE UNIQUE INDEX users_unique_email ON auth_user (email) WHERE email <> ''",
+            ],
+        ),
+    ]
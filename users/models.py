@@ -1,5 +1,13 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .locations import normalize_location
+
 
 class UserProfile(models.Model):
     ROLE_CHOICES = [
@@ -16,6 +24,8 @@ class UserProfile(models.Model):
     experience = models.IntegerField(blank=True, null=True)
     education = models.TextField(blank=True, null=True)
     profile_image = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    # Thumbnails written by users.images.process_profile_image
+    image_variants = models.JSONField(default=dict, blank=True)
 
     objects = models.Manager()
 
@@ -28,25 +38,271 @@ class UserProfile(models.Model):
     def __str__(self):
         return self.user.username if self.user else "No User"
 
+    def _image_srcset(self, fmt):
+        files = self.image_variants.get('files', {}).get(fmt, {})
+        return ', '.join(f"{default_storage.url(name)} {size}w" for size, name in files.items())
+
+    @property
+    def webp_srcset(self):
+        return self._image_srcset('webp')
+
+    @property
+    def jpeg_srcset(self):
+        return self._image_srcset('jpeg')
+
+
+EXCERPT_LENGTH = 200
+
+# Columns the list pages (jobs, home, search, recommendations) render
+LIST_FIELDS = ('id', 'title', 'company', 'location', 'description_excerpt', 'created_at', 'created_by_id')
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """The first ``length`` characters of ``text``, whitespace collapsed, cut at a word boundary."""
+    text = ' '.join((text or '').split())
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1].rsplit(' ', 1)[0] or text[:length - 1]
+    return cut.rstrip(' ,.;:') + '\u2026'
+
+
+def posting_lifetime():
+    return timedelta(days=getattr(settings, 'JOB_POSTING_LIFETIME_DAYS', 60))
+
+
+class JobListingQuerySet(models.QuerySet):
+    def for_list(self):
+        """Only the columns list pages show; ``description`` stays in the database."""
+        return self.only(*LIST_FIELDS)
+
 
 class JobListing(models.Model):
     title = models.CharField(max_length=250, db_index=True)
     company = models.CharField(max_length=250)
     location = models.CharField(max_length=100, db_index=True)
     description = models.TextField()
+    # Derived from description / location by save(); bulk writers call refresh_derived_fields()
+    description_excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='', editable=False)
+    location_key = models.CharField(max_length=100, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    # Moved to ArchivedJobListing after this (users.archival); set on create
+    expires_at = models.DateTimeField(null=True, blank=True)
+    # Counters updated in place (users.applications, users.job_stats); never written by save()
+    applicant_count = models.IntegerField(default=0, editable=False)
+    view_count = models.IntegerField(default=0, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=['title']),
             models.Index(fields=['location']),
             models.Index(fields=['created_at']),
+            # Location filter on the jobs page, walked in keyset order
+            models.Index(fields=['location_key', 'created_at', 'id']),
+            models.Index(fields=['expires_at', 'id']),
+            # A recruiter's most viewed jobs
+            models.Index(fields=['created_by', 'view_count']),
         ]
         permissions = [
             ("can_create_job", "Can create job"),
             ("can_apply_job", "Can apply for job"),
         ]
 
+    objects = JobListingQuerySet.as_manager()
+
+    is_archived = False
+
     def __str__(self):
         return self.title
+
+    # source field -> derived field
+    DERIVED_FIELDS = {'description': 'description_excerpt', 'location': 'location_key'}
+    # Incremented in place by other code; save() leaves them alone so an
+    # edit can't overwrite increments made since the job was loaded
+    COUNTER_FIELDS = ('applicant_count', 'view_count')
+
+    def refresh_derived_fields(self, fields=None):
+        fields = self.DERIVED_FIELDS if fields is None else fields
+        if 'description' in fields:
+            self.description_excerpt = make_excerpt(self.description)
+        if 'location' in fields:
+            self.location_key = normalize_location(self.location)
+        if self.expires_at is None and not self.pk:
+            self.expires_at = (self.created_at or timezone.now()) + posting_lifetime()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            skipped = {*self.COUNTER_FIELDS, *self.get_deferred_fields()}
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped and field.name not in skipped
+            ]
+        if update_fields is None:
+            self.refresh_derived_fields()
+        else:
+            sources = [field for field in self.DERIVED_FIELDS if field in update_fields]
+            self.refresh_derived_fields(sources)
+            kwargs['update_fields'] = {*update_fields, *(self.DERIVED_FIELDS[field] for field in sources)}
+        super().save(*args, **kwargs)
+
+
+class ArchivedJobListing(models.Model):
+    """
+    An expired JobListing, moved here by ``users.archival`` so the live table
+    only holds current postings. Keeps the original id, so old links to
+    ``job-details`` still resolve.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=250)
+    company = models.CharField(max_length=250)
+    location = models.CharField(max_length=100)
+    description = models.TextField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    expires_at = models.DateTimeField(null=True)
+    applicant_count = models.IntegerField(default=0)
+    view_count = models.IntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_jobs')
+
+    is_archived = True
+
+    # Fields copied over from JobListing
+    COPIED_FIELDS = ('id', 'title', 'company', 'location', 'description', 'created_at', 'updated_at',
+                     'expires_at', 'applicant_count', 'view_count', 'created_by_id')
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_job(cls, job):
+        return cls(**{field: getattr(job, field) for field in cls.COPIED_FIELDS})
+
+
+class JobApplication(models.Model):
+    """
+    A job seeker's application to a job, written by ``users.applications``.
+    ``job`` has no database constraint so applications outlive the job's
+    move to ``ArchivedJobListing``, which keeps its id.
+    """
+    STATUS_CHOICES = [
+        ('APPLIED', 'Applied'),
+        ('REVIEWED', 'Reviewed'),
+        ('REJECTED', 'Rejected'),
+        ('HIRED', 'Hired'),
+    ]
+
+    job = models.ForeignKey(JobListing, on_delete=models.DO_NOTHING, db_constraint=False, related_name='applications')
+    seeker = models.ForeignKey(User, on_delete=models.CASCADE, related_name='applications')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='APPLIED')
+    applied_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'seeker'], name='unique_job_application'),
+        ]
+        indexes = [
+            models.Index(fields=['seeker', 'applied_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.seeker_id} -> {self.job_id} ({self.status})"
+
+
+class LocationFacet(models.Model):
+    """
+    Number of jobs per normalized location, for the jobs page filter. Kept
+    up to date by ``users.facets`` from the JobListing signals.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    label = models.CharField(max_length=100)
+    job_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.label} ({self.job_count})"
+
+
+class SearchPosting(models.Model):
+    """
+    One row of the job search inverted index: a term (a word, or a two-word
+    phrase for phrase queries) that occurs in a job, with its field-weighted
+    term frequency precomputed. Maintained by ``users.search`` from the
+    JobListing signals, so queries never scan ``JobListing.description``.
+    """
+    term = models.CharField(max_length=64)
+    job = models.ForeignKey(JobListing, on_delete=models.CASCADE, related_name='search_postings')
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = [
+            # Covers the whole search query, so it never reads the table itself
+            models.Index(fields=['term', 'job', 'weight']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.job_id}"
+
+
+class SavedSearch(models.Model):
+    """
+    A job seeker's saved query (keywords and/or location), matched against
+    new postings by ``users.alerts``. Its index terms are stored as
+    ``SavedSearchTerm`` rows.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    query = models.CharField(max_length=200, blank=True)
+    location = models.CharField(max_length=100, blank=True)
+    location_key = models.CharField(max_length=100, blank=True, editable=False)
+    # Number of SavedSearchTerm rows; a job matches when it has all of them
+    term_count = models.IntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Location-only searches are looked up by location
+            models.Index(fields=['term_count', 'location_key']),
+        ]
+
+    def __str__(self):
+        return ' in '.join(part for part in (self.query, self.location) if part)
+
+
+class SavedSearchTerm(models.Model):
+    """
+    One row of the saved-search inverted index: a term (in the
+    ``SearchPosting`` vocabulary) that a saved search requires.
+    """
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'term'], name='unique_saved_search_term'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'search']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.search_id}"
+
+
+class JobAlert(models.Model):
+    """A new job matching a saved search, waiting for (or included in) the user's digest."""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='alerts')
+    job = models.ForeignKey(JobListing, on_delete=models.CASCADE, related_name='alerts')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'job'], name='unique_job_alert'),
+        ]
+        indexes = [
+            models.Index(fields=['sent_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} for {self.search_id}"
@@ -0,0 +1,202 @@
+"""
+Full-page cache for anonymous traffic.
+
+Only cookie-less GET/HEAD requests without credentials are served from the
+cache, so nobody ever gets a page rendered for someone else. Each cached page
+is tagged with surrogate keys, e.g. ``job:<id>`` or ``jobs:list``, which are
+backed by the generations in ``users/job_cache.py``; a change to a JobListing
+bumps them and purges exactly the pages tagged with them.
+
+When a page expires or is purged only one worker regenerates it (a
+``cache.add`` lock) while the others keep serving the old copy, so a
+stampede never ties up workers waiting. Only when there is no copy at all
+do they render the page themselves. A regeneration that can't be cached
+(the job is gone, an error) drops the old copy. Hits, stale hits and
+misses are counted per view, see ``manage.py page_cache_stats``.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import job_cache
+from .utils.cache import incr_counter
+
+PAGE_KEY = 'page:{}'
+LOCK_KEY = 'page:lock:{}'
+LOCK_TIMEOUT = 10
+STALE_TIMEOUT = 60 * 10
+
+# Surrogate keys that are served by a differently named generation
+SURROGATE_GENERATIONS = {
+    'jobs:list': 'all',
+}
+
+OUTCOMES = ('hit', 'stale', 'miss')
+
+# Names of the views using the cache, for the stats command
+CACHED_VIEWS = set()
+
+
+def counter_name(view_name, outcome):
+    return f'page_cache:{view_name}:{outcome}'
+
+
+def _is_cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.COOKIES
+        and 'HTTP_AUTHORIZATION' not in request.META
+    )
+
+
+def _is_cacheable_response(response):
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def _lookup(page_key, generation_names):
+    """One round trip for the page and its generations; returns ``(entry, generations)``."""
+    generation_keys = [job_cache.GENERATION_KEY.format(name) for name in generation_names]
+    found = cache.get_many([page_key, *generation_keys])
+    missing = [name for name, key in zip(generation_names, generation_keys) if key not in found]
+    created = job_cache.generations(*missing) if missing else {}
+    generations = [
+        found.get(key, created.get(name)) for name, key in zip(generation_names, generation_keys)
+    ]
+    return found.get(page_key), generations
+
+
+def _to_response(entry, outcome):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    response['X-Page-Cache'] = outcome.upper()
+    return response
+
+
+def _store(page_key, response, generations, timeout):
+    if not _is_cacheable_response(response):
+        # Don't leave an outdated copy behind to be served as stale
+        cache.delete(page_key)
+        return
+    entry = {
+        'content': response.content,
+        'status': response.status_code,
+        'headers': list(response.items()),
+        'generations': generations,
+        'expires': time.time() + timeout,
+    }
+    cache.set(page_key, entry, timeout=timeout + STALE_TIMEOUT)
+
+
+def _serve_cached(view_name, page_key, lock_key, generation_names):
+    """
+    Look the page up. Returns ``(response, locked, generations)``: a cached
+    response (fresh or stale), or None when the caller must render the page,
+    in which case ``locked`` says whether it holds the lock.
+    """
+    entry, generations = _lookup(page_key, generation_names)
+    current = entry is not None and entry['generations'] == generations
+    if current and entry['expires'] > time.time():
+        incr_counter(counter_name(view_name, 'hit'))
+        return _to_response(entry, 'hit'), False, generations
+
+    locked = cache.add(lock_key, True, timeout=LOCK_TIMEOUT)
+    if not locked and entry is not None:
+        # Expired or purged: someone else is regenerating it. Without a
+        # copy to serve, render it here rather than wait for theirs.
+        incr_counter(counter_name(view_name, 'stale'))
+        return _to_response(entry, 'stale'), False, generations
+
+    incr_counter(counter_name(view_name, 'miss'))
+    return None, locked, generations
+
+
+def _finish(response, page_key, lock_key, locked, generations, timeout):
+    try:
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        _store(page_key, response, generations, timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    response['X-Page-Cache'] = 'MISS'
+    return response
+
+
+def anonymous_page_cache(*surrogate_keys, timeout=60 * 5):
+    """
+    Cache a view's page for anonymous, cookie-less visitors.
+
+    Usage:
+        @anonymous_page_cache('jobs:list')
+        @anonymous_page_cache('job:{job_id}', timeout=60 * 15)
+
+    Surrogate keys are formatted with the view's URL kwargs. Works on sync
+    and async views.
+    """
+
+    def decorator(view_func):
+        view_name = view_func.__name__
+        CACHED_VIEWS.add(view_name)
+
+        def keys_for(request, kwargs):
+            generation_names = [
+                SURROGATE_GENERATIONS.get(key, key) for key in (key.format(**kwargs) for key in surrogate_keys)
+            ]
+            digest = hashlib.md5(f"{request.get_host()}{request.get_full_path()}".encode()).hexdigest()
+            return PAGE_KEY.format(digest), LOCK_KEY.format(digest), generation_names
+
+        if iscoroutinefunction(view_func):
+            # Cache work only touches the cache, so it can run off the
+            # thread-sensitive executor the async ORM uses
+            serve_cached = sync_to_async(_serve_cached, thread_sensitive=False)
+            finish = sync_to_async(_finish, thread_sensitive=False)
+
+            @wraps(view_func)
+            async def _wrapped_view(request, *args, **kwargs):
+                if not _is_cacheable_request(request):
+                    return await view_func(request, *args, **kwargs)
+
+                page_key, lock_key, generation_names = keys_for(request, kwargs)
+                response, locked, generations = await serve_cached(view_name, page_key, lock_key, generation_names)
+                if response is not None:
+                    return response
+                try:
+                    response = await view_func(request, *args, **kwargs)
+                except BaseException:
+                    if locked:
+                        await cache.adelete(lock_key)
+                    raise
+                return await finish(response, page_key, lock_key, locked, generations, timeout)
+
+            return _wrapped_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            page_key, lock_key, generation_names = keys_for(request, kwargs)
+            response, locked, generations = _serve_cached(view_name, page_key, lock_key, generation_names)
+            if response is not None:
+                return response
+            try:
+                response = view_func(request, *args, **kwargs)
+            except BaseException:
+                if locked:
+                    cache.delete(lock_key)
+                raise
+            return _finish(response, page_key, lock_key, locked, generations, timeout)
+
+        return _wrapped_view
+
+    return decorator
+
+
+def purge(*surrogate_keys):
+    """Purge every cached page tagged with one of ``surrogate_keys``."""
+    job_cache.bump(*(SURROGATE_GENERATIONS.get(key, key) for key in surrogate_keys))
@@ -0,0 +1,165 @@
+"""
+Keyset (cursor) pagination for JobListing querysets.
+
+Pages are ordered newest first by ``(created_at, id)`` and walked with
+``WHERE (created_at, id) < (last_created_at, last_id)`` so every page costs
+the same index range scan no matter how deep it is, and no ``COUNT(*)`` is
+run per request. Cursors are opaque signed tokens.
+"""
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = 'users.pagination.cursor'
+
+
+class KeysetPage:
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Usage:
+        paginator = KeysetPaginator(JobListing.objects.all(), 10, count_cache_key='jobs:count:all')
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    """
+
+    def __init__(self, queryset, per_page, count_cache_key=None, count_timeout=60 * 5):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count_cache_key = count_cache_key
+        self.count_timeout = count_timeout
+
+    @staticmethod
+    def encode_cursor(obj, direction):
+        return signing.dumps(
+            {'c': obj.created_at.isoformat(), 'i': obj.pk, 'd': direction},
+            salt=CURSOR_SALT,
+            compress=True,
+        )
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return ``(created_at, id, direction)`` or None for a missing or tampered cursor."""
+        if not cursor:
+            return None
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            created_at = parse_datetime(data['c'])
+            return (created_at, int(data['i']), data['d']) if created_at else None
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+
+    @classmethod
+    def cursor_key(cls, cursor):
+        """
+        Cache key part for the page ``cursor`` points at, built from its decoded
+        values: '' for the first page and for any cursor that doesn't decode,
+        so made-up cursors can't create cache entries of their own.
+        """
+        position = cls.decode_cursor(cursor)
+        if position is None:
+            return ''
+        created_at, pk, direction = position
+        return f"{direction}:{pk}:{created_at.isoformat()}"
+
+    def get_page(self, cursor=None):
+        position = self.decode_cursor(cursor)
+        rows = list(self._page_queryset(position))
+        return self._make_page(rows, position, self.estimated_count())
+
+    async def aget_page(self, cursor=None):
+        position = self.decode_cursor(cursor)
+        rows = [row async for row in self._page_queryset(position)]
+        return self._make_page(rows, position, await self.aestimated_count())
+
+    def _page_queryset(self, position):
+        """The next ``per_page + 1`` rows after ``position``, in scan order."""
+        limit = self.per_page + 1
+        qs = self.queryset.order_by()
+        if position is None:
+            return qs.order_by('-created_at', '-id')[:limit]
+        created_at, pk, direction = position
+        if direction == 'p':
+            qs = qs.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            return qs.order_by('created_at', 'id')[:limit]
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        return qs.order_by('-created_at', '-id')[:limit]
+
+    def _make_page(self, rows, position, total):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if position is None:
+            has_next, has_previous = has_more, False
+        elif position[2] == 'p':
+            rows = rows[::-1]
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, True
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], 'n') if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], 'p') if rows and has_previous else None,
+            total=total,
+        )
+
+    def estimated_count(self):
+        """
+        Cached total for display ("about N jobs"). Returns None unless a
+        ``count_cache_key`` was given. On PostgreSQL an unfiltered table is
+        estimated from the planner statistics instead of a full COUNT(*).
+        """
+        if self.count_cache_key is None:
+            return None
+        total = cache.get(self.count_cache_key)
+        if total is None:
+            total = self._estimate()
+            cache.set(self.count_cache_key, total, timeout=self.count_timeout)
+        return total
+
+    async def aestimated_count(self):
+        if self.count_cache_key is None:
+            return None
+        total = await cache.aget(self.count_cache_key)
+        if total is None:
+            total = await sync_to_async(self._estimate)()
+            await cache.aset(self.count_cache_key, total, timeout=self.count_timeout)
+        return total
+
+    def _estimate(self):
+        model = self.queryset.model
+        connection = connections[self.queryset.db]
+        if connection.vendor == 'postgresql' and not self.queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return int(row[0])
+        return self.queryset.count()
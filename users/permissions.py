@@ -0,0 +1,143 @@
+"""
+What a user may do with a job, without a query per job.
+
+A user's permissions on a job combine the portal roles with the
+django-guardian object permissions granted to them or their groups:
+
+    change_joblisting, delete_joblisting   superusers, admins, the recruiter who
+                                           posted the job, and anyone granted it
+                                           on the job
+    can_apply_job                          job seekers only; ``apply_job`` is
+                                           gated on the role, so a grant to
+                                           anyone else is ignored
+
+Superusers are decided from ``is_superuser`` without looking at grants: they
+may change and delete every job, and apply only if their role is job seeker.
+
+``JobPermissions.prefetch(jobs)`` loads the user's guardian grants for a
+whole set of jobs with one query (user and group grants in a UNION) and
+keeps them for the rest of the request. Grants are also cached per
+(user, job) under the ``perms`` and ``perms:user:<id>`` generations of
+``users/job_cache.py``. The signals bump them when a UserObjectPermission
+or GroupObjectPermission row is saved or deleted, or a user's groups
+change. Code that grants in bulk (``assign_perm`` with a queryset uses
+``bulk_create``) calls ``permissions_changed()`` itself.
+
+Views get the request's instance from ``job_permissions(request)``;
+templates read ``job.user_perms``, set by ``annotate``.
+"""
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from . import job_cache
+from .backends import get_user_role
+from .models import JobListing
+
+CHANGE = 'change_joblisting'
+DELETE = 'delete_joblisting'
+APPLY = 'can_apply_job'
+
+PERMS_TIMEOUT = 60 * 15
+
+
+def _guardian_grants(user, job_ids):
+    """``(object_pk, codename)`` for every grant to ``user`` or their groups on ``job_ids``."""
+    content_type = ContentType.objects.get_for_model(JobListing)
+    object_pks = [str(job_id) for job_id in job_ids]
+    user_grants = (
+        UserObjectPermission.objects
+        .filter(user=user, content_type=content_type, object_pk__in=object_pks)
+        .values_list('object_pk', 'permission__codename')
+    )
+    group_grants = (
+        GroupObjectPermission.objects
+        .filter(group__user=user, content_type=content_type, object_pk__in=object_pks)
+        .values_list('object_pk', 'permission__codename')
+    )
+    return user_grants.union(group_grants)
+
+
+class JobPermissions:
+    """One user's permissions on jobs, memoized for the request."""
+
+    def __init__(self, user):
+        self.user = user
+        self.role = get_user_role(user)
+        # job id -> guardian codenames granted on it
+        self._grants = {}
+
+    def prefetch(self, jobs):
+        """Load the guardian grants for ``jobs``: one cache round trip, and one query for any not cached."""
+        if not self.user.is_authenticated or self.user.is_superuser:
+            return
+        missing = {job.pk for job in jobs} - self._grants.keys()
+        if not missing:
+            return
+
+        prefix = job_cache.versioned_key('perms', ['perms', f'perms:user:{self.user.pk}'], self.user.pk)
+        keys = {job_id: f"{prefix}:{job_id}" for job_id in missing}
+        cached = cache.get_many(keys.values())
+        for job_id, key in keys.items():
+            if key in cached:
+                self._grants[job_id] = cached[key]
+
+        uncached = [job_id for job_id in missing if job_id not in self._grants]
+        if uncached:
+            granted = defaultdict(set)
+            for object_pk, codename in _guardian_grants(self.user, uncached):
+                granted[int(object_pk)].add(codename)
+            # Jobs without grants are cached too; that is nearly all of them
+            fresh = {job_id: frozenset(granted[job_id]) for job_id in uncached}
+            self._grants.update(fresh)
+            cache.set_many({keys[job_id]: codenames for job_id, codenames in fresh.items()}, timeout=PERMS_TIMEOUT)
+
+    def for_job(self, job):
+        """Every codename the user holds on ``job``."""
+        if not self.user.is_authenticated:
+            return frozenset()
+        if self.user.is_superuser:
+            perms = {CHANGE, DELETE}
+        else:
+            self.prefetch([job])
+            perms = set(self._grants[job.pk])
+            if self.role == 'ADMIN' or (self.role == 'RECRUITER' and job.created_by_id == self.user.pk):
+                perms.update({CHANGE, DELETE})
+        if self.role == 'JOB_SEEKER':
+            perms.add(APPLY)
+        else:
+            perms.discard(APPLY)
+        return frozenset(perms)
+
+    def has(self, job, codename):
+        return codename in self.for_job(job)
+
+    def annotate(self, jobs):
+        """Set ``job.user_perms`` on each of ``jobs`` for the templates; returns them as a list."""
+        jobs = list(jobs)
+        self.prefetch(jobs)
+        for job in jobs:
+            job.user_perms = self.for_job(job)
+        return jobs
+
+
+def job_permissions(request):
+    """The JobPermissions of ``request.user``, created once per request."""
+    perms = getattr(request, '_job_permissions', None)
+    if perms is None or perms.user is not request.user:
+        perms = request._job_permissions = JobPermissions(request.user)
+    return perms
+
+
+def annotate_jobs(request, jobs):
+    return job_permissions(request).annotate(jobs)
+
+
+def permissions_changed(user_ids=None):
+    """Drop cached grants of ``user_ids``, or of everyone."""
+    if user_ids is None:
+        job_cache.bump('perms')
+    else:
+        job_cache.bump(*(f'perms:user:{user_id}' for user_id in user_ids))
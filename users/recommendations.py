@@ -0,0 +1,354 @@
+"""
+"Recommended for you" jobs for job seekers.
+
+Every job is turned into a sparse, L2-normalized TF vector over its title and
+description terms. The vectors live in one job-term matrix (COO arrays plus a
+column-sorted CSC view) that is stored in the cache and kept in process
+memory between requests. Scoring a seeker is a handful of vectorized
+``scores[rows] += idf * values`` updates, one per skill term, followed by an
+``argpartition`` for the top N, so it does not loop over jobs in Python.
+
+Each worker keeps the loaded matrix in memory until the cached version
+changes; the pickle includes the column index, so loading a new version is
+one unpickle and no re-sorting.
+
+Job saves and deletes don't touch the matrix themselves: ``queue_refresh``
+adds the job ids to a pending set (a Redis set, or an in-process set without
+django-redis), and the first change of a ``RECOMMENDATIONS_REFRESH_WINDOW``
+schedules one ``refresh_job_matrix`` task. That task drains the set and
+applies everything queued since the last refresh in one update, so a burst
+of edits loads and stores the matrix once. A refresh that finds the lock
+held just returns; the one holding it drains the set again before it exits.
+"""
+import math
+import threading
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import JobListing
+from .search import bigrams, tokenize
+from .utils.cache import get_redis_connection
+
+MATRIX_KEY = 'recommendations:matrix'
+VERSION_KEY = 'recommendations:version'
+LOCK_KEY = 'recommendations:lock'
+LOCK_TIMEOUT = 60 * 10
+PENDING_KEY = 'recommendations:pending'
+DRAINING_KEY = 'recommendations:draining'
+REBUILD_KEY = 'recommendations:rebuild'
+SCHEDULED_KEY = 'recommendations:scheduled'
+MAX_TERMS_PER_JOB = 64
+TITLE_WEIGHT = 2.0
+COMPACT_RATIO = 0.2
+
+SENIOR_TERMS = ('senior', 'lead', 'principal', 'manager')
+JUNIOR_TERMS = ('junior', 'intern', 'trainee', 'graduate', 'associate', 'fresher')
+
+# Per-process copy of the matrix, reused while the cached version is unchanged
+_local = {'version': None, 'matrix': None}
+
+
+def refresh_window():
+    return getattr(settings, 'RECOMMENDATIONS_REFRESH_WINDOW', 60)
+
+
+# -----------------------------
+# Building the matrix
+# -----------------------------
+def job_terms(job):
+    """Sparse, L2-normalized term weights for one job."""
+    title = tokenize(job.title)
+    counts = Counter()
+    for term in title + bigrams(title):
+        counts[term] += TITLE_WEIGHT
+    counts.update(tokenize(job.description))
+
+    weights = {term: 1 + math.log(count) for term, count in counts.most_common(MAX_TERMS_PER_JOB)}
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {term: w / norm for term, w in weights.items()}
+
+
+class JobTermMatrix:
+    """
+    ``job_ids[row]`` is the job of each row (-1 once the job is gone), ``terms``
+    maps a term to its column. ``rows``/``cols``/``values`` hold the non-zero
+    entries; ``col_rows``/``col_values`` are the same entries sorted by column,
+    with column ``c`` at ``indptr[c]:indptr[c + 1]``.
+    """
+
+    def __init__(self, job_ids, terms, rows, cols, values):
+        self.job_ids = job_ids
+        self.terms = terms
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self._index()
+
+    def _index(self):
+        order = np.argsort(self.cols, kind='stable')
+        self.col_rows = self.rows[order]
+        self.col_values = self.values[order]
+        counts = np.bincount(self.cols, minlength=len(self.terms))
+        self.indptr = np.concatenate(([0], np.cumsum(counts)))
+        live_jobs = max(int((self.job_ids >= 0).sum()), 1)
+        self.idf = np.log1p(live_jobs / (counts + 1.0)).astype(np.float32)
+
+    # The column index is pickled with the matrix, so workers loading a new
+    # version don't redo the argsort on the request path
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'indptr' not in state:
+            # Pickled before the index was included
+            self._index()
+
+    @classmethod
+    def build(cls, jobs):
+        matrix = cls(np.empty(0, np.int64), {}, np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float32))
+        return matrix.updated(jobs, removed_ids=())
+
+    def updated(self, jobs, removed_ids):
+        """Return a new matrix with ``jobs`` (re)vectorized and ``removed_ids`` dropped."""
+        jobs = list(jobs)
+        job_ids = self.job_ids.copy()
+        terms = dict(self.terms)
+        row_of = {int(job_id): row for row, job_id in enumerate(job_ids) if job_id >= 0}
+
+        changed = {job.pk for job in jobs} | set(removed_ids)
+        stale_rows = [row_of[job_id] for job_id in changed if job_id in row_of]
+        keep = ~np.isin(self.rows, stale_rows)
+        rows, cols, values = [self.rows[keep]], [self.cols[keep]], [self.values[keep]]
+
+        for job_id in removed_ids:
+            if job_id in row_of:
+                job_ids[row_of.pop(job_id)] = -1
+
+        new_ids, new_rows, new_cols, new_values = [], [], [], []
+        for job in jobs:
+            row = row_of.get(job.pk)
+            if row is None:
+                row = len(job_ids) + len(new_ids)
+                new_ids.append(job.pk)
+            for term, weight in job_terms(job).items():
+                new_rows.append(row)
+                new_cols.append(terms.setdefault(term, len(terms)))
+                new_values.append(weight)
+
+        job_ids = np.concatenate((job_ids, np.asarray(new_ids, np.int64)))
+        rows.append(np.asarray(new_rows, np.int32))
+        cols.append(np.asarray(new_cols, np.int32))
+        values.append(np.asarray(new_values, np.float32))
+        matrix = JobTermMatrix(job_ids, terms, np.concatenate(rows), np.concatenate(cols), np.concatenate(values))
+
+        dead = int((job_ids < 0).sum())
+        return matrix.compacted() if dead > COMPACT_RATIO * len(job_ids) else matrix
+
+    def compacted(self):
+        """Drop the rows of deleted jobs and renumber the rest."""
+        live = self.job_ids >= 0
+        new_row = np.cumsum(live) - 1
+        return JobTermMatrix(self.job_ids[live], self.terms, new_row[self.rows].astype(np.int32), self.cols, self.values)
+
+    def top_n(self, query, n):
+        """``query`` maps terms to weights; returns ``[(job_id, score), ...]`` best first."""
+        scores = np.zeros(len(self.job_ids), np.float32)
+        for term, weight in query.items():
+            col = self.terms.get(term)
+            if col is None:
+                continue
+            start, end = self.indptr[col], self.indptr[col + 1]
+            scores[self.col_rows[start:end]] += (weight * self.idf[col]) * self.col_values[start:end]
+
+        n = min(n, int(np.count_nonzero(scores)))
+        if n <= 0:
+            return []
+        best = np.argpartition(-scores, n - 1)[:n]
+        best = best[np.argsort(-scores[best])]
+        return [(int(self.job_ids[row]), float(scores[row])) for row in best]
+
+
+# -----------------------------
+# Storage
+# -----------------------------
+def _store(matrix):
+    version = (cache.get(VERSION_KEY) or 0) + 1
+    cache.set(MATRIX_KEY, matrix, timeout=None)
+    cache.set(VERSION_KEY, version, timeout=None)
+    _local.update(version=version, matrix=matrix)
+
+
+def load_matrix():
+    """The current matrix, or None if it has not been built yet."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        return None
+    if _local['version'] != version:
+        matrix = cache.get(MATRIX_KEY)
+        if matrix is None:
+            return None
+        _local.update(version=version, matrix=matrix)
+    return _local['matrix']
+
+
+def _refreshed(matrix, job_ids):
+    if job_ids is None or matrix is None:
+        jobs = JobListing.objects.only('id', 'title', 'description').order_by('id')
+        return JobTermMatrix.build(jobs.iterator(chunk_size=2000))
+    jobs = list(JobListing.objects.only('id', 'title', 'description').filter(id__in=job_ids))
+    found = {job.pk for job in jobs}
+    return matrix.updated(jobs, removed_ids=[job_id for job_id in job_ids if job_id not in found])
+
+
+def refresh_matrix(job_ids=None):
+    """
+    Rebuild the whole matrix (``job_ids=None``) or re-vectorize just the given
+    jobs. Returns False when another refresh holds the lock.
+    """
+    if not cache.add(LOCK_KEY, True, timeout=LOCK_TIMEOUT):
+        return False
+    try:
+        _store(_refreshed(load_matrix(), job_ids))
+        return True
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+# -----------------------------
+# Pending changes
+# -----------------------------
+class MemoryPendingJobs:
+    """In-process stand-in for the Redis set of pending job ids."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._job_ids = set()
+
+    def add(self, job_ids):
+        with self._lock:
+            self._job_ids.update(job_ids)
+
+    def take(self):
+        with self._lock:
+            job_ids, self._job_ids = self._job_ids, set()
+        return job_ids
+
+    def __bool__(self):
+        with self._lock:
+            return bool(self._job_ids)
+
+    def clear(self):
+        with self._lock:
+            self._job_ids.clear()
+
+
+memory_pending = MemoryPendingJobs()
+
+
+def queue_refresh(job_ids=None):
+    """
+    Queue ``job_ids`` (or, with None, a full rebuild) for the next refresh.
+    Returns True if a ``refresh_job_matrix`` task should be scheduled.
+    """
+    if job_ids is None:
+        cache.set(REBUILD_KEY, True, timeout=None)
+    elif job_ids:
+        client = get_redis_connection()
+        if client is None:
+            memory_pending.add(job_ids)
+        else:
+            client.sadd(cache.make_key(PENDING_KEY), *job_ids)
+    # Only the first change of a window schedules the refresh
+    return cache.add(SCHEDULED_KEY, True, timeout=refresh_window())
+
+
+def _take_pending(client):
+    if client is None:
+        return memory_pending.take()
+    pending_key, draining_key = cache.make_key(PENDING_KEY), cache.make_key(DRAINING_KEY)
+    # A refresh that failed left its ids under DRAINING_KEY; apply those first
+    if not client.exists(draining_key):
+        if not client.exists(pending_key):
+            return set()
+        # Changes queued from now on go to a fresh set while these are applied
+        client.rename(pending_key, draining_key)
+    return {int(job_id) for job_id in client.smembers(draining_key)}
+
+
+def _has_pending(client):
+    if cache.get(REBUILD_KEY):
+        return True
+    if client is None:
+        return bool(memory_pending)
+    return bool(client.exists(cache.make_key(PENDING_KEY), cache.make_key(DRAINING_KEY)))
+
+
+def refresh_pending():
+    """
+    Apply every queued change to the matrix in one update. Returns False
+    when another refresh holds the lock; that one applies the changes.
+    """
+    client = get_redis_connection()
+    while True:
+        if not cache.add(LOCK_KEY, True, timeout=LOCK_TIMEOUT):
+            return False
+        try:
+            rebuild = bool(cache.get(REBUILD_KEY))
+            cache.delete(REBUILD_KEY)
+            job_ids = _take_pending(client)
+            try:
+                if rebuild or job_ids:
+                    _store(_refreshed(load_matrix(), None if rebuild else job_ids))
+            except Exception:
+                if rebuild:
+                    cache.set(REBUILD_KEY, True, timeout=None)
+                if client is None:
+                    memory_pending.add(job_ids)
+                raise
+            if client is not None:
+                client.delete(cache.make_key(DRAINING_KEY))
+        finally:
+            cache.delete(LOCK_KEY)
+        # Changes queued while the lock was held found it taken and left them for us
+        if not _has_pending(client):
+            return True
+
+
+# -----------------------------
+# Recommending
+# -----------------------------
+def seeker_query(profile):
+    """Term weights for a seeker: their skills, nudged by their years of experience."""
+    query = {}
+    for skill in (profile.skills or '').replace(';', ',').split(','):
+        tokens = tokenize(skill)
+        for term in tokens + bigrams(tokens):
+            query[term] = 1.0
+
+    experience = profile.experience or 0
+    level_terms = SENIOR_TERMS if experience >= 5 else JUNIOR_TERMS if experience < 2 else ()
+    for term in level_terms:
+        query.setdefault(term, 0.5)
+    return query
+
+
+def recommend_jobs(profile, n=5):
+    """
+    Top ``n`` JobListings for a job seeker's profile, best match first. Until
+    the matrix has been built, the newest jobs; the build is scheduled, never
+    run in the request.
+    """
+    query = seeker_query(profile)
+    if not query:
+        return []
+
+    matrix = load_matrix()
+    if matrix is None:
+        from .utils.tasks import schedule_job_matrix_refresh
+        schedule_job_matrix_refresh()
+        return list(JobListing.objects.for_list().order_by('-created_at', '-id')[:n])
+
+    ranked = [job_id for job_id, _ in matrix.top_n(query, n)]
+    jobs = JobListing.objects.for_list().in_bulk(ranked)
+    return [jobs[job_id] for job_id in ranked if job_id in jobs]
@@ -0,0 +1,49 @@
+"""
+Creating an account: the user row and its profile in one transaction.
+
+Duplicate usernames and emails are caught by unique constraints (the
+username column and the case-insensitive ``users_unique_email`` index on
+``auth_user``) rather than by ``exists()`` checks up front. The checks cost
+a round trip each on every sign-up and still let two concurrent sign-ups
+for the same name through. The password is hashed once, inside ``create_user``.
+"""
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from .models import UserProfile
+
+
+class RegistrationError(Exception):
+    """The username or email is already taken."""
+
+
+def register_user(username, email, password, role='JOB_SEEKER', profile_image=None, **profile_fields):
+    """
+    Create a user with a profile and return the user. Raises
+    ``RegistrationError`` if the username or email is taken; nothing is
+    written in that case.
+    """
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(username=username, email=email or '', password=password)
+            UserProfile.objects.create(user=user, role=role, profile_image=profile_image, **profile_fields)
+    except IntegrityError:
+        # Only failed sign-ups pay for finding out which value clashed
+        if User.objects.filter(username=username).exists():
+            raise RegistrationError("Username already exists")
+        if email and User.objects.filter(email__iexact=email).exists():
+            raise RegistrationError("Email already exists")
+        raise
+    return user
+
+
+def change_email(user, email):
+    """Set and save ``user``'s email. Raises ``RegistrationError`` if another account has it."""
+    previous = user.email
+    user.email = email
+    try:
+        with transaction.atomic():
+            user.save(update_fields=['email'])
+    except IntegrityError:
+        user.email = previous
+        raise RegistrationError("Email already exists")
@@ -0,0 +1,218 @@
+"""
+Full-text job search.
+
+Jobs are tokenized into weighted ``SearchPosting`` rows (term, job, weight)
+when they are saved. Besides single words, every pair of neighbouring words
+is indexed as a two-word term, which is what phrase queries match against.
+Queries are answered from that inverted index with one grouped, indexed
+query that also does the ranking, so the same code runs on SQLite and
+PostgreSQL and never touches ``JobListing.description``.
+
+Query syntax:
+    python django          both terms must match (in any field)
+    "data engineer"        phrase, the words must be next to each other
+    pyth*                  prefix
+"""
+import math
+import re
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from .locations import normalize_location
+from .models import JobListing, SearchPosting
+
+TOKEN_RE = re.compile(r'\w+')
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+MAX_TERM_LENGTH = 64
+MAX_PREFIX_EXPANSIONS = 50
+PREFIX_END = '\U0010ffff'
+
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from in is it of on or our the to we will with you your'.split()
+)
+
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'company': 2.0,
+    'location': 2.0,
+    'description': 1.0,
+}
+
+BM25_K1 = 1.2
+DOC_COUNT_KEY = 'search:doc_count'
+DOC_FREQ_KEY = 'search:df:{}'
+STATS_TIMEOUT = 60 * 5
+
+
+def tokenize(text):
+    """Lowercased word tokens, without stop words or over-long tokens."""
+    return [
+        token for token in TOKEN_RE.findall((text or '').lower())
+        if token not in STOP_WORDS and len(token) <= MAX_TERM_LENGTH
+    ]
+
+
+def bigrams(tokens):
+    return [
+        f"{first} {second}" for first, second in zip(tokens, tokens[1:])
+        if len(first) + len(second) < MAX_TERM_LENGTH
+    ]
+
+
+# -----------------------------
+# Indexing
+# -----------------------------
+def _postings_for(job):
+    """One posting per term, weighted by field and BM25 term-frequency saturation."""
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        tokens = tokenize(getattr(job, field))
+        for term, frequency in Counter(tokens + bigrams(tokens)).items():
+            weights[term] += field_weight * frequency * (BM25_K1 + 1) / (frequency + BM25_K1)
+    return [SearchPosting(term=term, job_id=job.pk, weight=weight) for term, weight in weights.items()]
+
+
+def index_jobs(jobs, batch_size=2000):
+    """(Re)index a batch of saved jobs, replacing whatever postings they had."""
+    jobs = [job for job in jobs if job.pk is not None]
+    if not jobs:
+        return
+    with transaction.atomic():
+        SearchPosting.objects.filter(job_id__in=[job.pk for job in jobs]).delete()
+        postings = [posting for job in jobs for posting in _postings_for(job)]
+        SearchPosting.objects.bulk_create(postings, batch_size=batch_size)
+
+
+def index_job(job):
+    index_jobs([job])
+
+
+# -----------------------------
+# Querying
+# -----------------------------
+def parse_query(query):
+    """
+    Split a query into clauses, each a list of index terms of which at least
+    one must match. Words give one term, a quoted phrase gives one clause per
+    pair of neighbouring words, and ``prefix*`` is expanded to the indexed
+    words starting with ``prefix``.
+    """
+    clauses = []
+    for phrase, word in QUERY_RE.findall(query or ''):
+        if phrase:
+            tokens = tokenize(phrase)
+            clauses.extend([term] for term in (bigrams(tokens) if len(tokens) > 1 else tokens))
+        elif word.endswith('*'):
+            tokens = TOKEN_RE.findall(word.lower())
+            if tokens:
+                clauses.extend([token] for token in tokenize(' '.join(tokens[:-1])))
+                clauses.append(_expand_prefix(tokens[-1]))
+        else:
+            clauses.extend([token] for token in tokenize(word))
+    # An empty clause (a prefix nothing starts with) makes the query match nothing
+    return clauses
+
+
+def _expand_prefix(prefix):
+    if len(prefix) > MAX_TERM_LENGTH:
+        return []
+    terms = (
+        SearchPosting.objects
+        .filter(term__gte=prefix, term__lt=prefix + PREFIX_END)
+        .exclude(term__contains=' ')
+        .order_by('term')
+        .values_list('term', flat=True)
+        .distinct()
+    )
+    return list(terms[:MAX_PREFIX_EXPANSIONS])
+
+
+def _document_count():
+    count = cache.get(DOC_COUNT_KEY)
+    if count is None:
+        count = JobListing.objects.count()
+        cache.set(DOC_COUNT_KEY, count, timeout=STATS_TIMEOUT)
+    return max(count, 1)
+
+
+def _document_frequencies(terms):
+    """Number of jobs containing each term, cached for a few minutes."""
+    keys = {term: DOC_FREQ_KEY.format(term.replace(' ', '_')) for term in terms}
+    cached = cache.get_many(keys.values())
+    frequencies = {term: cached[key] for term, key in keys.items() if key in cached}
+
+    missing = [term for term in terms if term not in frequencies]
+    if missing:
+        counted = dict(
+            SearchPosting.objects.filter(term__in=missing)
+            .values('term').annotate(df=Count('job'))
+            .values_list('term', 'df')
+        )
+        for term in missing:
+            frequencies[term] = counted.get(term, 0)
+        cache.set_many({keys[term]: frequencies[term] for term in missing}, timeout=STATS_TIMEOUT)
+    return frequencies
+
+
+def _job_filters(location=None, posted_after=None, posted_before=None):
+    filters = {}
+    if location:
+        # Same normalization as the jobs page facets and saved searches
+        filters['location_key'] = normalize_location(location)
+    if posted_after:
+        filters['created_at__gte'] = posted_after
+    if posted_before:
+        filters['created_at__lt'] = posted_before
+    return filters
+
+
+def search_jobs(query, location=None, posted_after=None, posted_before=None, limit=500):
+    """
+    Return up to ``limit`` ``(job_id, score)`` pairs, best BM25-style match
+    first. Every clause of the query must match. ``location`` matches the
+    normalized ``location_key`` ("Bengaluru" finds Bangalore); ``posted_after``/``posted_before`` bound
+    ``created_at``. Without search terms, the jobs matching the filters are
+    returned newest first, with a score of 0.
+    """
+    clauses = parse_query(query)
+    if any(not clause for clause in clauses):
+        return []
+    filters = _job_filters(location, posted_after, posted_before)
+    if not clauses:
+        if not filters:
+            return []
+        jobs = JobListing.objects.filter(**filters).order_by('-created_at', '-id').values_list('id', flat=True)
+        return [(job_id, 0.0) for job_id in jobs[:limit]]
+
+    clause_of = {}
+    for number, clause in enumerate(clauses):
+        for term in clause:
+            clause_of.setdefault(term, number)
+
+    total = _document_count()
+    frequencies = _document_frequencies(list(clause_of))
+    idf = {
+        term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+        for term, df in frequencies.items()
+    }
+
+    postings = SearchPosting.objects.filter(
+        term__in=list(clause_of), **{f'job__{name}': value for name, value in filters.items()}
+    )
+
+    term_idf = Case(
+        *[When(term=term, then=Value(value)) for term, value in idf.items()],
+        output_field=FloatField(),
+    )
+    rows = postings.values('job_id').annotate(score=Sum(term_idf * F('weight'), output_field=FloatField()))
+
+    required = len(set(clause_of.values()))
+    if required > 1:
+        clause_number = Case(*[When(term=term, then=Value(number)) for term, number in clause_of.items()])
+        rows = rows.annotate(matched=Count(clause_number, distinct=True)).filter(matched=required)
+
+    rows = rows.order_by('-score', '-job_id').values_list('job_id', 'score')
+    return list(rows[:limit])
@@ -0,0 +1,262 @@
+"""
+Synthetic data for benchmarks and local load testing.
+
+Rows are written with ``bulk_create`` in batches and every seeded user
+shares one password hash, so seeding costs a few inserts per batch rather
+than a password hash and a handful of queries per user.
+
+Values follow rough real-world shapes rather than uniform picks: jobs and
+people cluster in the big metros, a few skills are far more common than the
+rest, most users are job seekers, experience is skewed towards juniors and
+``created_at`` dates thin out going back in time.
+"""
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from . import facets, job_cache, search
+from .models import JobListing, UserProfile
+from .recommendations import refresh_matrix
+
+SEED_PASSWORD = 'seed-password-123'
+
+TITLES = ['Software Engineer', 'Data Engineer', 'Data Scientist', 'Product Manager', 'DevOps Engineer',
+          'Backend Developer', 'Frontend Developer', 'QA Analyst', 'Business Analyst', 'UX Designer',
+          'Machine Learning Engineer', 'Site Reliability Engineer', 'Support Engineer', 'Sales Executive']
+SENIORITY = ['Junior', 'Senior', 'Lead', 'Principal', 'Associate', '']
+COMPANIES = ['Infosys', 'TCS', 'Wipro', 'Flipkart', 'Zomato', 'Swiggy', 'Razorpay', 'Freshworks',
+             'Zoho', 'Paytm', 'Ola', 'Byju', 'Accenture', 'Capgemini', 'Deloitte']
+LOCATIONS = ['Bangalore', 'Mumbai', 'Delhi', 'Hyderabad', 'Chennai', 'Pune', 'Kolkata', 'Remote',
+             'Noida', 'Gurgaon', 'Ahmedabad', 'Jaipur']
+SKILLS = ['python', 'django', 'java', 'spring', 'react', 'angular', 'sql', 'postgres', 'aws', 'docker',
+          'kubernetes', 'spark', 'kafka', 'pandas', 'tensorflow', 'excel', 'figma', 'selenium', 'golang',
+          'redis', 'celery', 'linux', 'terraform', 'node', 'typescript']
+FILLER = ['team', 'build', 'scalable', 'systems', 'customers', 'experience', 'years', 'ownership',
+          'collaborate', 'fast', 'paced', 'environment', 'design', 'deliver', 'quality', 'products']
+EDUCATION = ['B.Tech', 'B.E.', 'BCA', 'MCA', 'M.Tech', 'B.Sc', 'MBA']
+
+# Relative weights, in the order of LOCATIONS / SENIORITY
+LOCATION_WEIGHTS = [22, 14, 10, 12, 8, 9, 4, 8, 5, 5, 2, 1]
+SENIORITY_WEIGHTS = [25, 25, 8, 3, 14, 25]
+# Zipf-like: the first skills and companies are by far the most common
+SKILL_WEIGHTS = [1 / (rank ** 0.8) for rank in range(1, len(SKILLS) + 1)]
+COMPANY_WEIGHTS = [1 / (rank ** 0.6) for rank in range(1, len(COMPANIES) + 1)]
+
+# Share of each role among seeded users
+ROLE_WEIGHTS = {'JOB_SEEKER': 0.88, 'RECRUITER': 0.1, 'ADMIN': 0.02}
+
+# rng.choices() re-accumulates plain weights on every call
+LOCATION_CUM_WEIGHTS = list(accumulate(LOCATION_WEIGHTS))
+SENIORITY_CUM_WEIGHTS = list(accumulate(SENIORITY_WEIGHTS))
+SKILL_CUM_WEIGHTS = list(accumulate(SKILL_WEIGHTS))
+COMPANY_CUM_WEIGHTS = list(accumulate(COMPANY_WEIGHTS))
+
+MEAN_EXPERIENCE = 4
+HISTORY_DAYS = 365
+MEAN_AGE_DAYS = 60
+
+
+def _weighted_sample(rng, population, cum_weights, k):
+    picked = set()
+    while len(picked) < k:
+        picked.update(rng.choices(population, cum_weights=cum_weights, k=k - len(picked)))
+    return list(picked)
+
+
+def _past_datetime(rng, now):
+    age = min(rng.expovariate(1 / MEAN_AGE_DAYS), HISTORY_DAYS)
+    return now - timedelta(days=age)
+
+
+@contextmanager
+def manual_timestamps(model, *field_names):
+    """Let ``bulk_create`` keep the values set on auto_now/auto_now_add fields."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def synthetic_job(rng, user, created_at=None):
+    title = f"{rng.choices(SENIORITY, cum_weights=SENIORITY_CUM_WEIGHTS)[0]} {rng.choice(TITLES)}".strip()
+    skills = _weighted_sample(rng, SKILLS, SKILL_CUM_WEIGHTS, 4)
+    words = skills + rng.sample(FILLER, 8)
+    rng.shuffle(words)
+    description = f"We are hiring a {title}. Must know {', '.join(skills)}. " + ' '.join(words)
+    job = JobListing(
+        title=title,
+        company=rng.choices(COMPANIES, cum_weights=COMPANY_CUM_WEIGHTS)[0],
+        location=rng.choices(LOCATIONS, cum_weights=LOCATION_CUM_WEIGHTS)[0],
+        description=description,
+        created_by=user,
+    )
+    if created_at is not None:
+        job.created_at = job.updated_at = created_at
+    job.refresh_derived_fields()
+    return job
+
+
+def synthetic_profile(rng, user, role):
+    return UserProfile(
+        user=user,
+        role=role,
+        location=rng.choices(LOCATIONS, cum_weights=LOCATION_CUM_WEIGHTS)[0],
+        skills=', '.join(_weighted_sample(rng, SKILLS, SKILL_CUM_WEIGHTS, rng.randint(2, 6))),
+        experience=min(int(rng.expovariate(1 / MEAN_EXPERIENCE)), 30),
+        education=rng.choice(EDUCATION),
+    )
+
+
+def seed_users(count, prefix, rng, batch_size=5000, password_hash=None, start=0):
+    """
+    Create users ``prefix<start>`` .. ``prefix<start + count - 1>`` with
+    profiles; returns ``{role: [user_id, ...]}``.
+    """
+    password_hash = password_hash or make_password(SEED_PASSWORD)
+    roles, weights = zip(*ROLE_WEIGHTS.items())
+    by_role = {role: [] for role in roles}
+    now = timezone.now()
+
+    for first in range(start, start + count, batch_size):
+        users = [
+            User(
+                username=f"{prefix}{i}", email=f"{prefix}{i}@example.com",
+                password=password_hash, date_joined=_past_datetime(rng, now),
+            )
+            for i in range(first, min(start + count, first + batch_size))
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        profiles = [synthetic_profile(rng, user, rng.choices(roles, weights)[0]) for user in users]
+        UserProfile.objects.bulk_create(profiles, batch_size=batch_size)
+        for profile in profiles:
+            by_role[profile.role].append(profile.user_id)
+    return by_role
+
+
+def seed_jobs(count, recruiter_ids, rng, batch_size=2000, index=True):
+    """Create ``count`` jobs posted by ``recruiter_ids``, indexed for search unless ``index=False``."""
+    recruiters = [User(id=user_id) for user_id in recruiter_ids]
+    now = timezone.now()
+    with manual_timestamps(JobListing, 'created_at', 'updated_at'):
+        for start in range(0, count, batch_size):
+            jobs = [
+                synthetic_job(rng, rng.choice(recruiters), _past_datetime(rng, now))
+                for _ in range(min(batch_size, count - start))
+            ]
+            JobListing.objects.bulk_create(jobs)
+            facets.add_jobs(jobs)
+            if index:
+                search.index_jobs(jobs)
+
+
+def forget_cached_data(recruiter_ids=(), job_ids=()):
+    """
+    Drop everything cached from the job table. Call it after seeding, and
+    again after rolling seeded data back, passing the jobs whose pages were
+    visited (their ids can be handed out again).
+    """
+    job_cache.jobs_changed_in_bulk(recruiter_ids)
+    job_cache.bump(*(f'job:{job_id}' for job_id in job_ids))
+    cache.delete(search.DOC_COUNT_KEY)
+    refresh_matrix()
+
+
+def _ensure_every_role(by_role, prefix, password_hash):
+    for role, user_ids in by_role.items():
+        if not user_ids:
+            user = User.objects.create(username=f"{prefix}{role.lower()}", password=password_hash)
+            UserProfile.objects.create(user=user, role=role)
+            user_ids.append(user.id)
+
+
+def seed(users, jobs, prefix='seed_', seed=42, batch_size=5000, index=True):
+    """
+    Seed ``users`` users and ``jobs`` jobs. Every role gets at least one user.
+    Returns ``{role: [user_id, ...]}``.
+    """
+    rng = random.Random(seed)
+    password_hash = make_password(SEED_PASSWORD)
+    by_role = seed_users(users, prefix, rng, batch_size=batch_size, password_hash=password_hash)
+    _ensure_every_role(by_role, prefix, password_hash)
+
+    seed_jobs(jobs, by_role['RECRUITER'], rng, batch_size=batch_size, index=index)
+    forget_cached_data(by_role['RECRUITER'])
+    return by_role
+
+
+# -----------------------------
+# Parallel seeding
+# -----------------------------
+def _init_worker():
+    # Spawned workers start from scratch; forked ones must not share the
+    # parent's database connections
+    django.setup()
+    connections.close_all()
+
+
+def _seed_users_chunk(start, count, prefix, seed, batch_size, password_hash):
+    rng = random.Random(f"{seed}:users:{start}")
+    return seed_users(count, prefix, rng, batch_size=batch_size, password_hash=password_hash, start=start)
+
+
+def _seed_jobs_chunk(start, count, recruiter_ids, seed, batch_size, index):
+    rng = random.Random(f"{seed}:jobs:{start}")
+    seed_jobs(count, recruiter_ids, rng, batch_size=batch_size, index=index)
+    return count
+
+
+def _chunks(total, size):
+    return [(start, min(size, total - start)) for start in range(0, total, size)]
+
+
+def seed_parallel(users, jobs, prefix='seed_', seed=42, workers=4, batch_size=5000, chunk_size=50_000,
+                  index=True, progress=None):
+    """
+    Like ``seed()``, with users and then jobs generated in chunks of
+    ``chunk_size`` rows across ``workers`` processes. ``progress(kind, rows)``
+    is called as chunks finish.
+    """
+    password_hash = make_password(SEED_PASSWORD)
+    by_role = {role: [] for role in ROLE_WEIGHTS}
+
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(_seed_users_chunk, start, count, prefix, seed, batch_size, password_hash)
+            for start, count in _chunks(users, chunk_size)
+        ]
+        for future in futures:
+            for role, user_ids in future.result().items():
+                by_role[role].extend(user_ids)
+            if progress:
+                progress('users', sum(len(ids) for ids in by_role.values()))
+
+        _ensure_every_role(by_role, prefix, password_hash)
+        connections.close_all()
+
+        futures = [
+            pool.submit(_seed_jobs_chunk, start, count, by_role['RECRUITER'], seed, batch_size, index)
+            for start, count in _chunks(jobs, chunk_size)
+        ]
+        done = 0
+        for future in futures:
+            done += future.result()
+            if progress:
+                progress('jobs', done)
+
+    forget_cached_data(by_role['RECRUITER'])
+    return by_role
@@ -17,7 +17,26 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class JobListingSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    A ModelSerializer that takes ``fields`` and ``omit`` keyword arguments to
+    narrow down which fields are serialized.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+
+class JobListingSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = JobListing
-        fields = '__all__'
+        # Applicant and view counts are for the job's recruiter only
+        exclude = JobListing.COUNTER_FIELDS
@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
+from django.dispatch import receiver
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from . import facets, featured, job_cache, permissions, search
+from .backends import forget_user_role
+from .models import JobApplication, JobListing, UserProfile
+from .utils.tasks import refresh_job_matrix_dev
+
+_muted = ContextVar('job_signals_muted', default=False)
+
+
+@contextmanager
+def job_signals_muted():
+    """
+    Skip the per-job receivers below, for bulk writers that update the index,
+    facets and caches once per batch themselves (see users.archival).
+    """
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+@receiver(pre_save, sender=JobListing)
+def job_saving(sender, instance, update_fields=None, **kwargs):
+    if _muted.get():
+        return
+    # The facet count to move from, if the location may change
+    instance._previous_location_key = None
+    if not instance._state.adding and (update_fields is None or 'location_key' in update_fields):
+        instance._previous_location_key = (
+            JobListing.objects.filter(pk=instance.pk).values_list('location_key', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=JobListing)
+def job_saved(sender, instance, created, **kwargs):
+    if _muted.get():
+        return
+    search.index_job(instance)
+    if created:
+        facets.job_moved(None, instance.location_key)
+    elif instance._previous_location_key is not None:
+        facets.job_moved(instance._previous_location_key, instance.location_key)
+    job_id, recruiter_id = instance.pk, instance.created_by_id
+    transaction.on_commit(lambda: job_cache.job_changed(job_id, recruiter_id))
+    if created:
+        transaction.on_commit(lambda: featured.add_to_pool(job_id))
+    transaction.on_commit(lambda: refresh_job_matrix_dev([job_id]))
+
+
+@receiver(post_delete, sender=JobListing)
+def job_deleted(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    facets.job_moved(instance.location_key, None)
+    # Not a database cascade, so archiving (signals muted) keeps them
+    JobApplication.objects.filter(job_id=instance.pk).delete()
+    job_id, recruiter_id = instance.pk, instance.created_by_id
+    transaction.on_commit(lambda: job_cache.job_changed(job_id, recruiter_id))
+    transaction.on_commit(lambda: featured.remove_from_pool(job_id))
+    transaction.on_commit(lambda: refresh_job_matrix_dev([job_id]))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    forget_user_role(user_id)
+    transaction.on_commit(lambda: forget_user_role(user_id))
+
+
+@receiver(post_save, sender=UserObjectPermission)
+@receiver(post_delete, sender=UserObjectPermission)
+def user_object_permission_changed(sender, instance, **kwargs):
+    user_ids = [instance.user_id]
+    permissions.permissions_changed(user_ids)
+    transaction.on_commit(lambda: permissions.permissions_changed(user_ids))
+
+
+@receiver(post_save, sender=GroupObjectPermission)
+@receiver(post_delete, sender=GroupObjectPermission)
+def group_object_permission_changed(sender, instance, **kwargs):
+    permissions.permissions_changed()
+    transaction.on_commit(permissions.permissions_changed)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    # From the group side the users are in pk_set, except on clear
+    user_ids = (list(pk_set) if pk_set else None) if reverse else [instance.pk]
+    permissions.permissions_changed(user_ids)
+    transaction.on_commit(lambda: permissions.permissions_changed(user_ids))
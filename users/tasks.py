@@ -1,12 +1,128 @@
+import logging
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.cache import cache
+
+from . import alerts, emails, images, job_stats, recommendations
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_job_matrix():
+    """Apply the job changes queued since the last refresh to the recommendations matrix."""
+    cache.delete(recommendations.SCHEDULED_KEY)
+    # If another refresh holds the lock, it picks up what was queued
+    recommendations.refresh_pending()
+
+
+def flush_welcome_queue():
+    """
+    Send one batch of queued welcome emails over a single connection.
+    Returns False, without sending, if another flush holds the lock.
+    """
+    if not cache.add(emails.FLUSH_LOCK_KEY, True, timeout=emails.FLUSH_LOCK_TIMEOUT):
+        return False
+    try:
+        cache.delete(emails.SCHEDULED_KEY)
+        entries = emails.pop_batch(emails.batch_size())
+        # Entries that could not be sent, even if the connection never opened,
+        # come back for the retry path
+        failed = emails.send_batch(entries)
+        if emails.queue_length():
+            flush_welcome_emails.delay()
+    finally:
+        cache.delete(emails.FLUSH_LOCK_KEY)
+    _retry_welcome_emails(failed)
+    return True
+
+
+def _retry_welcome_emails(failed):
+    retry, given_up = [], []
+    for entry in failed:
+        (retry if entry['attempts'] < emails.max_attempts() else given_up).append(entry)
+    for entry in given_up:
+        logger.error("Giving up on the welcome email to %s after %s attempts", entry['email'], entry['attempts'])
+    if retry:
+        flush_welcome_emails.apply_async(
+            kwargs={'retries': retry},
+            countdown=emails.retry_countdown(max(entry['attempts'] for entry in retry)),
+        )
+
+
+@shared_task(bind=True, max_retries=None)
+def flush_welcome_emails(self, retries=None):
+    """
+    Flush the welcome email queue (see ``flush_welcome_queue``), or re-send
+    ``retries`` (entries that failed before) after their backoff.
+    """
+    if retries is None:
+        if not flush_welcome_queue():
+            raise self.retry(countdown=emails.batch_window())
+    else:
+        _retry_welcome_emails(emails.send_batch(retries))
+
+
+@shared_task
+def process_profile_image(profile_id, image_name):
+    """Re-encode an uploaded profile image and write its thumbnails."""
+    return images.process_profile_image(profile_id, image_name)
+
+
+@shared_task
+def archive_expired_jobs():
+    """Move expired postings to the archive; scheduled by Celery beat."""
+    # Imported here: users.archival imports the signals, which import this module
+    from . import archival
+
+    if not cache.add(archival.LOCK_KEY, True, timeout=archival.LOCK_TIMEOUT):
+        return 0
+    try:
+        archived, more = archival.archive_expired()
+    finally:
+        cache.delete(archival.LOCK_KEY)
+    if archived:
+        logger.info("Archived %s expired jobs", archived)
+    if more:
+        archive_expired_jobs.delay()
+    return archived
+
+
+@shared_task
+def match_saved_searches():
+    """Turn jobs posted since the last run into alerts for matching saved searches; scheduled by Celery beat."""
+    if not cache.add(alerts.MATCH_LOCK_KEY, True, timeout=alerts.LOCK_TIMEOUT):
+        return 0
+    try:
+        scanned, created = alerts.match_new_jobs()
+    finally:
+        cache.delete(alerts.MATCH_LOCK_KEY)
+    if created:
+        logger.info("Matched %s new jobs against saved searches: %s alerts", scanned, created)
+    return created
+
+
+@shared_task
+def send_job_alert_digests():
+    """Email every user one digest of their pending job alerts; scheduled by Celery beat."""
+    if not cache.add(alerts.DIGEST_LOCK_KEY, True, timeout=alerts.LOCK_TIMEOUT):
+        return 0
+    try:
+        sent, failed = alerts.send_digests()
+    finally:
+        cache.delete(alerts.DIGEST_LOCK_KEY)
+    if failed:
+        logger.warning("%s job alert digests failed and will be retried next run", failed)
+    logger.info("Sent %s job alert digests", sent)
+    return sent
+
 
 @shared_task
-def send_welcome_email(username, user_email):
-    send_mail(
-        subject=f"Welcome to Job Portal, {username} 🎉",
-        message=f"Hi {username},\n\nThank you for registering on Job Portal. Explore jobs and apply today!",
-        from_email="noreply@jobportal.com",
-        recipient_list=[user_email],
-        fail_silently=False,
-    )
\ No newline at end of file
+def flush_job_views():
+    """Write the buffered job view counts to the database; scheduled by Celery beat."""
+    if not cache.add(job_stats.FLUSH_LOCK_KEY, True, timeout=job_stats.FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        return job_stats.flush_views()
+    finally:
+        cache.delete(job_stats.FLUSH_LOCK_KEY)
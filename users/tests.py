@@ -1,3 +1,951 @@
-from django.test import TestCase
+import csv
+import hashlib
+import importlib
+import io
+import logging
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from guardian.shortcuts import assign_perm, remove_perm
+from PIL import Image
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from . import alerts, applications, archival, async_views, emails, facets, featured, images, importers, job_cache, job_stats, middleware, page_cache, permissions, recommendations, search, throttling, views
+from .locations import normalize_location
+from .log_handlers import QueuedHandler
+from .models import EXCERPT_LENGTH, ArchivedJobListing, JobAlert, JobApplication, JobListing, LocationFacet, SearchPosting, UserProfile
+from .registration import RegistrationError, register_user
+from .tasks import flush_welcome_emails, refresh_job_matrix
+from .utils.tasks import send_welcome_email_dev
+
+
+class FlakyEmailBackend(EmailBackend):
+    """locmem backend that refuses one recipient and counts opened connections."""
+    opened = 0
+
+    def open(self):
+        FlakyEmailBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if any('bounce@example.com' in message.to for message in messages):
+            raise ConnectionError("Recipient refused")
+        return super().send_messages(messages)
+
+
+class UnreachableOnceEmailBackend(EmailBackend):
+    """locmem backend whose first connection attempt fails, like an SMTP outage."""
+    attempts = 0
+
+    def open(self):
+        UnreachableOnceEmailBackend.attempts += 1
+        if UnreachableOnceEmailBackend.attempts == 1:
+            raise ConnectionError("SMTP server unreachable")
+        return super().open()
+
+
+@override_settings(WELCOME_EMAIL_RATE_LIMIT=0, WELCOME_EMAIL_MAX_ATTEMPTS=3)
+class WelcomeEmailBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        FlakyEmailBackend.opened = 0
+
+    def test_queued_emails_are_sent_in_one_batch(self):
+        for i in range(3):
+            emails.enqueue(f"user{i}", f"user{i}@example.com")
+        flush_welcome_emails()
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f"user{i}@example.com" for i in range(3)])
+        self.assertEqual(emails.queue_length(), 0)
+
+    def test_only_first_signup_of_a_window_schedules_a_flush(self):
+        self.assertTrue(emails.enqueue("a", "a@example.com"))
+        self.assertFalse(emails.enqueue("b", "b@example.com"))
+
+    @override_settings(EMAIL_BACKEND='users.tests.FlakyEmailBackend')
+    def test_failed_recipient_is_retried_without_failing_the_batch(self):
+        emails.enqueue("ok", "ok@example.com")
+        emails.enqueue("bounce", "bounce@example.com")
+        emails.enqueue("fine", "fine@example.com")
+        flush_welcome_emails()
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["fine@example.com", "ok@example.com"])
+        # one connection for the batch, one reopened after each failure, one per retry
+        self.assertEqual(FlakyEmailBackend.opened, 1 + 1 + 2 * 2)
+
+    @override_settings(EMAIL_BACKEND='users.tests.UnreachableOnceEmailBackend')
+    def test_batch_is_retried_when_the_connection_cannot_open(self):
+        UnreachableOnceEmailBackend.attempts = 0
+        emails.enqueue("a", "a@example.com")
+        emails.enqueue("b", "b@example.com")
+        flush_welcome_emails()
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["a@example.com", "b@example.com"])
+        self.assertEqual(emails.queue_length(), 0)
+
+    def test_signup_helper_queues_and_flushes(self):
+        send_welcome_email_dev("new", "new@example.com")
+        self.assertEqual([m.to for m in mail.outbox], [["new@example.com"]])
+
+
+class ProfileEmailTests(TestCase):
+    def test_taken_email_is_reported_not_a_server_error(self):
+        User.objects.create_user('first', 'taken@example.com', 'pw-123456789')
+        user = User.objects.create_user('second', 'second@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=user, role='JOB_SEEKER')
+        self.client.force_login(user)
+
+        response = self.client.post(reverse('edit_profile'), {'email': 'taken@example.com', 'location': 'Pune'})
+        self.assertRedirects(response, reverse('edit_profile'), fetch_redirect_response=False)
+        user.refresh_from_db()
+        self.assertEqual(user.email, 'second@example.com')
+
+    def test_sessions_from_before_the_profile_backend_stay_logged_in(self):
+        user = User.objects.create_user('existing', 'existing@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=user, role='JOB_SEEKER')
+        self.client.force_login(user, backend='django.contrib.auth.backends.ModelBackend')
+
+        self.assertEqual(self.client.get(reverse('edit_profile')).status_code, 200)
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('admin', 'admin@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='ADMIN')
+
+    def test_sampled_requests_report_timings_without_leaking_query_hooks(self):
+        self.client.force_login(self.user)
+        wrappers = list(connection.execute_wrappers)
+        with self.assertLogs('users.instrumentation', 'INFO') as logs:
+            for _ in range(3):
+                response = self.client.get(reverse('jobs'))
+        self.assertIn('queries', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        self.assertEqual(connection.execute_wrappers, wrappers)
+        self.assertGreater(logs.records[-1].metrics['queries'], 0)
+
+    def test_cache_counts_pass_backend_specific_arguments_through(self):
+        class Backend:
+            def get(self, key, default=None, version=None, client=None):
+                return client
+
+            def get_many(self, keys, version=None, client=None):
+                return {key: client for key in keys}
+
+        class CountingBackend(middleware.CacheMetricsMixin, Backend):
+            pass
+
+        metrics = middleware.RequestMetrics()
+        token = middleware._current.set(metrics)
+        try:
+            self.assertEqual(CountingBackend().get('a', client='replica'), 'replica')
+            self.assertEqual(CountingBackend().get_many(['a', 'b'], client='replica'), {'a': 'replica', 'b': 'replica'})
+        finally:
+            middleware._current.reset(token)
+        self.assertEqual(metrics.cache_hits, 3)
+
+
+class UniqueEmailTests(TestCase):
+    def test_emails_differing_only_in_case_are_rejected(self):
+        register_user('first', 'Foo@Example.com', 'pw-123456789')
+        with self.assertRaisesMessage(RegistrationError, "Email already exists"):
+            register_user('second', 'foo@example.com', 'pw-123456789')
+
+    def test_migration_keeps_each_email_on_one_account(self):
+        dedupe_emails = importlib.import_module('users.migrations.0013_unique_user_email_ci').dedupe_emails
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX users_unique_email")
+        first = User.objects.create_user('first', 'foo@example.com')
+        second = User.objects.create_user('second', 'FOO@example.com', last_login=timezone.now())
+        with mock.patch('builtins.print'):
+            dedupe_emails(django_apps, None)
+
+        self.assertEqual(User.objects.get(id=first.id).email, '')
+        self.assertEqual(User.objects.get(id=second.id).email, 'FOO@example.com')
+
+
+class ProfileImageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        user = User.objects.create_user('seeker', 'seeker@example.com', 'pw-123456789')
+        self.profile = UserProfile.objects.create(user=user, role='JOB_SEEKER')
+
+    def upload(self, name, image, **options):
+        buffer = io.BytesIO()
+        image.save(buffer, **options)
+        self.profile.profile_image.save(name, ContentFile(buffer.getvalue()))
+        return self.profile.profile_image.name
+
+    def test_oriented_jpeg_is_rotated_stripped_and_given_variants(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to display
+        exif[0x010F] = "PhoneMaker"
+        name = self.upload('photo.jpg', Image.new('RGB', (2000, 1000), 'red'), format='JPEG', exif=exif.tobytes())
+
+        self.assertIsNotNone(images.process_profile_image(self.profile.id, name))
+        self.profile.refresh_from_db()
+        self.assertNotEqual(self.profile.profile_image.name, name)
+        self.assertFalse(default_storage.exists(name))
+        with default_storage.open(self.profile.profile_image.name) as f, Image.open(f) as processed:
+            self.assertEqual(processed.format, 'JPEG')
+            self.assertEqual(processed.size, (512, 1024))
+            self.assertEqual(dict(processed.getexif()), {})
+
+        files = self.profile.image_variants['files']
+        for fmt, pil_format in (('jpeg', 'JPEG'), ('webp', 'WEBP')):
+            self.assertEqual(sorted(files[fmt], key=int), [str(size) for size in images.VARIANT_SIZES])
+            for size, variant in files[fmt].items():
+                with default_storage.open(variant) as f, Image.open(f) as thumbnail:
+                    self.assertEqual((thumbnail.format, thumbnail.size), (pil_format, (int(size), int(size))))
+        self.assertIn(f"{images.VARIANT_SIZES[-1]}w", self.profile.webp_srcset)
+
+    def test_transparent_png_gets_a_white_background(self):
+        image = Image.new('RGBA', (100, 100), (0, 0, 0, 0))
+        name = self.upload('logo.png', image, format='PNG')
+
+        images.process_profile_image(self.profile.id, name)
+        self.profile.refresh_from_db()
+        with default_storage.open(self.profile.profile_image.name) as f, Image.open(f) as processed:
+            self.assertEqual(processed.convert('RGB').getpixel((50, 50)), (255, 255, 255))
+
+
+class AsyncJobViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='RECRUITER')
+        self.jobs = [
+            JobListing.objects.create(title=f"Engineer {i}", company="Acme", location="Pune",
+                                      description="Build things.", created_by=self.user)
+            for i in range(12)
+        ]
+
+    def request(self, factory, path, data=None):
+        request = factory.get(path, data)
+        # A cookie keeps the anonymous page cache out of the comparison
+        request.COOKIES['sessionid'] = 'test'
+        request.session = {}
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        return request
+
+    def assertSameContent(self, sync_response, async_response):
+        self.assertEqual(sync_response.status_code, async_response.status_code)
+        csrf = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]*"')
+        self.assertEqual(csrf.sub(b'', sync_response.content), csrf.sub(b'', async_response.content))
+
+    async def test_async_views_render_what_the_sync_views_render(self):
+        cases = [
+            (views.jobs_view, async_views.jobs_view, reverse('jobs'), {'location': 'pune'}, {}),
+            (views.job_details_view, async_views.job_details_view,
+             reverse('job-details', args=[self.jobs[0].id]), None, {'job_id': self.jobs[0].id}),
+        ]
+        for sync_view, async_view, path, data, kwargs in cases:
+            with self.subTest(path=path):
+                sync_response = await sync_to_async(sync_view)(self.request(RequestFactory(), path, data), **kwargs)
+                async_response = await async_view(self.request(AsyncRequestFactory(), path, data), **kwargs)
+                self.assertIn(b'Engineer', sync_response.content)
+                self.assertSameContent(sync_response, async_response)
+
+
+class BlockingHandler(logging.Handler):
+    """Collects records, but holds the first one until released, like a stalled disk."""
+
+    def __init__(self):
+        super().__init__()
+        self.unblocked = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.unblocked.wait(5)
+        self.records.append(record)
+
+
+class QueuedLogHandlerTests(TestCase):
+    def test_full_queue_drops_and_counts_records_instead_of_blocking(self):
+        target = BlockingHandler()
+        handler = QueuedHandler([target], queue_size=2)
+        logger = logging.getLogger('users.tests.queued')
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        started = time.monotonic()
+        for i in range(10):
+            logger.warning("record %s", i)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertGreater(handler.dropped, 0)
+        dropped = handler.dropped
+
+        target.unblocked.set()
+        handler.queue.join()
+        logger.warning("after")
+        handler.queue.join()
+        QueuedHandler._stop(handler._listener)
+        messages = [record.getMessage() for record in target.records]
+        self.assertIn(f"Log queue was full; dropped {dropped} records", messages)
+        self.assertEqual(messages[-1], "after")
+        self.assertEqual(len(messages), 10 - dropped + 2)
+
+
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttling.memory_windows.clear()
+
+    def test_attempts_over_the_rate_are_rejected_before_authenticating(self):
+        limit, _ = throttling.get_rate('login')
+        with mock.patch('users.views.authenticate', return_value=None) as authenticate:
+            for _ in range(limit + 2):
+                self.client.post(reverse('login'), {'username': 'victim', 'password': 'guess'})
+
+        self.assertEqual(authenticate.call_count, limit)
+        self.assertEqual(throttling.rejected_counts()['login'], {'ip': 2, 'account': 0})
+
+    def test_account_window_is_shared_across_ips(self):
+        limit, _ = throttling.get_rate('login')
+        with mock.patch('users.views.authenticate', return_value=None) as authenticate:
+            for i in range(limit + 1):
+                self.client.post(reverse('login'), {'username': 'Victim', 'password': 'guess'},
+                                 REMOTE_ADDR=f'10.0.0.{i}')
+
+        self.assertEqual(authenticate.call_count, limit)
+        self.assertEqual(throttling.rejected_counts()['login'], {'ip': 0, 'account': 1})
+
+    def test_password_reset_is_throttled(self):
+        limit, _ = throttling.get_rate('password_reset')
+        for _ in range(limit):
+            response = self.client.post(reverse('password_reset'), {'email': 'nobody@example.com'})
+            self.assertEqual(response.status_code, 302)
+
+        response = self.client.post(reverse('password_reset'), {'email': 'nobody@example.com'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+class JobSearchTests(TestCase):
+    def setUp(self):
+        recruiter = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        self.pune = JobListing.objects.create(title="Python Developer", company="Acme", location="Pune",
+                                              description="Django", created_by=recruiter)
+        self.chennai = JobListing.objects.create(title="Python Developer", company="Acme", location="Chennai",
+                                                 description="Flask", created_by=recruiter)
+
+    def test_filters_alone_return_the_newest_matching_jobs(self):
+        self.assertEqual(search.search_jobs('', location='pune'), [(self.pune.id, 0.0)])
+        self.assertEqual(search.search_jobs('python', location='Madras')[0][0], self.chennai.id)
+        self.assertEqual(search.search_jobs(''), [])
+
+    def test_prefix_without_expansions_matches_nothing(self):
+        self.assertEqual(len(search.search_jobs('python')), 2)
+        self.assertEqual(search.search_jobs('python zzz*'), [])
+
+
+class JobListProjectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('admin', 'admin@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='ADMIN')
+        for i in range(3):
+            JobListing.objects.create(
+                title=f"Engineer {i}", company="Acme", location="Pune",
+                description="Build things. " * 100, created_by=self.user,
+            )
+
+    def job_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries.captured_queries if 'FROM "users_joblisting"' in q['sql']]
+
+    def test_list_pages_do_not_select_the_description(self):
+        self.client.force_login(self.user)
+        for url in (reverse('home'), reverse('jobs'), reverse('jobs') + '?page=1'):
+            queries = self.job_queries(url)
+            self.assertTrue(queries, url)
+            for sql in queries:
+                self.assertNotIn('"users_joblisting"."description",', sql)
+                self.assertNotIn('"users_joblisting"."description" ', sql)
+
+    def test_cursors_walk_every_page_forward_and_back(self):
+        for i in range(3, 25):
+            JobListing.objects.create(title=f"Engineer {i}", company="Acme", location="Pune",
+                                      description="Build things.", created_by=self.user)
+        expected = list(JobListing.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.client.force_login(self.user)
+
+        pages, cursor = [], ''
+        while True:
+            page_obj = self.client.get(reverse('jobs'), {'cursor': cursor}).context['page_obj']
+            pages.append([job.id for job in page_obj])
+            if not page_obj.has_next:
+                break
+            cursor = page_obj.next_cursor
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([job_id for page in pages for job_id in page], expected)
+
+        back = []
+        while page_obj.has_previous:
+            page_obj = self.client.get(reverse('jobs'), {'cursor': page_obj.previous_cursor}).context['page_obj']
+            back.append([job.id for job in page_obj])
+        self.assertEqual(back, pages[-2::-1])
+
+        tampered = cursor[:-2] + ('AA' if not cursor.endswith('AA') else 'BB')
+        page_obj = self.client.get(reverse('jobs'), {'cursor': tampered}).context['page_obj']
+        self.assertEqual([job.id for job in page_obj], pages[0])
+
+    def test_invalid_cursor_shares_the_first_page_cache_entry(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('jobs') + '?cursor=not-a-cursor')
+        self.assertIsNotNone(cache.get(job_cache.list_key(None, 'page', normalize_location(None), '')))
+        self.assertIsNone(cache.get(job_cache.list_key(None, 'page', normalize_location(None), 'not-a-cursor')))
+
+    def test_excerpt_follows_the_description(self):
+        job = JobListing.objects.first()
+        self.assertLessEqual(len(job.description_excerpt), EXCERPT_LENGTH)
+        self.assertTrue(job.description_excerpt.startswith("Build things. Build things."))
+
+        job.description = "Short and new"
+        job.save(update_fields=['description'])
+        job.refresh_from_db()
+        self.assertEqual(job.description_excerpt, "Short and new")
+
+
+class JobAPIConditionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='RECRUITER')
+        self.jobs = [
+            JobListing.objects.create(title=f"Engineer {i}", company="Acme", location="Pune",
+                                      description="Build things", created_by=self.user)
+            for i in range(3)
+        ]
+        self.client.force_login(self.user)
+
+    def test_unchanged_page_is_not_modified(self):
+        response = self.client.get(reverse('api-jobs'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('description', response.json()['results'][0])
+
+        response = self.client.get(reverse('api-jobs'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_follows_the_selected_fields(self):
+        full = self.client.get(reverse('api-jobs'))
+        titles = self.client.get(reverse('api-jobs') + '?fields=id,title')
+        self.assertEqual(set(titles.json()['results'][0]), {'id', 'title'})
+        self.assertNotEqual(titles['ETag'], full['ETag'])
+        response = self.client.get(reverse('api-jobs') + '?fields=id,title', HTTP_IF_NONE_MATCH=full['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_job_leaving_the_page_changes_the_validators(self):
+        response = self.client.get(reverse('api-jobs'))
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.jobs[1].delete()
+
+        response = self.client.get(reverse('api-jobs'), HTTP_IF_NONE_MATCH=etag,
+                                   HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_single_job_honours_if_modified_since(self):
+        url = reverse('api-job-details', args=[self.jobs[0].id])
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        self.jobs[0].title = "Staff Engineer"
+        self.jobs[0].save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.json()['title'], "Staff Engineer")
+
+
+class LocationFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('admin', 'admin@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='ADMIN')
+
+    def create_job(self, location):
+        return JobListing.objects.create(
+            title="Engineer", company="Acme", location=location, description="Build things.", created_by=self.user,
+        )
+
+    def counts(self):
+        return dict(LocationFacet.objects.filter(job_count__gt=0).values_list('key', 'job_count'))
+
+    def test_signals_keep_counts_in_step_with_a_rebuild(self):
+        self.create_job("Bengaluru")
+        self.create_job("Bangalore, Karnataka")
+        moved = self.create_job("Pune")
+        gone = self.create_job("Mumbai")
+        moved.location = " bangalore "
+        moved.save()
+        gone.delete()
+
+        self.assertEqual(self.counts(), {'bangalore': 3})
+        facets.rebuild()
+        self.assertEqual(self.counts(), {'bangalore': 3})
+
+    def test_jobs_page_filters_by_location(self):
+        self.create_job("Bengaluru")
+        self.create_job("Pune")
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('jobs'), {'location': 'Bangalore'})
+        self.assertEqual([job.location for job in response.context['page_obj']], ["Bengaluru"])
+        self.assertContains(response, "Bangalore (1)")
+        self.assertContains(response, "Pune (1)")
+
+
+class JobImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='RECRUITER')
+
+    def test_upload_that_is_not_utf8_reports_what_was_imported(self):
+        # Enough good rows that the decoder hands some over before it reaches the bad byte
+        rows = b'title,company,location,description\n' + b'Python Developer,Acme,Pune,Build APIs\n' * 400
+        upload = SimpleUploadedFile('jobs.csv', rows + b'Caf\xe9 Manager,Acme,Pune,Run it\n', content_type='text/csv')
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse('import-jobs'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        imported = JobListing.objects.count()
+        self.assertGreater(imported, 0)
+        self.assertContains(response, f"not valid UTF-8 after line {imported + 1}; imported {imported} jobs")
+
+    def test_error_report_is_valid_csv(self):
+        source = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        source.write('title,company,location,description\n"",Acme,Pune,"no title"\n')
+        source.close()
+        report = source.name + '.errors'
+        self.addCleanup(os.remove, source.name)
+        self.addCleanup(os.remove, report)
+
+        call_command('import_jobs', source.name, recruiter='recruiter', errors=report, stdout=io.StringIO())
+        with open(report, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['line', 'error'])
+        self.assertEqual(rows[1][0], '2')
+        self.assertIn('title', rows[1][1])
+
+
+class RecommendationRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        recommendations.memory_pending.clear()
+        self.user = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='RECRUITER')
+
+    def create_job(self, title):
+        return JobListing.objects.create(title=title, company="Acme", location="Pune", description="Python",
+                                         created_by=self.user)
+
+    def test_changes_made_during_a_refresh_are_applied_by_it(self):
+        recommendations.refresh_matrix()
+        cache.add(recommendations.LOCK_KEY, True)  # a refresh is running
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.create_job("Python Developer")
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.create_job("Django Developer")
+        self.assertFalse(recommendations.refresh_pending())
+
+        cache.delete(recommendations.LOCK_KEY)
+        refresh_job_matrix()
+        self.assertEqual(sorted(recommendations.load_matrix().job_ids), [first.id, second.id])
+        self.assertFalse(recommendations.memory_pending)
+
+    def test_loading_a_matrix_does_not_rebuild_its_index(self):
+        self.create_job("Python Developer")
+        matrix = recommendations.JobTermMatrix.build(JobListing.objects.all())
+        with mock.patch.object(recommendations.JobTermMatrix, '_index') as index:
+            loaded = pickle.loads(pickle.dumps(matrix))
+        index.assert_not_called()
+        self.assertEqual(loaded.top_n({'python': 1.0}, 1), matrix.top_n({'python': 1.0}, 1))
+
+    def test_recommendations_without_a_matrix_schedule_it_and_fall_back_to_newest_jobs(self):
+        jobs = [self.create_job(f"Python Developer {i}") for i in range(3)]
+        profile = UserProfile.objects.create(user=User.objects.create_user('seeker'), role='JOB_SEEKER', skills='Python')
+        with mock.patch('users.utils.tasks.refresh_job_matrix.apply_async') as apply_async:
+            recommended = recommendations.recommend_jobs(profile, 2)
+            recommendations.recommend_jobs(profile, 2)
+        self.assertEqual([job.id for job in recommended], [jobs[2].id, jobs[1].id])
+        self.assertIsNone(recommendations.load_matrix())
+        apply_async.assert_called_once()
+
+    def test_one_refresh_is_scheduled_per_window(self):
+        self.assertTrue(recommendations.queue_refresh([1]))
+        self.assertFalse(recommendations.queue_refresh([2]))
+        self.assertEqual(recommendations.memory_pending.take(), {1, 2})
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='RECRUITER')
+        self.job = JobListing.objects.create(title="Python Developer", company="Acme", location="Pune",
+                                             description="Python", created_by=self.user)
+        self.url = reverse('job-details', args=[self.job.id])
+        digest = hashlib.md5(f"testserver{self.url}".encode()).hexdigest()
+        self.lock_key = page_cache.LOCK_KEY.format(digest)
+
+    def test_purged_page_is_served_stale_while_another_worker_regenerates_it(self):
+        self.client.get(self.url)
+        page_cache.purge(f'job:{self.job.id}')
+        cache.add(self.lock_key, True)
+
+        with mock.patch('time.sleep') as sleep:
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'STALE')
+        sleep.assert_not_called()
+
+    def test_page_without_a_copy_is_rendered_without_waiting_for_the_lock(self):
+        cache.add(self.lock_key, True)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, "Python Developer")
+
+
+class FeaturedPoolTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        featured.memory_pool.clear()
+        self.user = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='RECRUITER')
+
+    def create_job(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return JobListing.objects.create(title=title, company="Acme", location="Pune", description="Python",
+                                             created_by=self.user)
+
+    def test_pool_follows_created_and_deleted_jobs(self):
+        jobs = [self.create_job(f"Engineer {i}") for i in range(3)]
+        featured.get_featured_jobs()
+        new = self.create_job("Engineer 3")
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs[0].delete()
+
+        pool_key = job_cache.featured_pool_key()
+        self.assertEqual(sorted(featured.memory_pool.sample(pool_key, 10)), [jobs[1].id, jobs[2].id, new.id])
+
+    def test_concurrent_adds_are_all_kept(self):
+        featured.get_featured_jobs()
+        pool_key = job_cache.featured_pool_key()
+
+        def add(start):
+            for job_id in range(start, start + 200):
+                featured.add_to_pool(job_id)
+
+        threads = [threading.Thread(target=add, args=(start,)) for start in range(1000, 2000, 200)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(featured.memory_pool.sample(pool_key, 2000)), 1000)
+
+    def test_import_adds_its_jobs_to_the_pool_without_rebuilding_it(self):
+        self.create_job("Engineer 0")
+        featured.get_featured_jobs()
+        pool_key = job_cache.featured_pool_key()
+
+        rows = 'title,company,location,description\n' + 'Python Developer,Acme,Pune,Build APIs\n' * 3
+        with self.captureOnCommitCallbacks(execute=True):
+            importers.import_jobs(io.StringIO(rows), 'csv', self.user)
+
+        self.assertEqual(job_cache.featured_pool_key(), pool_key)
+        self.assertEqual(sorted(featured.memory_pool.sample(pool_key, 10)),
+                         sorted(JobListing.objects.values_list('id', flat=True)))
+
+    def test_previous_pool_is_sampled_while_another_worker_builds_the_new_one(self):
+        job = self.create_job("Engineer 0")
+        client = mock.Mock()
+        client.exists.return_value = False
+        client.get.return_value = b'previous-pool'
+        client.srandmember.return_value = [str(featured.SENTINEL).encode(), str(job.id).encode()]
+        pool_key = job_cache.featured_pool_key()
+        cache.add(featured.BUILD_LOCK_KEY.format(pool_key), True)
+
+        with mock.patch.object(featured, 'get_redis_connection', return_value=client):
+            self.assertEqual(featured.get_featured_jobs(), [job])
+        client.get.assert_called_once_with(cache.make_key(featured.LIVE_POOL_KEY))
+        client.srandmember.assert_called_once_with(b'previous-pool', 4)
+        client.pipeline.assert_not_called()
+
+
+class ArchivalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        featured.memory_pool.clear()
+        self.user = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.user, role='RECRUITER')
+        past = timezone.now() - timedelta(days=1)
+        self.expired = [
+            JobListing.objects.create(title=f"Old {i}", company="Acme", location="Pune", description="Python",
+                                      created_by=self.user, expires_at=past)
+            for i in range(5)
+        ]
+        self.live = JobListing.objects.create(title="New", company="Acme", location="Pune", description="Python",
+                                              created_by=self.user)
+
+    def test_expired_jobs_move_to_the_archive_in_batches(self):
+        self.assertEqual(archival.archive_expired(size=2, limit=2, pause=0), (4, True))
+        self.assertEqual(archival.archive_expired(size=2, limit=2, pause=0), (1, False))
+
+        self.assertEqual(list(JobListing.objects.values_list('id', flat=True)), [self.live.id])
+        self.assertEqual(ArchivedJobListing.objects.count(), 5)
+        self.assertFalse(SearchPosting.objects.filter(job_id__in=[job.id for job in self.expired]).exists())
+        self.assertEqual(LocationFacet.objects.get(key='pune').job_count, 1)
+
+    def test_archiving_removes_jobs_from_the_featured_pool_without_rebuilding_it(self):
+        featured.get_featured_jobs()
+        pool_key = job_cache.featured_pool_key()
+        with self.captureOnCommitCallbacks(execute=True):
+            archival.archive_expired(pause=0)
+
+        self.assertEqual(job_cache.featured_pool_key(), pool_key)
+        self.assertEqual(featured.memory_pool.sample(pool_key, 10), [self.live.id])
+
+    def test_archived_job_keeps_its_url(self):
+        job = self.expired[0]
+        self.client.get(reverse('job-details', args=[job.id]))  # cached while live
+        with self.captureOnCommitCallbacks(execute=True):
+            archival.archive_expired(pause=0)
+
+        response = self.client.get(reverse('job-details', args=[job.id]))
+        self.assertContains(response, "This posting has expired")
+        self.assertContains(response, job.title)
+
+
+class SavedSearchAlertTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recruiter = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.recruiter, role='RECRUITER')
+        self.seeker = User.objects.create_user('seeker', 'seeker@example.com', 'pw-123456789')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pw-123456789')
+        for user in (self.seeker, self.other):
+            UserProfile.objects.create(user=user, role='JOB_SEEKER')
+
+    def post_job(self, title, location, description="Build things"):
+        return JobListing.objects.create(title=title, company="Acme", location=location, description=description,
+                                         created_by=self.recruiter)
+
+    def test_new_jobs_are_matched_and_sent_as_one_digest_per_user(self):
+        phrase = alerts.save_search(self.seeker, '"data engineer" python', 'Bengaluru')
+        keyword = alerts.save_search(self.seeker, 'django')
+        anywhere = alerts.save_search(self.other, '', 'Pune')
+        with self.assertRaises(alerts.SavedSearchError):
+            alerts.save_search(self.seeker, 'Django')
+        with self.assertRaises(alerts.SavedSearchError):
+            alerts.save_search(self.seeker, 'pyth*')
+
+        data = self.post_job("Senior Data Engineer", "Bangalore", "Python and Spark")
+        self.post_job("Engineer, Data", "Bangalore", "Python")      # not the phrase
+        self.post_job("Data Engineer", "Chennai", "Python")         # wrong location
+        web = self.post_job("Django Developer", "Pune")
+
+        scanned, created = alerts.match_new_jobs(now=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(scanned, 4)
+        self.assertEqual(
+            set(JobAlert.objects.values_list('search_id', 'job_id')),
+            {(phrase.id, data.id), (keyword.id, web.id), (anywhere.id, web.id)},
+        )
+        self.assertEqual(alerts.match_new_jobs(now=timezone.now() + timedelta(minutes=5)), (0, 0))
+
+        self.assertEqual(alerts.send_digests(), (2, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['other@example.com', 'seeker@example.com'])
+        digest = next(message for message in mail.outbox if message.to == ['seeker@example.com'])
+        self.assertIn("Senior Data Engineer", digest.body)
+        self.assertIn("Django Developer", digest.body)
+        self.assertEqual(alerts.send_digests(), (0, 0))
+
+    def test_seeker_saves_and_deletes_a_search(self):
+        self.client.force_login(self.seeker)
+        self.client.post(reverse('save-search'), {'q': 'python', 'location': ''})
+        saved = self.seeker.saved_searches.get()
+        self.assertEqual(list(saved.terms.values_list('term', flat=True)), ['python'])
+
+        self.client.post(reverse('delete-saved-search', args=[saved.id]))
+        self.assertFalse(self.seeker.saved_searches.exists())
+
+
+class JobApplicationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recruiter = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.recruiter, role='RECRUITER')
+        self.seeker = User.objects.create_user('seeker', 'seeker@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.seeker, role='JOB_SEEKER')
+        self.job = JobListing.objects.create(title="Python Developer", company="Acme", location="Pune",
+                                             description="Django", created_by=self.recruiter)
+
+    def test_apply_once_and_count_without_reading_first(self):
+        self.client.force_login(self.seeker)
+        url = reverse('apply_job', args=[self.job.id])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url)
+        self.assertFalse([q for q in queries if 'users_jobapplication' in q['sql'] and q['sql'].startswith('SELECT')])
+        self.client.post(url)
+
+        self.assertEqual(JobApplication.objects.filter(job=self.job).count(), 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.applicant_count, 1)
+
+        # Editing the job must not write back a stale count
+        stale = JobListing.objects.get(id=self.job.id)
+        JobListing.objects.filter(id=self.job.id).update(applicant_count=5)
+        stale.title = "Senior Python Developer"
+        stale.save()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.applicant_count, 5)
+
+    def test_recruiter_list_shows_counts_and_archiving_keeps_applications(self):
+        applications.apply(self.job.id, self.seeker)
+
+        self.client.force_login(self.recruiter)
+        self.assertContains(self.client.get(reverse('jobs')), "<strong>Applicants:</strong> 1", html=False)
+
+        JobListing.objects.filter(id=self.job.id).update(expires_at=timezone.now())
+        archival.archive_expired(pause=0)
+        self.assertTrue(JobApplication.objects.filter(job_id=self.job.id).exists())
+        self.assertEqual(ArchivedJobListing.objects.get(id=self.job.id).applicant_count, 1)
+        with self.assertRaises(applications.ApplicationClosed):
+            applications.apply(self.job.id, self.recruiter)
+
+
+class JobViewCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        job_stats.memory_buffer.clear()
+        self.recruiter = User.objects.create_user('recruiter', 'recruiter@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=self.recruiter, role='RECRUITER')
+        self.job = JobListing.objects.create(title="Python Developer", company="Acme", location="Pune",
+                                             description="Django", created_by=self.recruiter)
+
+    def test_views_are_deduplicated_buffered_and_flushed(self):
+        url = reverse('job-details', args=[self.job.id])
+        self.client.get(url)
+        self.client.get(url)  # served from the page cache, same visitor
+        self.client.get(reverse('job-details', args=[self.job.id + 1000]))  # 404s don't count
+
+        seeker = User.objects.create_user('seeker', 'seeker@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=seeker, role='JOB_SEEKER')
+        self.client.force_login(seeker)
+        self.client.get(url)
+        self.client.get(url)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.view_count, 0)
+        self.assertEqual(job_stats.pending_views([self.job.id]), {self.job.id: 2})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(job_stats.flush_views(), 2)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE')]), 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.view_count, 2)
+        self.assertEqual(job_stats.flush_views(), 0)
+
+        self.client.force_login(self.recruiter)
+        response = self.client.get(reverse('jobs'))
+        self.assertContains(response, "Your most viewed jobs")
+        self.assertContains(response, "<strong>Views:</strong> 2", html=False)
+
+
+class JobPermissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pw-123456789')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pw-123456789')
+        for user in (self.owner, self.other):
+            UserProfile.objects.create(user=user, role='RECRUITER')
+        self.jobs = [
+            JobListing.objects.create(title=f"Job {i}", company="Acme", location="Pune", description="Python",
+                                      created_by=self.owner)
+            for i in range(3)
+        ]
+
+    def test_grants_are_prefetched_in_one_query_and_cached(self):
+        assign_perm('users.change_joblisting', self.other, self.jobs[1])
+        perms = permissions.JobPermissions(self.other)
+        with CaptureQueriesContext(connection) as queries:
+            perms.annotate(self.jobs)
+        self.assertEqual(len([q for q in queries if 'guardian' in q['sql']]), 1)
+        self.assertEqual([permissions.CHANGE in job.user_perms for job in self.jobs], [False, True, False])
+        self.assertFalse(permissions.JobPermissions(self.owner).has(self.jobs[1], 'can_apply_job'))
+
+        with CaptureQueriesContext(connection) as queries:
+            permissions.JobPermissions(self.other).annotate(self.jobs)
+        self.assertFalse([q for q in queries if 'guardian' in q['sql']])
+
+    def test_only_job_seekers_may_apply(self):
+        assign_perm('users.can_apply_job', self.other, self.jobs[0])
+        self.assertFalse(permissions.JobPermissions(self.other).has(self.jobs[0], permissions.APPLY))
+
+        seeker = User.objects.create_user('seeker', 'seeker@example.com', 'pw-123456789')
+        UserProfile.objects.create(user=seeker, role='JOB_SEEKER')
+        self.assertEqual(permissions.JobPermissions(seeker).for_job(self.jobs[0]), {permissions.APPLY})
+
+        admin = User.objects.create_superuser('root', 'root@example.com', 'pw-123456789')
+        self.assertEqual(permissions.JobPermissions(admin).for_job(self.jobs[0]),
+                         {permissions.CHANGE, permissions.DELETE})
+        UserProfile.objects.create(user=admin, role='JOB_SEEKER')
+        self.assertEqual(permissions.JobPermissions(admin).for_job(self.jobs[0]),
+                         {permissions.CHANGE, permissions.DELETE, permissions.APPLY})
+
+    def test_views_follow_grants_and_revocations(self):
+        job = self.jobs[0]
+        self.client.force_login(self.other)
+        edit_url = reverse('edit_job', args=[job.id])
+        self.assertRedirects(self.client.get(edit_url), reverse('jobs'))
+
+        assign_perm('users.change_joblisting', self.other, job)
+        self.assertEqual(self.client.get(edit_url).status_code, 200)
+        self.assertContains(self.client.get(reverse('job-details', args=[job.id])), "Edit Job")
+
+        remove_perm('users.change_joblisting', self.other, job)
+        self.assertRedirects(self.client.get(edit_url), reverse('jobs'))
+
+        group = Group.objects.create(name='editors')
+        assign_perm('users.delete_joblisting', group, job)
+        self.other.groups.add(group)
+        self.assertEqual(self.client.get(reverse('delete_job', args=[job.id])).status_code, 200)
@@ -0,0 +1,176 @@
+"""
+Sliding-window throttling for the login and password-reset forms.
+
+Every POST is counted against the client IP and, when the form names an
+account (username or email), against that account too. Each key keeps the
+timestamps of its attempts in the last window; an attempt is allowed only
+while every key is under the limit, and is checked before the view runs so
+a rejected guess never reaches the password hasher.
+
+Rates come from ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` ('login',
+'password_reset'), the same table the API throttles read.
+
+Windows are Redis sorted sets (one Lua call checks and records all keys
+atomically) when the default cache is django-redis, and in-process deques
+otherwise, which is enough for a single dev process or the tests.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.throttling import BaseThrottle
+
+from .utils.cache import get_redis_connection, incr_counter, read_counters, reset_counters
+
+WINDOW_KEY = 'throttle:{}:{}:{}'
+KINDS = ('ip', 'account')
+SCOPES = ('login', 'password_reset')
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+# KEYS: one window per key. ARGV: now (ms), window (ms), limit, member.
+# Returns 0 when the attempt was recorded, else the index (1-based) of the
+# first key over the limit and the milliseconds until it frees up.
+SLIDING_WINDOW_SCRIPT = """
+local now, window, limit = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        return {i, tonumber(oldest[2]) + window - now}
+    end
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+end
+return {0, 0}
+"""
+
+
+def parse_rate(rate):
+    """'5/minute' -> (5, 60)"""
+    count, period = rate.split('/')
+    return int(count), DURATIONS[period[0]]
+
+
+def get_rate(scope):
+    return parse_rate(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope])
+
+
+def counter_name(scope, kind):
+    return f'throttle:{scope}:{kind}'
+
+
+# -----------------------------
+# Windows
+# -----------------------------
+class MemoryWindows:
+    """In-process stand-in for the Redis sorted sets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = defaultdict(deque)
+
+    def hit(self, keys, now, window, limit):
+        with self._lock:
+            for i, key in enumerate(keys, start=1):
+                hits = self._hits[key]
+                while hits and hits[0] <= now - window:
+                    hits.popleft()
+                if len(hits) >= limit:
+                    return i, hits[0] + window - now
+            for key in keys:
+                self._hits[key].append(now)
+            return 0, 0
+
+    def clear(self):
+        with self._lock:
+            self._hits.clear()
+
+
+memory_windows = MemoryWindows()
+_script = {}
+
+
+def _hit(keys, window, limit):
+    now = int(time.time() * 1000)
+    client = get_redis_connection()
+    if client is None:
+        return memory_windows.hit(keys, now, window, limit)
+
+    if _script.get('client') is not client:
+        _script.update(client=client, script=client.register_script(SLIDING_WINDOW_SCRIPT))
+    index, retry_ms = _script['script'](
+        keys=[cache.make_key(key) for key in keys],
+        args=[now, window, limit, f"{now}:{uuid.uuid4().hex[:8]}"],
+    )
+    return int(index), int(retry_ms)
+
+
+# -----------------------------
+# Checking attempts
+# -----------------------------
+def client_ident(request):
+    # Honours REST_FRAMEWORK['NUM_PROXIES'] like the API throttles
+    return BaseThrottle().get_ident(request)
+
+
+def check_attempt(scope, request, account=None):
+    """
+    Record an attempt for ``scope`` from this client (and ``account``, when
+    given). Returns 0 if it is allowed, else the seconds until it would be.
+    """
+    limit, duration = get_rate(scope)
+    idents = [('ip', client_ident(request))]
+    if account:
+        idents.append(('account', hashlib.md5(account.strip().lower().encode()).hexdigest()))
+
+    index, retry_ms = _hit([WINDOW_KEY.format(scope, kind, ident) for kind, ident in idents], duration * 1000, limit)
+    if not index:
+        return 0
+    incr_counter(counter_name(scope, idents[index - 1][0]))
+    return max(1, -(-retry_ms // 1000))
+
+
+def throttle_post(scope, account_field=None):
+    """
+    Reject POSTs over the ``scope`` rate with a 429 before the view runs.
+    ``account_field`` names the POST field holding the username or email.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method == 'POST':
+                account = request.POST.get(account_field) if account_field else None
+                retry_after = check_attempt(scope, request, account)
+                if retry_after:
+                    return HttpResponse(
+                        f"Too many attempts. Try again in {retry_after} seconds.",
+                        status=429, headers={'Retry-After': str(retry_after)}, content_type='text/plain',
+                    )
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def rejected_counts():
+    """``{scope: {kind: rejected attempts}}`` since the counters were last reset."""
+    names = [counter_name(scope, kind) for scope in SCOPES for kind in KINDS]
+    counters = read_counters(names)
+    return {scope: {kind: counters[counter_name(scope, kind)] for kind in KINDS} for scope in SCOPES}
+
+
+def reset_rejected_counts():
+    reset_counters([counter_name(scope, kind) for scope in SCOPES for kind in KINDS])
@@ -1,12 +1,20 @@
 # users/urls.py
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from .views import (
     home, login_view, logout_view, register_view, logout_confirm, terms_view,
-    profile_view, edit_profile_view, jobs_view, job_details_view, create_job, CustomPasswordResetView,
+    profile_view, edit_profile_view, jobs_view, job_search_view, job_details_view, create_job, CustomPasswordResetView,
     CustomPasswordResetDoneView,
-    CustomPasswordResetConfirmView, CustomPasswordResetCompleteView, edit_job, delete_job
+    CustomPasswordResetConfirmView, CustomPasswordResetCompleteView, edit_job, delete_job, import_jobs_view,
+    save_search_view, delete_saved_search_view, apply_job
 )
+from .api_views import JobListAPIView, JobDetailAPIView
+from .throttling import throttle_post
+
+if settings.ASYNC_JOB_VIEWS:
+    # Native async versions for ASGI (uvicorn) deployments
+    from .async_views import home, jobs_view, job_details_view  # noqa: F811
 
 urlpatterns = [
     path('', home, name='home'),
@@ -24,22 +32,35 @@ urlpatterns = [
 
     # Jobs
     path('jobs/', jobs_view, name='jobs'),
+    path('jobs/search/', job_search_view, name='job-search'),
     path('jobs/<int:job_id>/', job_details_view, name='job-details'),
     path('jobs/<int:job_id>/edit/', edit_job, name='edit_job'),
     path('create_job/', create_job, name='create-job'),
+    path('jobs/import/', import_jobs_view, name='import-jobs'),
     path('jobs/<int:job_id>/delete/', delete_job, name='delete_job'),
+    path('jobs/<int:job_id>/apply/', apply_job, name='apply_job'),
+
+    # Saved searches
+    path('jobs/search/save/', save_search_view, name='save-search'),
+    path('jobs/search/saved/<int:search_id>/delete/', delete_saved_search_view, name='delete-saved-search'),
+
+    # Read-only JSON API
+    path('api/jobs/', JobListAPIView.as_view(), name='api-jobs'),
+    path('api/jobs/<int:job_id>/', JobDetailAPIView.as_view(), name='api-job-details'),
 
     # Password Reset
-    path('password-reset/', auth_views.PasswordResetView.as_view(), name='password_reset'),
+    path('password-reset/', throttle_post('password_reset', 'email')(auth_views.PasswordResetView.as_view()), name='password_reset'),
     path('password-reset/done/', auth_views.PasswordResetDoneView.as_view(), name='password_reset_done'),
-    path('password-reset/confirm/<uidb64>/<token>/', auth_views.PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
+    path('password-reset/confirm/<uidb64>/<token>/',
+         throttle_post('password_reset')(auth_views.PasswordResetConfirmView.as_view()), name='password_reset_confirm'),
     path('password-reset/complete/', auth_views.PasswordResetCompleteView.as_view(), name='password_reset_complete'),
 
 
     # Forgot Password (for anonymous users)
-    path('forgot-password/', CustomPasswordResetView.as_view(), name='password_reset'),
+    path('forgot-password/', throttle_post('password_reset', 'email')(CustomPasswordResetView.as_view()), name='password_reset'),
     path('forgot-password/done/', CustomPasswordResetDoneView.as_view(), name='password_reset_done'),
-    path('forgot-password/confirm/<uidb64>/<token>/', CustomPasswordResetConfirmView.as_view(),
+    path('forgot-password/confirm/<uidb64>/<token>/',
+         throttle_post('password_reset')(CustomPasswordResetConfirmView.as_view()),
          name='password_reset_confirm'),
     path('forgot-password/complete/', CustomPasswordResetCompleteView.as_view(), name='password_reset_complete'),
 ]
@@ -0,0 +1,40 @@
+# users/utils/cache.py
+from django.core.cache import caches
+from django_redis import get_redis_connection as _get_redis_connection
+from django_redis.cache import RedisCache
+
+
+def get_redis_connection(alias='default'):
+    """
+    Return the raw redis client behind a cache alias, or None when that cache
+    is not backed by django-redis (e.g. LocMemCache in dev and tests).
+    """
+    if not isinstance(caches[alias], RedisCache):
+        return None
+    return _get_redis_connection(alias)
+
+
+# -----------------------------
+# Counters
+# -----------------------------
+COUNTER_KEY = 'counters:{}'
+
+
+def incr_counter(name, delta=1):
+    """Atomically add ``delta`` to a named counter in the default cache."""
+    cache = caches['default']
+    key = COUNTER_KEY.format(name)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def read_counters(names):
+    values = caches['default'].get_many([COUNTER_KEY.format(name) for name in names])
+    return {name: values.get(COUNTER_KEY.format(name), 0) for name in names}
+
+
+def reset_counters(names):
+    caches['default'].delete_many([COUNTER_KEY.format(name) for name in names])
@@ -1,11 +1,39 @@
 # users/utils/tasks.py
 from django.conf import settings
-from users.tasks import send_welcome_email
+from users import emails, recommendations
+from users.tasks import flush_welcome_emails, flush_welcome_queue, process_profile_image, refresh_job_matrix
 
 def send_welcome_email_dev(username, user_email):
+    # Queued and sent in batches, see users/emails.py
+    scheduled = emails.enqueue(username, user_email)
     if settings.DEBUG:
-        # In dev, call synchronously
-        send_welcome_email(username, user_email)
+        # In dev, send synchronously; a flush already running picks it up
+        flush_welcome_queue()
+    elif scheduled:
+        # In prod, use Celery after the batching window
+        flush_welcome_emails.apply_async(countdown=emails.batch_window())
+
+
+def refresh_job_matrix_dev(job_ids=None):
+    # Queued and applied in one refresh per window, see users/recommendations.py
+    scheduled = recommendations.queue_refresh(job_ids)
+    if settings.DEBUG:
+        # In dev, apply synchronously; a refresh already running picks it up
+        recommendations.refresh_pending()
+    elif scheduled:
+        refresh_job_matrix.apply_async(countdown=recommendations.refresh_window())
+
+
+def schedule_job_matrix_refresh(job_ids=None):
+    # For request paths: always through Celery, even in dev
+    if recommendations.queue_refresh(job_ids):
+        refresh_job_matrix.apply_async(countdown=recommendations.refresh_window())
+
+
+def process_profile_image_dev(profile):
+    if not profile.profile_image:
+        return
+    if settings.DEBUG:
+        process_profile_image(profile.id, profile.profile_image.name)
     else:
-        # In prod, use Celery
-        send_welcome_email.delay(username, user_email)
+        process_profile_image.delay(profile.id, profile.profile_image.name)
@@ -1,17 +1,37 @@
-import random
+import io
 import logging
+from datetime import timedelta
 from django.core.paginator import Paginator
 from django.contrib.auth import logout, login, authenticate
-from django.contrib.auth.models import User
 from django.core.cache import cache
 from .models import UserProfile
 from django.contrib.auth.decorators import login_required
 from .schemas import UserProfileAPISchema
+from .backends import get_user_role
 from .decorators import role_required
-from .utils.tasks import send_welcome_email_dev
+from . import job_cache
+from .alerts import SavedSearchError, save_search
+from .applications import ApplicationClosed, apply
+from .archival import get_job_or_archived
+from .facets import location_facets
+from .featured import get_featured_jobs
+from .page_cache import anonymous_page_cache
+from .pagination import KeysetPaginator
+from .registration import RegistrationError, change_email, register_user
+from .recommendations import recommend_jobs
+from .search import search_jobs
+from .throttling import check_attempt
+from .images import delete_variants
+from .job_stats import count_job_views, most_viewed, with_live_counts
+from .locations import normalize_location
+from .permissions import CHANGE, DELETE, annotate_jobs, job_permissions
+from .utils.tasks import process_profile_image_dev, send_welcome_email_dev
 from pydantic import ValidationError as PydanticValidationError
 from django.contrib.auth import views as auth_views
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.views.decorators.http import require_POST
+from urllib.parse import urlencode
+from django.utils import timezone
 
 
 logger = logging.getLogger(__name__)
@@ -19,13 +39,9 @@ logger = logging.getLogger(__name__)
 # -----------------------------
 # Home Page
 # -----------------------------
+@anonymous_page_cache('jobs:list', timeout=60)
 def home(request):
-    jobs = cache.get('all_jobs')
-    if not jobs:
-        jobs = list(JobListing.objects.all())
-        cache.set('all_jobs', jobs, timeout=60*5)
-
-    random_jobs = random.sample(jobs, min(len(jobs), 3))
+    random_jobs = get_featured_jobs(3)
     return render(request, 'index.html', {'jobs': random_jobs})
 
 
@@ -42,6 +58,12 @@ def login_view(request):
         password = request.POST.get('password').strip()
         remember_me = request.POST.get('remember-me')
 
+        # Checked before authenticate() so rejected guesses cost no hashing
+        retry_after = check_attempt('login', request, username)
+        if retry_after:
+            messages.error(request, f"Too many login attempts. Try again in {retry_after} seconds.")
+            return redirect('login')
+
         user = authenticate(request, username=username, password=password)
 
         if user:
@@ -121,38 +143,32 @@ def register_view(request):
             messages.error(request, "Passwords do not match")
             return redirect('register')
 
-        if User.objects.filter(username=validated_data.username).exists():
-            messages.error(request, "Username already exists")
-            return redirect('register')
+        # Get uploaded profile picture (optional)
+        profile_image = request.FILES.get('profile_image', None)
 
-        if validated_data.email and User.objects.filter(email=validated_data.email).exists():
-            messages.error(request, "Email already exists")
+        try:
+            user = register_user(
+                validated_data.username,
+                validated_data.email,
+                password,
+                role=request.POST.get('role', 'JOB_SEEKER'),
+                profile_image=profile_image,
+                location=validated_data.location,
+                phone_number=validated_data.phone_number,
+                skills=validated_data.skills,
+                experience=validated_data.experience,
+                education=validated_data.education,
+            )
+        except RegistrationError as e:
+            messages.error(request, str(e))
             return redirect('register')
 
-        # Create user
-        user = User.objects.create_user(username=validated_data.username, email=validated_data.email)
-        user.set_password(password)
-        user.save()
-
         # Trigger welcome email asynchronously
         if user.email:
             send_welcome_email_dev(user.username, user.email)
 
-        # Get uploaded profile picture (optional)
-        profile_image = request.FILES.get('profile_image', None)
-
-        # Create user profile
-        role = request.POST.get('role', 'JOB_SEEKER')
-        profile = UserProfile.objects.create(
-            user=user,
-            location=validated_data.location,
-            phone_number=validated_data.phone_number,
-            skills=validated_data.skills,
-            experience=validated_data.experience,
-            education=validated_data.education,
-            role=role,
-            profile_image=profile_image  # ✅ add this
-        )
+        if profile_image:
+            process_profile_image_dev(user.userprofile)
 
         messages.success(request, "Registration successful")
         return redirect('login')
@@ -163,6 +179,7 @@ def register_view(request):
 # -----------------------------
 # Terms & Password Reset
 # -----------------------------
+@anonymous_page_cache(timeout=60 * 60)
 def terms_view(request):
     return render(request, 'terms.html')
 
@@ -174,18 +191,35 @@ def password_reset_view(request):
 # -----------------------------
 # Profile Views
 # -----------------------------
+def get_or_create_profile(user):
+    # The profile usually came with the user (users.backends.ProfileModelBackend)
+    try:
+        return user.userprofile, False
+    except UserProfile.DoesNotExist:
+        return UserProfile.objects.get_or_create(user=user)
+
+
 @login_required
 def profile_view(request):
-    user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+    user_profile, created = get_or_create_profile(request.user)
     if created:
         messages.info(request, "We created a default profile for you. Please update it.")
-    return render(request, 'profile.html', {'user_profile': user_profile})
+
+    recommended_jobs = []
+    saved_searches = []
+    if user_profile.role == 'JOB_SEEKER':
+        recommended_jobs = recommend_jobs(user_profile, 5)
+        saved_searches = request.user.saved_searches.order_by('-created_at')
+
+    return render(request, 'profile.html', {
+        'user_profile': user_profile, 'recommended_jobs': recommended_jobs, 'saved_searches': saved_searches,
+    })
 
 
 @login_required
 def edit_profile_view(request):
     user = request.user
-    user_profile, _ = UserProfile.objects.get_or_create(user=user)
+    user_profile, _ = get_or_create_profile(user)
 
     if request.method == 'POST':
         data = {
@@ -204,9 +238,17 @@ def edit_profile_view(request):
             messages.error(request, f"Invalid data: {e.errors()}")
             return redirect('edit_profile')
 
-        if validated_data.email:
-            user.email = validated_data.email
-            user.save()
+        if validated_data.email and validated_data.email != user.email:
+            try:
+                change_email(user, validated_data.email)
+            except RegistrationError as e:
+                messages.error(request, str(e))
+                return redirect('edit_profile')
+
+        image_changed = 'profile_image' in request.FILES or 'remove_image' in request.POST
+        if image_changed:
+            delete_variants(user_profile.image_variants)
+            user_profile.image_variants = {}
 
         if 'profile_image' in request.FILES:
             user_profile.profile_image = request.FILES['profile_image']
@@ -221,6 +263,8 @@ def edit_profile_view(request):
         user_profile.experience = validated_data.experience
         user_profile.education = validated_data.education
         user_profile.save()
+        if image_changed:
+            process_profile_image_dev(user_profile)
 
         messages.success(request, 'Profile updated successfully')
         return redirect('profile')
@@ -233,17 +277,99 @@ def edit_profile_view(request):
 # -----------------------------
 @login_required
 def jobs_view(request):
-    user_profile = request.user.userprofile
-    if user_profile.role == 'RECRUITER':
-        jobs = JobListing.objects.filter(created_by=request.user)
+    location = normalize_location(request.GET.get('location'))
+    location_filters = None
+    if get_user_role(request.user) == 'RECRUITER':
+        jobs = JobListing.objects.for_list().filter(created_by=request.user)
+        recruiter_id = request.user.id
     else:
-        jobs = JobListing.objects.all()
-
-    paginator = Paginator(jobs, 10)
+        jobs = JobListing.objects.for_list()
+        recruiter_id = None
+        # Counts are across all jobs, so recruiters (who see only their own) don't get them
+        location_filters = location_facets()
+    if location:
+        jobs = jobs.filter(location_key=location)
+
+    # Old ?page=N links keep working; everything else uses keyset pagination
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if page_number is not None:
+        paginator = Paginator(jobs.order_by('-created_at', '-id'), 10)
+        page_obj = paginator.get_page(page_number)
+    else:
+        cursor = request.GET.get('cursor', '')
+        page_key = job_cache.list_key(recruiter_id, 'page', location, KeysetPaginator.cursor_key(cursor))
+        page_obj = cache.get(page_key)
+        if page_obj is None:
+            count_key = job_cache.list_key(recruiter_id, 'count', location)
+            page_obj = KeysetPaginator(jobs, 10, count_cache_key=count_key).get_page(cursor)
+            cache.set(page_key, page_obj, timeout=job_cache.LIST_TIMEOUT)
+
+    most_viewed_jobs = None
+    if recruiter_id is not None:
+        # Live counts, read after the (possibly cached) page
+        page_obj = with_live_counts(page_obj)
+        most_viewed_jobs = most_viewed(recruiter_id)
+    page_obj.object_list = annotate_jobs(request, page_obj.object_list)
+
+    return render(request, 'jobs.html', {
+        'page_obj': page_obj, 'location_facets': location_filters, 'location': location,
+        'show_stats': recruiter_id is not None, 'most_viewed': most_viewed_jobs,
+    })
+
+
+# -----------------------------
+# Job Search
+# -----------------------------
+@login_required
+def job_search_view(request):
+    query = request.GET.get('q', '').strip()
+    location = request.GET.get('location', '').strip()
+    posted_within = request.GET.get('posted_within', '')
+
+    posted_after = None
+    if posted_within.isdigit():
+        posted_after = timezone.now() - timedelta(days=int(posted_within))
 
-    return render(request, 'jobs.html', {'page_obj': page_obj})
+    results = search_jobs(query, location=location or None, posted_after=posted_after)
+
+    # Rank once, then only fetch the rows of the page being shown
+    paginator = Paginator([job_id for job_id, _ in results], 10)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    jobs_by_id = JobListing.objects.for_list().in_bulk(list(page_obj.object_list))
+    page_obj.object_list = annotate_jobs(
+        request, [jobs_by_id[job_id] for job_id in page_obj.object_list if job_id in jobs_by_id]
+    )
+
+    return render(request, 'jobs.html', {
+        'page_obj': page_obj,
+        'search': {'q': query, 'location': location, 'posted_within': posted_within, 'count': len(results)},
+    })
+
+
+# -----------------------------
+# Saved Searches (Job Seekers)
+# -----------------------------
+@role_required('JOB_SEEKER')
+@require_POST
+def save_search_view(request):
+    query = request.POST.get('q', '').strip()
+    location = request.POST.get('location', '').strip()
+    try:
+        save_search(request.user, query, location)
+    except SavedSearchError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, "Search saved. New jobs matching it will be emailed to you in a daily digest.")
+    return redirect(f"{reverse('job-search')}?{urlencode({'q': query, 'location': location})}")
+
+
+@role_required('JOB_SEEKER')
+@require_POST
+def delete_saved_search_view(request, search_id):
+    deleted, _ = request.user.saved_searches.filter(id=search_id).delete()
+    if deleted:
+        messages.success(request, "Saved search deleted.")
+    return redirect('profile')
 
 
 from django.shortcuts import get_object_or_404, redirect, render
@@ -251,6 +377,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from .models import JobListing
 from .forms import JobListingForm
+from .importers import detect_format, import_jobs
 
 # -----------------------------
 # Edit Job View
@@ -259,8 +386,7 @@ from .forms import JobListingForm
 def edit_job(request, job_id):
     job = get_object_or_404(JobListing, id=job_id)
 
-    # Check permission: Admin or the recruiter who created the job
-    if not (request.user.userprofile.role == 'ADMIN' or (request.user.userprofile.role == 'RECRUITER' and job.created_by == request.user)):
+    if not job_permissions(request).has(job, CHANGE):
         messages.error(request, "You do not have permission to edit this job.")
         return redirect('jobs')
 
@@ -283,8 +409,7 @@ def edit_job(request, job_id):
 def delete_job(request, job_id):
     job = get_object_or_404(JobListing, id=job_id)
 
-    # Check permission: Admin or the recruiter who created the job
-    if not (request.user.userprofile.role == 'ADMIN' or (request.user.userprofile.role == 'RECRUITER' and job.created_by == request.user)):
+    if not job_permissions(request).has(job, DELETE):
         messages.error(request, "You do not have permission to delete this job.")
         return redirect('jobs')
 
@@ -296,12 +421,37 @@ def delete_job(request, job_id):
     return render(request, 'confirm_delete_job.html', {'job': job})
 
 
-@login_required
+@count_job_views
+@anonymous_page_cache('job:{job_id}', timeout=job_cache.DETAIL_TIMEOUT)
 def job_details_view(request, job_id):
-    job = get_object_or_404(JobListing, id=job_id)
+    cache_key = job_cache.detail_key(job_id)
+    job = cache.get(cache_key)
+    if job is None:
+        # Expired postings are archived but keep their URL
+        job = get_job_or_archived(job_id)
+        cache.set(cache_key, job, timeout=job_cache.DETAIL_TIMEOUT)
+    annotate_jobs(request, [job])
     return render(request, 'job_details.html', {'job': job})
 
 
+# -----------------------------
+# Apply for a Job (Job Seekers)
+# -----------------------------
+@role_required('JOB_SEEKER')
+@require_POST
+def apply_job(request, job_id):
+    try:
+        applied = apply(job_id, request.user)
+    except ApplicationClosed:
+        messages.error(request, "This job is no longer accepting applications.")
+    else:
+        if applied:
+            messages.success(request, "Your application has been submitted.")
+        else:
+            messages.info(request, "You have already applied for this job.")
+    return redirect('job-details', job_id=job_id)
+
+
 # -----------------------------
 # Job Creation (Admin / Recruiter)
 # -----------------------------
@@ -316,8 +466,7 @@ def create_job(request):
         if form.is_valid():
             job = form.save(commit=False)  # don’t save yet
             job.created_by = request.user  # assign the creator
-            job.save()
-            cache.delete('all_jobs')
+            job.save()  # signals add it to the featured jobs pool
             return redirect('jobs')
     else:
         form = JobListingForm()
@@ -325,6 +474,31 @@ def create_job(request):
     return render(request, 'create_job.html', {'form': form})
 
 
+@role_required('RECRUITER')
+def import_jobs_view(request):
+    result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, "Please choose a CSV or JSONL file to upload.")
+            return redirect('import-jobs')
+
+        # Decode the upload as it is read instead of loading it into memory
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        result = import_jobs(stream, detect_format(upload.name), request.user)
+        logger.info(f"{request.user.username} imported {result.created} jobs ({result.failed} rejected)")
+        if result.stopped:
+            messages.error(
+                request,
+                f"{result.stopped}; imported {result.created} jobs and rejected {result.failed} rows before that. "
+                "Save the file as UTF-8 and upload the remaining rows."
+            )
+        else:
+            messages.success(request, f"Imported {result.created} jobs, rejected {result.failed} rows.")
+
+    return render(request, 'import_jobs.html', {'result': result})
+
+
 class CustomPasswordResetView(auth_views.PasswordResetView):
     template_name = 'forgot_password.html'
     email_template_name = 'password_reset_email.html'